@@ -1,54 +1,176 @@
-
 # backend.py - Complete fixed dashboard backend for cicd_analysis index
 
-from flask import Flask, request, jsonify
+import time
+# Startup time is measured from here so it includes imports
+STARTED_AT = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify, make_response, stream_with_context
 from flask_cors import CORS
-from elasticsearch import Elasticsearch
-import base64
-import json
+from elasticsearch import NotFoundError
+import os
+import sys
+import threading
 from datetime import datetime
 
+# Modules shared with chatbot/services (es_client, metrics, rollup, ...) live in ../common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+
+import fast_json
+import metrics
+from change_feed import ChangeFeed
+from conditional import ConditionalGet, version_body, version_tag
+from es_client import ELASTICSEARCH_URL, create_client
+from health_monitor import HealthMonitor
+from log_export import EXPORT_FORMATS, csv_chunks, csv_error, ndjson_chunks, ndjson_error
+from pagination import CursorExpired, InvalidCursor, clamp_page_size, iter_hits, search_page
+from records import LOG_FIELDS, LogRecord, serialize
+from response_cache import ResponseCache, make_key
+from rollup import AnalysisRollup, summary_aggs, summary_values, version_body as rollup_version_body, version_tag as rollup_version_tag
+from singleflight import SingleFlight, search_key
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+metrics.install(app, request, g)  # /metrics; installed first so response sizes are measured after compression
+fast_json.install(app, request)  # orjson serialization + gzip/brotli for large responses
+
+# Response cache settings (seconds); stale entries are served while refreshing in the background
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 512))
+CACHE_STALE_TTL = int(os.environ.get('CACHE_STALE_TTL', 300))
+CACHE_TTLS = {
+    'projects': int(os.environ.get('CACHE_TTL_PROJECTS', 30)),
+    'project_details': int(os.environ.get('CACHE_TTL_PROJECT_DETAILS', 30)),
+    'environments': int(os.environ.get('CACHE_TTL_ENVIRONMENTS', 120)),
+    'servers': int(os.environ.get('CACHE_TTL_SERVERS', 120))
+}
+
+# Documents fetched per Elasticsearch round trip while streaming an export
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 500))
+
+# Longest wait (seconds) between connection attempts while the cluster is unreachable at startup
+ES_INIT_RETRY_MAX = int(os.environ.get('ES_INIT_RETRY_MAX', 30))
+
+def parse_fields(raw_fields):
+    """Parse a comma separated ?fields= projection; None means every field"""
+    if not raw_fields:
+        return None
+    fields = [field.strip() for field in raw_fields.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in LOG_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
 
 class CICDDashboardBackend:
     def __init__(self):
-        # Decode API key
-        api_key_encoded = "SEtWQlVKY0JRLUE2QldTNnB3c0U6TXJ6a1dKZ0xIQ01fTndYNWtLRVhhdw=="
-        endpoint = "https://a705a31d6c434d5d9b8801b99d0ef7f7.us-central1.gcp.cloud.es.io"
-
-        api_key_decoded = base64.b64decode(api_key_encoded).decode('utf-8')
-        key_parts = api_key_decoded.split(':')
-
-        # Initialize Elasticsearch with your API key
-        self.es = Elasticsearch(
-            [endpoint],
-            api_key=(key_parts[0], key_parts[1]),
-            verify_certs=True,
-            request_timeout=60
-        )
+        # Pooled client with read retries, a circuit breaker and per-query timeout budgets
+        self.es = create_client()
 
         # IMPORTANT: This is the correct index name
         self.index_name = "cicd_analysis"
 
+        # Aggregation results are cached; error payloads are never stored
+        self.cache = ResponseCache(
+            max_entries=CACHE_MAX_ENTRIES,
+            stale_ttl=CACHE_STALE_TTL,
+            cacheable=lambda result: result.get('status') == 'success'
+        )
+
+        # Identical concurrent searches share one in-flight Elasticsearch request
+        self.search_flight = SingleFlight()
+
+        # Landing-page totals come from the incrementally maintained rollup index
+        self.rollup = AnalysisRollup(self.es.budget('background'), source_index=self.index_name)
+
+        # Open dashboards are pushed new analyses instead of polling
+        self.change_feed = ChangeFeed(self.es.budget('background'), self.index_name, field_suffix='.keyword')
+
+        # Set once the cluster has answered; /api/ready reports 503 until then
+        self.ready = threading.Event()
+        self.startup = {"attempts": 0, "ready_seconds": None, "documents": None, "error": None}
+
+        # Cluster reachability is probed in the background; health endpoints read the result
+        self.health = HealthMonitor().add('elasticsearch', self.es.budget('interactive').ping)
+
         print(f"🚀 CI/CD Dashboard Backend initialized")
-        print(f"📡 Connected to Elasticsearch: {endpoint}")
+        print(f"📡 Elasticsearch: {ELASTICSEARCH_URL}")
         print(f"📊 Using index: {self.index_name}")
 
-        # Test connection
-        if self.es.ping():
-            print("✅ Elasticsearch connection successful")
+    def start(self):
+        """Connect to Elasticsearch on a background thread so the server binds immediately"""
+        threading.Thread(target=self._connect, name='backend-init', daemon=True).start()
+        self.health.start()
+
+    def _connect(self):
+        """Retry until the cluster answers, then start the background workers"""
+        attempt = 0
+        while True:
+            self.startup["attempts"] = attempt + 1
+            try:
+                if self.es.ping():
+                    break
+                self.startup["error"] = "ping failed"
+            except Exception as e:
+                self.startup["error"] = str(e)
+            delay = min(ES_INIT_RETRY_MAX, 2 ** attempt)
+            print(f"❌ Failed to connect to Elasticsearch ({self.startup['error']}), retrying in {delay}s")
+            time.sleep(delay)
+            attempt += 1
+
+        self.startup["error"] = None
+        print("✅ Elasticsearch connection successful")
+        try:
             # Check if index exists
             if self.es.indices.exists(index=self.index_name):
                 count = self.es.count(index=self.index_name)['count']
+                self.startup["documents"] = count
                 print(f"✅ Found index '{self.index_name}' with {count} documents")
             else:
                 print(f"⚠️ Index '{self.index_name}' does not exist!")
-        else:
-            print("❌ Failed to connect to Elasticsearch")
+        except Exception as e:
+            print(f"⚠️ Could not inspect index '{self.index_name}': {e}")
+
+        self.rollup.start()
+        self.startup["ready_seconds"] = round(time.perf_counter() - STARTED_AT, 3)
+        self.ready.set()
+        print(f"⏱️ Ready after {self.startup['ready_seconds']}s")
+
+    def _search(self, query):
+        """Run a search against the analysis index, coalescing identical concurrent queries"""
+        return self.search_flight.do(
+            search_key(self.index_name, query),
+            lambda: self.es.budget('aggregation').search(index=self.index_name, body=query)
+        )
+
+    def data_version(self, filters=None):
+        """Cheap version string (match count + newest analysis) for the documents behind a response"""
+        return version_tag(self._search(version_body(filters)))
+
+    def projects_version(self):
+        """data_version for get_projects, which reads the rollup once it is built"""
+        if self.rollup.is_ready():
+            body = rollup_version_body()
+            return rollup_version_tag(self.search_flight.do(
+                search_key(self.rollup.rollup_index, body),
+                lambda: self.es.budget('interactive').search(index=self.rollup.rollup_index, body=body)
+            ))
+        return self.data_version()
+
+    def get_projects(self, version=None):
+        """Get all projects with their summary metrics.
+
+        version is the data version the response is tagged with; payloads are cached per
+        version so a newer ETag is never paired with a body computed before it.
+        """
+        return self.cache.get_or_compute(
+            make_key('projects', version=version), self._query_projects, ttl=CACHE_TTLS['projects']
+        )
+
+    def _query_projects(self):
+        if self.rollup.is_ready():
+            result = self._query_projects_from_rollup()
+            # An empty rollup (nothing folded yet) falls back to the live aggregation too
+            if result['status'] == 'success' and result['data']:
+                return result
 
-    def get_projects(self):
-        """Get all projects with their summary metrics"""
         try:
             # Query for projects with aggregations for metrics
             query = {
@@ -87,7 +209,7 @@ class CICDDashboardBackend:
                 }
             }
 
-            response = self.es.search(index=self.index_name, body=query)
+            response = self._search(query)
 
             # Process results
             projects_data = []
@@ -145,8 +267,89 @@ class CICDDashboardBackend:
                 "data": []
             }
 
-    def get_project_details(self, project_name):
+    def _query_projects_from_rollup(self):
+        """Same payload as _query_projects, aggregated from rollup rows instead of analyses"""
+        try:
+            query = {
+                "size": 0,
+                "aggs": {
+                    "projects": {
+                        "terms": {
+                            "field": "project",
+                            "size": 100,
+                            "order": {"count": "desc"}
+                        },
+                        "aggs": dict(summary_aggs(), tools={
+                            "terms": {
+                                "field": "tool",
+                                "size": 10,
+                                "order": {"count": "desc"}
+                            },
+                            "aggs": {"count": {"sum": {"field": "count"}}}
+                        })
+                    }
+                }
+            }
+
+            response = self.es.budget('aggregation').search(index=self.rollup.rollup_index, body=query)
+
+            projects_data = []
+            for project_bucket in response['aggregations']['projects']['buckets']:
+                totals = summary_values(project_bucket)
+                count = int(totals['count'])
+
+                tools = [
+                    {"name": tool_bucket['key'], "count": int(tool_bucket['count']['value'])}
+                    for tool_bucket in project_bucket['tools']['buckets']
+                ]
+
+                # Statuses other than error and warning are counted as success
+                status_counts = {
+                    "success": count - int(totals['error_status_count']) - int(totals['warning_status_count']),
+                    "error": int(totals['error_status_count']),
+                    "warning": int(totals['warning_status_count'])
+                }
+                status_counts = {status: n for status, n in status_counts.items() if n > 0}
+
+                overall_status = "success"
+                if status_counts.get("error", 0) > 0:
+                    overall_status = "error"
+                elif status_counts.get("warning", 0) > 0:
+                    overall_status = "warning"
+
+                projects_data.append({
+                    "name": project_bucket['key'],
+                    "count": count,
+                    "tools": tools,
+                    "success_rate": totals['success_count'] / count * 100 if count else 0,
+                    "latest_timestamp": totals['last_seen'],
+                    "status": overall_status,
+                    "status_counts": status_counts
+                })
+
+            return {
+                "status": "success",
+                "count": len(projects_data),
+                "data": projects_data
+            }
+
+        except Exception as e:
+            print(f"Error getting projects from rollup: {e}")
+            return {
+                "status": "error",
+                "message": str(e),
+                "data": []
+            }
+
+    def get_project_details(self, project_name, version=None):
         """Get detailed metrics for a specific project"""
+        return self.cache.get_or_compute(
+            make_key('project_details', project=project_name, version=version),
+            lambda: self._query_project_details(project_name),
+            ttl=CACHE_TTLS['project_details']
+        )
+
+    def _query_project_details(self, project_name):
         try:
             # Query for project details
             query = {
@@ -188,7 +391,7 @@ class CICDDashboardBackend:
                 }
             }
 
-            response = self.es.search(index=self.index_name, body=query)
+            response = self._search(query)
 
             # Process results
             environments = []
@@ -235,106 +438,32 @@ class CICDDashboardBackend:
                 "project": project_name
             }
 
-    def get_analysis_logs(self, project=None, environment=None, server=None, log_type=None, severity=None, limit=50):
-        """Get analysis logs with optional filtering"""
-        try:
-            # Build query
-            query_conditions = []
-
-            if project:
-                query_conditions.append({
-                    "term": {
-                        "project.keyword": project
-                    }
-                })
-
-            if environment:
-                query_conditions.append({
-                    "term": {
-                        "environment.keyword": environment
-                    }
-                })
-
-            if server:
-                query_conditions.append({
-                    "term": {
-                        "server.keyword": server
-                    }
-                })
-
-            if log_type:
-                query_conditions.append({
-                    "term": {
-                        "log_type.keyword": log_type
-                    }
-                })
-
-            if severity:
-                query_conditions.append({
-                    "term": {
-                        "severity_level.keyword": severity
-                    }
-                })
+    def get_analysis_logs(self, project=None, environment=None, server=None, log_type=None, severity=None, limit=50, cursor=None, fields=None):
+        """Get one page of analysis logs with optional filtering.
 
-            query = {
-                "query": {
-                    "bool": {
-                        "must": query_conditions if query_conditions else {"match_all": {}}
-                    }
-                },
-                "sort": [
-                    {"analysis_timestamp": {"order": "desc"}}
-                ],
-                "size": limit
-            }
+        Pages are read from a point-in-time snapshot ordered by analysis_timestamp;
+        pass the returned next_cursor back to fetch the following page. When fields
+        is given only those fields are fetched from Elasticsearch and returned.
+        """
+        try:
+            limit = clamp_page_size(limit)
+            query = self._logs_query(project, environment, server, log_type, severity, fields)
 
-            response = self.es.search(index=self.index_name, body=query)
+            response, next_cursor = search_page(self.es.budget('interactive'), self.index_name, query, limit, cursor)
 
-            # Process results
-            logs = []
-            for hit in response['hits']['hits']:
-                source = hit['_source']
-
-                # Try to parse full_synthesis as JSON if it exists and is not empty
-                full_synthesis_data = None
-                if 'full_synthesis' in source and source['full_synthesis']:
-                    try:
-                        full_synthesis_data = json.loads(source['full_synthesis'])
-                    except:
-                        # If not valid JSON, keep as string
-                        full_synthesis_data = source['full_synthesis']
-
-                logs.append({
-                    "id": hit['_id'],
-                    "project": source.get('project', ''),
-                    "environment": source.get('environment', ''),
-                    "server": source.get('server', ''),
-                    "tool": source.get('tool', ''),
-                    "log_type": source.get('log_type', ''),
-                    "severity_level": source.get('severity_level', ''),
-                    "status": source.get('status', ''),
-                    "analysis_timestamp": source.get('analysis_timestamp', ''),
-                    "correlation_id": source.get('correlation_id', ''),
-                    "affected_components": source.get('affected_components', []),
-                    "failure_category": source.get('failure_category', ''),
-                    "deployment_success": source.get('deployment_success', False),
-                    "error_count": source.get('error_count', 0),
-                    "warning_count": source.get('warning_count', 0),
-                    "business_impact_score": source.get('business_impact_score', 0),
-                    "confidence_score": source.get('confidence_score', 0),
-                    "executive_summary": source.get('executive_summary', ''),
-                    "resolution_time_estimate": source.get('resolution_time_estimate', ''),
-                    "technical_complexity": source.get('technical_complexity', ''),
-                    "full_synthesis": full_synthesis_data,
-                    "monitoring_recommendations": source.get('monitoring_recommendations', '')
-                })
+            logs = serialize((LogRecord.from_hit(hit) for hit in response['hits']['hits']), fields)
 
             return {
                 "status": "success",
                 "count": len(logs),
-                "data": logs
+                "data": logs,
+                "next_cursor": next_cursor
             }
 
+        except InvalidCursor as e:
+            return {"status": "error", "code": 400, "message": str(e), "data": []}
+        except CursorExpired as e:
+            return {"status": "error", "code": 410, "message": str(e), "data": []}
         except Exception as e:
             print(f"Error getting analysis logs: {e}")
             return {
@@ -343,8 +472,105 @@ class CICDDashboardBackend:
                 "data": []
             }
 
-    def get_environments_for_project(self, project):
+    def export_analysis_logs(self, project=None, environment=None, server=None, log_type=None, severity=None, export_format='ndjson', fields=None):
+        """Yield every matching analysis log as NDJSON or CSV text chunks.
+
+        Hits are read from a point-in-time in EXPORT_BATCH_SIZE batches, so memory stays
+        constant no matter how many documents match.
+        """
+        query = self._logs_query(project, environment, server, log_type, severity, fields)
+        records = (LogRecord.from_hit(hit) for hit in iter_hits(self.es.budget('export'), self.index_name, query, EXPORT_BATCH_SIZE))
+
+        try:
+            if export_format == 'csv':
+                yield from csv_chunks((record.to_dict(fields) for record in records), fields or LOG_FIELDS)
+            else:
+                yield from ndjson_chunks(records if fields is None else (record.to_dict(fields) for record in records))
+        except Exception as e:
+            # Headers are already sent, so the failure can only be reported in-band
+            print(f"Error exporting analysis logs: {e}")
+            yield csv_error(str(e)) if export_format == 'csv' else ndjson_error(str(e))
+
+    def get_analysis_log(self, doc_id):
+        """Get a single analysis document with its decoded full_synthesis"""
+        try:
+            document = self.es.budget('interactive').get(index=self.index_name, id=doc_id)
+            return {
+                "status": "success",
+                "data": LogRecord.from_hit(document)
+            }
+        except NotFoundError:
+            return {"status": "error", "code": 404, "message": f"Analysis log {doc_id} not found"}
+        except Exception as e:
+            print(f"Error getting analysis log: {e}")
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+
+    def _logs_query(self, project=None, environment=None, server=None, log_type=None, severity=None, fields=None):
+        """Build the filter shared by the paged log listing and the export"""
+        # Build query
+        query_conditions = []
+
+        if project:
+            query_conditions.append({
+                "term": {
+                    "project.keyword": project
+                }
+            })
+
+        if environment:
+            query_conditions.append({
+                "term": {
+                    "environment.keyword": environment
+                }
+            })
+
+        if server:
+            query_conditions.append({
+                "term": {
+                    "server.keyword": server
+                }
+            })
+
+        if log_type:
+            query_conditions.append({
+                "term": {
+                    "log_type.keyword": log_type
+                }
+            })
+
+        if severity:
+            query_conditions.append({
+                "term": {
+                    "severity_level.keyword": severity
+                }
+            })
+
+        query = {
+            "query": {
+                "bool": {
+                    "must": query_conditions if query_conditions else {"match_all": {}}
+                }
+            }
+        }
+
+        if fields is not None:
+            # Only ship the requested fields from Elasticsearch
+            query["_source"] = [field for field in fields if field != "id"] or False
+
+        return query
+
+    def get_environments_for_project(self, project, version=None):
         """Get available environments for a specific project"""
+        return self.cache.get_or_compute(
+            make_key('environments', project=project, version=version),
+            lambda: self._query_environments_for_project(project),
+            ttl=CACHE_TTLS['environments']
+        )
+
+    def _query_environments_for_project(self, project):
         try:
             query = {
                 "size": 0,
@@ -363,7 +589,7 @@ class CICDDashboardBackend:
                 }
             }
 
-            response = self.es.search(index=self.index_name, body=query)
+            response = self._search(query)
 
             environments = []
             for env_bucket in response['aggregations']['environments']['buckets']:
@@ -386,8 +612,15 @@ class CICDDashboardBackend:
                 "project": project
             }
 
-    def get_servers_for_environment(self, project, environment):
+    def get_servers_for_environment(self, project, environment, version=None):
         """Get available servers for a specific project and environment"""
+        return self.cache.get_or_compute(
+            make_key('servers', project=project, environment=environment, version=version),
+            lambda: self._query_servers_for_environment(project, environment),
+            ttl=CACHE_TTLS['servers']
+        )
+
+    def _query_servers_for_environment(self, project, environment):
         try:
             query = {
                 "size": 0,
@@ -409,7 +642,7 @@ class CICDDashboardBackend:
                 }
             }
 
-            response = self.es.search(index=self.index_name, body=query)
+            response = self._search(query)
 
             servers = []
             for server_bucket in response['aggregations']['servers']['buckets']:
@@ -434,37 +667,105 @@ class CICDDashboardBackend:
                 "environment": environment
             }
 
-# Initialize backend
+# Initialize backend; the cluster connection is made in the background by backend.start()
 backend = CICDDashboardBackend()
 
+def startup_stats():
+    return dict(backend.startup, serving_seconds=SERVING_SECONDS, ready=backend.ready.is_set())
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint; dependency state comes from the background monitor"""
     try:
-        # Test Elasticsearch connection
-        es_health = backend.es.ping()
+        dependencies = backend.health.snapshot()
+        es_health = dependencies['elasticsearch']['healthy']
 
         return jsonify({
             'status': 'healthy' if es_health else 'unhealthy',
             'elasticsearch': es_health,
+            'dependencies': dependencies,
+            'cache': backend.cache.stats(),
+            'elasticsearch_breaker': backend.es.breaker.stats(),
+            'search_coalescing': backend.search_flight.stats(),
+            'rollup': backend.rollup.stats(),
+            'change_feed': backend.change_feed.stats(),
+            'conditional_get': conditional.stats(),
+            'startup': startup_stats(),
             'timestamp': datetime.utcnow().isoformat()
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/live', methods=['GET'])
+def liveness():
+    """Liveness probe: the process is up and serving, whatever the cluster's state"""
+    return jsonify({'status': 'alive', 'uptime_seconds': round(time.perf_counter() - STARTED_AT, 3)}), 200
+
+@app.route('/api/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 503 until Elasticsearch has answered, and while it is down or its circuit is open"""
+    breaker = backend.es.breaker.stats()
+    dependencies = backend.health.snapshot()
+    ready = backend.ready.is_set() and backend.health.ready(dependencies) and breaker['state'] != 'open'
+    return jsonify({
+        'status': 'ready' if ready else 'not_ready',
+        'dependencies': dependencies,
+        'elasticsearch_breaker': breaker,
+        'startup': startup_stats()
+    }), 200 if ready else 503
+
+# Read endpoints answer If-None-Match with 304 while their data version is unchanged.
+# Cached aggregations are keyed by the same version, so a new ETag always comes with a
+# payload computed after that version was seen.
+conditional = ConditionalGet(request, make_response)
+
+metrics.expose('response_cache', backend.cache.stats)
+metrics.expose('search_coalescing', backend.search_flight.stats)
+metrics.expose('conditional_get', conditional.stats)
+metrics.expose('elasticsearch_breaker', backend.es.breaker.stats)
+metrics.expose('rollup', backend.rollup.stats)
+metrics.expose('change_feed', backend.change_feed.stats)
+metrics.expose('dependency', backend.health.stats)
+
+def project_filter(project_name):
+    return [{"term": {"project.keyword": project_name}}]
+
+def logs_version():
+    # Pages after the first sit behind a point-in-time that expires; never answer them with 304
+    if request.args.get('cursor'):
+        return None
+    query = backend._logs_query(
+        request.args.get('project'), request.args.get('environment'), request.args.get('server'),
+        request.args.get('log_type'), request.args.get('severity')
+    )
+    return backend.data_version([query['query']])
+
 @app.route('/api/projects', methods=['GET'])
+@conditional(backend.projects_version)
 def get_projects():
     """Get all projects with their metrics"""
-    result = backend.get_projects()
+    result = backend.get_projects(conditional.current_version())
     return jsonify(result), 200 if result['status'] == 'success' else 500
 
+@app.route('/api/projects/<project_name>/events', methods=['GET'])
+def project_events(project_name):
+    """Server-Sent Events stream of new analyses for a project; ?tool= limits it to one tool"""
+    subscription = backend.change_feed.subscribe(request.args.get('tool') or None, project_name)
+    return Response(
+        stream_with_context(backend.change_feed.stream(subscription)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/projects/<project_name>', methods=['GET'])
+@conditional(lambda project_name: backend.data_version(project_filter(project_name)))
 def get_project_details(project_name):
     """Get detailed metrics for a specific project"""
-    result = backend.get_project_details(project_name)
+    result = backend.get_project_details(project_name, conditional.current_version())
     return jsonify(result), 200 if result['status'] == 'success' else 500
 
 @app.route('/api/logs', methods=['GET'])
+@conditional(logs_version)
 def get_logs():
     """Get analysis logs with optional filtering"""
     project = request.args.get('project')
@@ -472,7 +773,12 @@ def get_logs():
     server = request.args.get('server')
     log_type = request.args.get('log_type')
     severity = request.args.get('severity')
-    limit = int(request.args.get('limit', 50))
+    limit = clamp_page_size(request.args.get('limit'))
+    cursor = request.args.get('cursor')
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e), "data": []}), 400
 
     result = backend.get_analysis_logs(
         project=project,
@@ -480,23 +786,70 @@ def get_logs():
         server=server,
         log_type=log_type,
         severity=severity,
-        limit=limit
+        limit=limit,
+        cursor=cursor,
+        fields=fields
     )
 
-    return jsonify(result), 200 if result['status'] == 'success' else 500
+    return jsonify(result), 200 if result['status'] == 'success' else result.get('code', 500)
+
+@app.route('/api/logs/export', methods=['GET'])
+def export_logs():
+    """Stream every matching analysis log as NDJSON (default) or CSV"""
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"status": "error", "message": f"Unsupported export format: {export_format}"}), 400
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    chunks = backend.export_analysis_logs(
+        project=request.args.get('project'),
+        environment=request.args.get('environment'),
+        server=request.args.get('server'),
+        log_type=request.args.get('log_type'),
+        severity=request.args.get('severity'),
+        export_format=export_format,
+        fields=fields
+    )
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename=cicd_analysis_export.{export_format}'}
+    )
+
+@app.route('/api/logs/<doc_id>', methods=['GET'])
+@conditional(lambda doc_id: backend.data_version([{"ids": {"values": [doc_id]}}]))
+def get_log(doc_id):
+    """Get one analysis log with its decoded full_synthesis"""
+    result = backend.get_analysis_log(doc_id)
+    return jsonify(result), 200 if result['status'] == 'success' else result.get('code', 500)
 
 @app.route('/api/projects/<project_name>/environments', methods=['GET'])
+@conditional(lambda project_name: backend.data_version(project_filter(project_name)))
 def get_environments(project_name):
     """Get available environments for a specific project"""
-    result = backend.get_environments_for_project(project_name)
+    result = backend.get_environments_for_project(project_name, conditional.current_version())
     return jsonify(result), 200 if result['status'] == 'success' else 500
 
 @app.route('/api/projects/<project_name>/environments/<environment>/servers', methods=['GET'])
+@conditional(
+    lambda project_name, environment: backend.data_version(
+        project_filter(project_name) + [{"term": {"environment.keyword": environment}}]
+    )
+)
 def get_servers(project_name, environment):
     """Get available servers for a specific project and environment"""
-    result = backend.get_servers_for_environment(project_name, environment)
+    result = backend.get_servers_for_environment(project_name, environment, conditional.current_version())
     return jsonify(result), 200 if result['status'] == 'success' else 500
 
+# Time from the first import until every route is registered and the app can serve
+SERVING_SECONDS = round(time.perf_counter() - STARTED_AT, 3)
+print(f"⏱️ Startup took {SERVING_SECONDS * 1000:.0f} ms")
+backend.start()
+
 if __name__ == '__main__':
     print("🚀 Starting CI/CD Dashboard Backend...")
     app.run(debug=True, port=5001, host='0.0.0.0')
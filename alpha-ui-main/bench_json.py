@@ -0,0 +1,92 @@
+
+# bench_json.py - Serialization and compression cost of an /api/logs payload
+#
+# Compares Flask's default jsonify encoding (stdlib json, sorted keys, ASCII escaping)
+# with fast_json, per 1,000 logs, and the size/time of compressing the result.
+#
+# Usage: python bench_json.py [log_count] [repeats]
+
+import json
+import os
+import random
+import sys
+import time
+
+# Modules shared with chatbot/services (es_client, metrics, rollup, ...) live in ../common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+
+import fast_json
+
+SEVERITIES = ['low', 'medium', 'high', 'critical']
+STATUSES = ['success', 'warning', 'error']
+LOG_TYPES = ['git-checkout', 'build', 'test', 'sonarqube-issues', 'deployment']
+
+
+def make_log(rng, i):
+    """One log shaped like CICDDashboardBackend._format_log output (22 fields)"""
+    return {
+        "id": f"doc-{i:08d}",
+        "project": f"project-{rng.randint(1, 40)}",
+        "environment": rng.choice(['dev', 'qa', 'staging', 'production']),
+        "server": f"server-{rng.randint(1, 12)}",
+        "tool": rng.choice(['jenkins', 'github-actions', 'gitlab']),
+        "log_type": rng.choice(LOG_TYPES),
+        "severity_level": rng.choice(SEVERITIES),
+        "status": rng.choice(STATUSES),
+        "analysis_timestamp": f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T12:{rng.randint(10, 59)}:00.000Z",
+        "correlation_id": f"{rng.getrandbits(64):016x}",
+        "affected_components": rng.sample(['api', 'db', 'cache', 'queue', 'auth', 'ui'], 3),
+        "failure_category": rng.choice(['dependency', 'configuration', 'test-failure', 'infrastructure']),
+        "deployment_success": rng.random() > 0.3,
+        "error_count": rng.randint(0, 25),
+        "warning_count": rng.randint(0, 60),
+        "business_impact_score": round(rng.random(), 3),
+        "confidence_score": round(rng.random(), 3),
+        "executive_summary": "Build failed because a dependency could not be resolved " * rng.randint(1, 4),
+        "resolution_time_estimate": rng.choice(['30 minutes', '1-2 hours', '2-4 hours']),
+        "technical_complexity": rng.choice(['low', 'medium', 'high']),
+        "full_synthesis": {
+            "root_cause": "Version conflict in transitive dependency – pinned release was yanked",
+            "steps": [f"Step {n}: check the lockfile and re-run the pipeline" for n in range(rng.randint(2, 6))]
+        },
+        "monitoring_recommendations": "Alert on dependency resolution failures in the build stage"
+    }
+
+
+def stdlib_jsonify(payload):
+    """What Flask's DefaultJSONProvider does for jsonify() outside debug mode"""
+    return f"{json.dumps(payload, default=str, ensure_ascii=True, sort_keys=True, separators=(',', ':'))}\n".encode('utf-8')
+
+
+def timed(label, fn, payload, repeats, per, baseline=None):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(payload)
+        best = min(best, time.perf_counter() - start)
+    speedup = f"  ({baseline / best:5.1f}x)" if baseline else ""
+    print(f"{label:<28} {best * 1000 / per:8.2f} ms per 1k logs  {len(result) / 1024:8.1f} KiB{speedup}")
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rng = random.Random(42)
+    payload = {"status": "success", "count": count, "data": [make_log(rng, i) for i in range(count)]}
+    per = count / 1000
+
+    print(f"📊 Serializing {count:,} logs, best of {repeats}")
+    print(f"   orjson available: {fast_json.orjson is not None}, brotli available: {fast_json.brotli is not None}")
+
+    baseline, body = timed("stdlib jsonify", stdlib_jsonify, payload, repeats, per)
+    timed("fast_json.dumps_bytes", fast_json.dumps_bytes, payload, repeats, per, baseline)
+
+    print(f"📦 Compressing the {len(body) / 1024:.1f} KiB response")
+    timed(f"gzip level {fast_json.GZIP_LEVEL}", lambda data: fast_json.compress(data, 'gzip'), body, repeats, per)
+    if fast_json.brotli is not None:
+        timed(f"brotli quality {fast_json.BROTLI_QUALITY}", lambda data: fast_json.compress(data, 'br'), body, repeats, per)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,33 +1,25 @@
 
 # elasticsearch_diagnostic.py - Simple diagnostic tool for your CI/CD dashboard
 
-import base64
-from elasticsearch import Elasticsearch
 import json
+import os
+import sys
 from datetime import datetime
 
+# Modules shared with chatbot/services (es_client, metrics, rollup, ...) live in ../common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+
+from es_client import ELASTICSEARCH_URL, create_client
+
 def main():
     print("🔧 CI/CD Dashboard Elasticsearch Diagnostic Tool")
     print("=" * 60)
 
-    # Your credentials
-    api_key_encoded = "SEtWQlVKY0JRLUE2QldTNnB3c0U6TXJ6a1dKZ0xIQ01fTndYNWtLRVhhdw=="
-    endpoint = "https://a705a31d6c434d5d9b8801b99d0ef7f7.us-central1.gcp.cloud.es.io"
-
-    # Decode API key
-    api_key_decoded = base64.b64decode(api_key_encoded).decode('utf-8')
-    key_parts = api_key_decoded.split(':')
-    api_key_id = key_parts[0]
-    api_key_secret = key_parts[1]
+    print(f"📡 Endpoint: {ELASTICSEARCH_URL}")
 
     try:
-        # Connect to Elasticsearch
-        es = Elasticsearch(
-            [endpoint],
-            api_key=(api_key_id, api_key_secret),
-            verify_certs=True,
-            request_timeout=60
-        )
+        # Same pooled, guarded client the services use (configured by es_client.py)
+        es = create_client()
 
         # Test connection
         if es.ping():
@@ -0,0 +1,78 @@
+
+# log_export.py - Chunked NDJSON / CSV encoders for streaming analysis log exports
+
+import csv
+import io
+
+from fast_json import dumps
+
+# Flush to the client once roughly this many bytes are buffered
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+
+def ndjson_chunks(rows, chunk_bytes=EXPORT_CHUNK_BYTES):
+    """Encode rows as newline-delimited JSON, yielding ~chunk_bytes at a time"""
+    buffer = []
+    buffered = 0
+    try:
+        for row in rows:
+            line = dumps(row) + '\n'
+            buffer.append(line)
+            buffered += len(line)
+            if buffered >= chunk_bytes:
+                yield ''.join(buffer)
+                buffer = []
+                buffered = 0
+    except Exception:
+        # Send the rows read before the failure, then let the caller report it
+        if buffer:
+            yield ''.join(buffer)
+        raise
+    if buffer:
+        yield ''.join(buffer)
+
+
+def csv_chunks(rows, columns, chunk_bytes=EXPORT_CHUNK_BYTES):
+    """Encode rows as CSV with a header line; nested values are written as JSON"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    try:
+        for row in rows:
+            writer.writerow([_csv_value(row.get(column)) for column in columns])
+            if buffer.tell() >= chunk_bytes:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    except Exception:
+        # Send the rows read before the failure, then let the caller report it
+        if buffer.tell():
+            yield buffer.getvalue()
+        raise
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_error(message):
+    """Final NDJSON line marking an export that failed part-way"""
+    return dumps({"error": message}) + '\n'
+
+
+def csv_error(message):
+    """Final CSV row marking an export that failed part-way; the rows before it are complete"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow([f"# export incomplete: {message}"])
+    return buffer.getvalue()
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return dumps(value)
+    return value
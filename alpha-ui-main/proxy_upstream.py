@@ -0,0 +1,106 @@
+
+# proxy_upstream.py - Pooled, streaming upstream client for static_server_with_proxy.py
+
+import threading
+
+import requests
+from flask import Response
+from requests.adapters import HTTPAdapter
+
+# Request headers worth passing through to the upstream backend
+FORWARDED_REQUEST_HEADERS = (
+    'Content-Type', 'Accept', 'Accept-Encoding', 'Authorization',
+    'If-None-Match', 'If-Modified-Since', 'Cache-Control', 'Last-Event-ID'
+)
+# Response headers worth passing back to the browser (hop-by-hop headers are dropped)
+FORWARDED_RESPONSE_HEADERS = (
+    'Content-Type', 'Content-Encoding', 'Content-Length', 'Cache-Control',
+    'ETag', 'Last-Modified', 'Vary', 'Retry-After', 'X-Next-Cursor'
+)
+
+
+class UpstreamBusy(Exception):
+    """Raised when an upstream's concurrency limit is reached and no slot frees up in time"""
+
+
+class Upstream:
+    """Keep-alive connection pool to one backend with a concurrency limit.
+
+    Bodies are relayed in fixed-size chunks straight from the socket without being
+    decoded or buffered, so a large /api/logs payload never sits in proxy memory.
+    The concurrency slot is held until the browser has received the whole body.
+    """
+
+    def __init__(self, name, base_url, pool_size=20, max_concurrency=50,
+                 connect_timeout=3.05, read_timeout=60, acquire_timeout=5, chunk_size=64 * 1024):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.acquire_timeout = acquire_timeout
+        self.chunk_size = chunk_size
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def forward(self, method, path, params=None, data=None, headers=None):
+        """Send the request upstream and return a Flask Response that streams its body"""
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise UpstreamBusy(f"{self.name} upstream is at its concurrency limit")
+
+        try:
+            upstream = self.session.request(
+                method,
+                f"{self.base_url}/{path.lstrip('/')}",
+                params=params,
+                data=data,
+                headers=_pick(headers or {}, FORWARDED_REQUEST_HEADERS),
+                stream=True,
+                timeout=self.timeout
+            )
+        except Exception:
+            self._slots.release()
+            raise
+
+        return Response(
+            _Relay(upstream, self.chunk_size, self._slots.release),
+            status=upstream.status_code,
+            headers=_pick(upstream.headers, FORWARDED_RESPONSE_HEADERS),
+            direct_passthrough=True
+        )
+
+
+class _Relay:
+    """Response body streaming an upstream response; close() frees the connection and slot.
+
+    The WSGI server calls close() whether or not the body was iterated: Werkzeug sends
+    no body for HEAD, 204 and 304 responses, so cleanup cannot live in a generator's
+    finally block, which would never run for them.
+    """
+
+    def __init__(self, upstream, chunk_size, release):
+        self.upstream = upstream
+        self.chunk_size = chunk_size
+        self._release = release
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __iter__(self):
+        return self.upstream.raw.stream(self.chunk_size, decode_content=False)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            self.upstream.close()
+        finally:
+            self._release()
+
+
+def _pick(headers, names):
+    return {name: headers[name] for name in names if name in headers}
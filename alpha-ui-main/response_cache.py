@@ -0,0 +1,148 @@
+
+# response_cache.py - In-process TTL + stale-while-revalidate cache for dashboard responses
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_key(endpoint, **params):
+    """Build a normalized cache key from an endpoint name and its query parameters"""
+    normalized = []
+    for name in sorted(params):
+        value = params[name]
+        if value is None or value == '':
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        normalized.append((name, value))
+    return (endpoint, tuple(normalized))
+
+
+class _Entry:
+    __slots__ = ('value', 'expires_at', 'stale_until')
+
+    def __init__(self, value, expires_at, stale_until):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class ResponseCache:
+    """Bounded LRU cache with per-entry TTL and background stale-while-revalidate refresh.
+
+    A fresh entry is returned directly. An entry past its TTL but still inside the
+    stale window is returned immediately while a single background thread recomputes
+    it, so hot keys never make a request wait on Elasticsearch. Only entries past the
+    stale window (or never seen) are computed synchronously; if that computation fails
+    (an uncacheable result, e.g. while Elasticsearch is down) the last good value is
+    served instead for as long as it has not been evicted.
+    """
+
+    def __init__(self, max_entries=512, default_ttl=30, stale_ttl=300, cacheable=None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        # Results rejected by this predicate (e.g. error payloads) are never stored
+        self.cacheable = cacheable or (lambda value: True)
+
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._refresh_failures = 0
+        self._evictions = 0
+        self._served_on_error = 0
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """Return the cached value for key, computing (or refreshing) it as needed"""
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.stale_until:
+                self._entries.move_to_end(key)
+                if now < entry.expires_at:
+                    self._hits += 1
+                    return entry.value
+
+                self._stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    threading.Thread(
+                        target=self._refresh, args=(key, compute, ttl), daemon=True
+                    ).start()
+                return entry.value
+
+            self._misses += 1
+
+        value = compute()
+        if self._store(key, value, ttl):
+            return value
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return value
+            self._served_on_error += 1
+            return entry.value
+
+    def invalidate(self, predicate=None):
+        """Drop every entry (or only those whose key matches predicate)"""
+        with self._lock:
+            if predicate is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def stats(self):
+        """Return hit/miss counters suitable for the health endpoint"""
+        with self._lock:
+            lookups = self._hits + self._stale_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "misses": self._misses,
+                "hit_rate": round((self._hits + self._stale_hits) / lookups, 4) if lookups else 0.0,
+                "background_refreshes": self._refreshes,
+                "refresh_failures": self._refresh_failures,
+                "evictions": self._evictions,
+                "served_on_error": self._served_on_error
+            }
+
+    def _refresh(self, key, compute, ttl):
+        try:
+            value = compute()
+            if self._store(key, value, ttl):
+                with self._lock:
+                    self._refreshes += 1
+            else:
+                with self._lock:
+                    self._refresh_failures += 1
+        except Exception:
+            with self._lock:
+                self._refresh_failures += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, value, ttl):
+        if not self.cacheable(value):
+            return False
+
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = _Entry(value, now + ttl, now + ttl + self.stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return True
@@ -0,0 +1,159 @@
+
+# static_assets.py - Precompressed, cache-aware static file serving for static_server_with_proxy.py
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import Response, send_file
+
+from fast_json import choose_encoding
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip variants are always available
+    brotli = None
+
+# Content-hashed build output such as main.52943a9f.js, its .map, or 453.a1b2c3d4.chunk.css
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{8,}(?:\.chunk)?\.[a-z0-9]+(?:\.map)?$')
+
+SERVED_EXTENSIONS = {
+    '.html', '.js', '.css', '.json', '.map', '.svg', '.txt', '.ico',
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.woff', '.woff2'
+}
+COMPRESSIBLE_EXTENSIONS = {'.html', '.js', '.css', '.json', '.map', '.svg', '.txt'}
+SKIPPED_DIRECTORIES = {'node_modules', '__pycache__', '.git'}
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+
+class _Asset:
+    __slots__ = ('path', 'mtime', 'size', 'etag', 'mimetype', 'immutable', 'data', 'variants')
+
+    def __init__(self, path, mtime, size, etag, mimetype, immutable, data, variants):
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.etag = etag
+        self.mimetype = mimetype
+        self.immutable = immutable
+        self.data = data
+        self.variants = variants
+
+
+class StaticAssets:
+    """Index of servable files with precompressed variants and validators.
+
+    At startup every servable file under root is fingerprinted. Text assets get
+    gzip (and brotli, when installed) variants, taken from .gz/.br files produced
+    at build time when present and compressed in memory otherwise. Files up to
+    hot_file_max_bytes are also kept in memory uncompressed. Content-hashed names
+    are served as immutable; everything else must revalidate with its ETag.
+    """
+
+    def __init__(self, root, hot_file_max_bytes=256 * 1024, compress_min_bytes=1024):
+        self.root = os.path.abspath(root)
+        self.hot_file_max_bytes = hot_file_max_bytes
+        self.compress_min_bytes = compress_min_bytes
+        self._assets = {}
+
+    def load(self):
+        """Fingerprint and precompress every servable file under root"""
+        for directory, subdirectories, filenames in os.walk(self.root):
+            subdirectories[:] = [
+                name for name in subdirectories
+                if name not in SKIPPED_DIRECTORIES and not name.startswith('.')
+            ]
+            for filename in filenames:
+                if filename.startswith('.') or os.path.splitext(filename)[1].lower() not in SERVED_EXTENSIONS:
+                    continue
+                path = os.path.join(directory, filename)
+                relative = os.path.relpath(path, self.root).replace(os.sep, '/')
+                self._assets[relative] = self._build(path)
+        return self
+
+    def stats(self):
+        return {
+            "assets": len(self._assets),
+            "in_memory_bytes": sum(
+                len(asset.data or b'') + sum(len(body) for body in asset.variants.values())
+                for asset in self._assets.values()
+            )
+        }
+
+    def serve(self, path, request):
+        """Return a Response for an indexed asset, or None to fall back to send_from_directory"""
+        asset = self._assets.get(path)
+        if asset is None:
+            return None
+
+        try:
+            stat = os.stat(asset.path)
+        except OSError:
+            self._assets.pop(path, None)
+            return None
+        if stat.st_mtime != asset.mtime or stat.st_size != asset.size:
+            # Edited in place (development); re-fingerprint before serving
+            asset = self._assets[path] = self._build(asset.path)
+
+        encoding = None if 'Range' in request.headers else choose_encoding(
+            request.headers.get('Accept-Encoding'), asset.variants
+        )
+
+        if encoding is not None:
+            response = Response(asset.variants[encoding], mimetype=asset.mimetype)
+            response.headers['Content-Encoding'] = encoding
+            response.set_etag(f"{asset.etag}-{encoding}")
+        elif asset.data is not None:
+            response = Response(asset.data, mimetype=asset.mimetype)
+            response.set_etag(asset.etag)
+        else:
+            # Large file: stream it from disk; send_file handles Range requests itself
+            response = send_file(asset.path, mimetype=asset.mimetype, etag=asset.etag, conditional=False)
+
+        if asset.variants:
+            response.vary.add('Accept-Encoding')
+        response.last_modified = asset.mtime
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if asset.immutable else REVALIDATE_CACHE_CONTROL
+        return response.make_conditional(
+            request, accept_ranges=encoding is None, complete_length=asset.size if encoding is None else None
+        )
+
+    def _build(self, path):
+        stat = os.stat(path)
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        extension = os.path.splitext(path)[1].lower()
+        variants = {}
+        if extension in COMPRESSIBLE_EXTENSIONS and len(data) >= self.compress_min_bytes:
+            variants['gzip'] = _prebuilt(path + '.gz', stat.st_mtime) or gzip.compress(data, compresslevel=9, mtime=0)
+            if brotli is not None:
+                variants['br'] = _prebuilt(path + '.br', stat.st_mtime) or brotli.compress(data, quality=11)
+            # Keep only variants that actually save bytes
+            variants = {encoding: body for encoding, body in variants.items() if len(body) < len(data)}
+
+        return _Asset(
+            path=path,
+            mtime=stat.st_mtime,
+            size=len(data),
+            etag=hashlib.sha1(data).hexdigest()[:20],
+            mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            immutable=bool(HASHED_NAME_RE.search(os.path.basename(path))),
+            data=data if len(data) <= self.hot_file_max_bytes else None,
+            variants=variants
+        )
+
+
+def _prebuilt(path, source_mtime):
+    """Read a build-time compressed sidecar file if it is at least as new as its source"""
+    try:
+        if os.stat(path).st_mtime >= source_mtime:
+            with open(path, 'rb') as f:
+                return f.read()
+    except OSError:
+        pass
+    return None
@@ -1,76 +1,92 @@
 
 # static_server_with_proxy.py - Serve static files and proxy API requests
 
-from flask import Flask, request, send_from_directory, Response
+from flask import Flask, request, send_from_directory
 import requests
 import os
+import sys
+
+# Modules shared with chatbot/services (fast_json, ...) live in ../common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+
+from proxy_upstream import Upstream, UpstreamBusy
+from static_assets import StaticAssets
 
 app = Flask(__name__, static_folder='./')
 
 # Dashboard backend endpoint
-DASHBOARD_API = 'http://localhost:5001'
+DASHBOARD_API = os.environ.get('DASHBOARD_API', 'http://localhost:5001')
 # Chatbot endpoint
-CHATBOT_API = 'http://localhost:5000'
+CHATBOT_API = os.environ.get('CHATBOT_API', 'http://localhost:5000')
 
-@app.route('/api/chat', methods=['POST'])
-def proxy_chat():
-    """Proxy chatbot API requests"""
+# Upstream timeouts (seconds) and pool/concurrency limits
+PROXY_CONNECT_TIMEOUT = float(os.environ.get('PROXY_CONNECT_TIMEOUT', 3.05))
+PROXY_READ_TIMEOUT = float(os.environ.get('PROXY_READ_TIMEOUT', 60))
+PROXY_ACQUIRE_TIMEOUT = float(os.environ.get('PROXY_ACQUIRE_TIMEOUT', 5))
+
+dashboard_upstream = Upstream(
+    'dashboard', DASHBOARD_API,
+    pool_size=int(os.environ.get('DASHBOARD_POOL_SIZE', 20)),
+    max_concurrency=int(os.environ.get('DASHBOARD_MAX_CONCURRENCY', 64)),
+    connect_timeout=PROXY_CONNECT_TIMEOUT,
+    read_timeout=PROXY_READ_TIMEOUT,
+    acquire_timeout=PROXY_ACQUIRE_TIMEOUT
+)
+# Chat completions are slow and GPU bound, so allow fewer of them in flight
+chatbot_upstream = Upstream(
+    'chatbot', CHATBOT_API,
+    pool_size=int(os.environ.get('CHATBOT_POOL_SIZE', 10)),
+    max_concurrency=int(os.environ.get('CHATBOT_MAX_CONCURRENCY', 16)),
+    connect_timeout=PROXY_CONNECT_TIMEOUT,
+    read_timeout=PROXY_READ_TIMEOUT,
+    acquire_timeout=PROXY_ACQUIRE_TIMEOUT
+)
+
+# Fingerprint and precompress static files once at startup
+assets = StaticAssets('./', hot_file_max_bytes=int(os.environ.get('STATIC_HOT_FILE_MAX_BYTES', 256 * 1024))).load()
+
+def forward(upstream, path):
+    """Stream the current request through an upstream, mapping failures to gateway errors"""
     try:
-        # Forward the request to the chatbot API
-        response = requests.post(
-            f"{CHATBOT_API}/api/chat",
-            json=request.json,
-            headers={
-                'Content-Type': 'application/json'
-            }
-        )
-        return Response(
-            response.content,
-            status=response.status_code,
-            content_type=response.headers.get('Content-Type')
+        return upstream.forward(
+            request.method,
+            path,
+            params=request.args,
+            data=request.get_data() if request.method == 'POST' else None,
+            headers=request.headers
         )
+    except UpstreamBusy as e:
+        return {"error": str(e)}, 503, {'Retry-After': '1'}
+    except requests.exceptions.Timeout:
+        return {"error": f"{upstream.name} upstream timed out"}, 504
+    except requests.exceptions.ConnectionError:
+        return {"error": f"Cannot connect to {upstream.name} upstream"}, 502
     except Exception as e:
         return {"error": str(e)}, 500
 
+@app.route('/api/chat', methods=['POST'])
+def proxy_chat():
+    """Proxy chatbot API requests"""
+    return forward(chatbot_upstream, '/api/chat')
+
 @app.route('/api/<path:path>', methods=['GET', 'POST'])
 def proxy_api(path):
     """Proxy dashboard API requests"""
-    try:
-        if request.method == 'GET':
-            response = requests.get(
-                f"{DASHBOARD_API}/api/{path}",
-                params=request.args,
-                headers={
-                    'Content-Type': 'application/json'
-                }
-            )
-        else:
-            response = requests.post(
-                f"{DASHBOARD_API}/api/{path}",
-                json=request.json,
-                headers={
-                    'Content-Type': 'application/json'
-                }
-            )
-
-        return Response(
-            response.content,
-            status=response.status_code,
-            content_type=response.headers.get('Content-Type')
-        )
-    except Exception as e:
-        return {"error": str(e)}, 500
+    return forward(dashboard_upstream, f'/api/{path}')
 
 @app.route('/', defaults={'path': 'index.html'})
 @app.route('/<path:path>')
 def serve_static(path):
     """Serve static files"""
-    return send_from_directory('./', path)
+    response = assets.serve(path, request)
+    if response is None:
+        return send_from_directory('./', path)
+    return response
 
 if __name__ == '__main__':
     print("🚀 Starting Static Server with API Proxy...")
-    print("📡 Proxying dashboard API to: http://localhost:5001")
-    print("📡 Proxying chatbot API to: http://localhost:5000")
-    print("📂 Serving static files from current directory")
+    print(f"📡 Proxying dashboard API to: {DASHBOARD_API}")
+    print(f"📡 Proxying chatbot API to: {CHATBOT_API}")
+    print(f"📂 Serving {assets.stats()['assets']} static files from current directory")
     print("🌐 Frontend available at: http://localhost:8080")
     app.run(debug=True, port=8080, host='0.0.0.0')
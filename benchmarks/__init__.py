@@ -0,0 +1,2 @@
+
+# Offline benchmarks: synthetic data, Elasticsearch and RAG stand-ins, load scenarios (see run.py)
@@ -0,0 +1,909 @@
+
+# fake_es.py - Local stand-in for the Elasticsearch REST API used by the dashboard services
+#
+# Serves synthetic cicd_analysis documents from memory over HTTP, so the services can be
+# pointed at it with ELASTICSEARCH_URL=http://127.0.0.1:<port> instead of Elastic Cloud.
+# It implements the subset of the API the services call:
+#
+#   ping / info, indices.exists / create, search, count, get, msearch, index / create
+#   (with if_seq_no / if_primary_term), update, bulk (index, create, update, delete),
+#   open_point_in_time / close_point_in_time
+#
+#   queries: match_all, term, terms, range (incl. now-<n><unit>), ids, exists, bool
+#   aggs:    terms, composite (terms and date_histogram sources), filter, filters,
+#            date_histogram, top_hits, avg, sum, min, max, value_count, cardinality,
+#            stats, bucket_script (arithmetic and ?: scripts)
+#
+# Painless is not interpreted. Updates may carry a partial doc, an upsert, or the rollup
+# merge script (rollup.MERGE_SCRIPT), which is recognised by its params and emulated. Anything
+# else is answered with a 400 error, which the services already handle.
+# Fields ending in .keyword are treated as the field itself. "took" is the time spent
+# evaluating the request; --latency-ms adds a fixed delay on top to mimic a remote cluster.
+#
+# Usage: python -m benchmarks.fake_es --docs 10000 --port 9200 [--latency-ms 5]
+
+import argparse
+import functools
+import itertools
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import Corpus
+
+ANALYSIS_INDEX = 'cicd_analysis'
+DATE_FIELDS = frozenset({'analysis_timestamp', 'last_seen', 'watermark'})
+DEFAULT_TRACK_TOTAL_HITS = 10000
+VERSION = {"number": "8.13.0", "build_flavor": "default", "lucene_version": "9.10.0"}
+
+_DATE_MATH = re.compile(r'^now(?:([+-])(\d+)([smhdwM]))?(?:/([smhdwM]))?$')
+_UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800, 'M': 2592000}
+
+
+class ElasticError(Exception):
+    """Answered as an Elasticsearch error body with the given status"""
+
+    def __init__(self, status, error_type, reason):
+        super().__init__(reason)
+        self.status = status
+        self.error_type = error_type
+
+    def body(self):
+        return {"error": {"type": self.error_type, "reason": str(self)}, "status": self.status}
+
+
+def unsupported(what):
+    return ElasticError(400, 'parsing_exception', f"{what} is not supported by the benchmark stand-in")
+
+
+@functools.lru_cache(maxsize=200000)
+def epoch_ms(value):
+    """ISO timestamp, epoch millis or date math -> epoch millis"""
+    if isinstance(value, (int, float)):
+        return value
+    text = str(value)
+    match = _DATE_MATH.match(text)
+    if match:
+        sign, amount, unit, _ = match.groups()
+        now = time.time()
+        if amount:
+            now += (1 if sign == '+' else -1) * int(amount) * _UNIT_SECONDS[unit]
+        return int(now * 1000)
+    parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+def iso(ms):
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def field_name(field):
+    return field[:-len('.keyword')] if field.endswith('.keyword') else field
+
+
+def values(source, field):
+    """Every value of field in source (lists are multi-valued), dates as epoch millis"""
+    field = field_name(field)
+    value = source.get(field)
+    if value is None:
+        return []
+    items = value if isinstance(value, list) else [value]
+    if field in DATE_FIELDS:
+        return [epoch_ms(item) for item in items]
+    return items
+
+
+def sort_value(source, field):
+    found = values(source, field)
+    return found[0] if found else None
+
+
+def numeric(value):
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+# Queries --------------------------------------------------------------------------------
+
+def _term_equals(candidate, wanted):
+    if isinstance(candidate, bool) or isinstance(wanted, bool):
+        return str(candidate).lower() == str(wanted).lower()
+    return candidate == wanted or str(candidate) == str(wanted)
+
+
+def matches(doc, query):
+    """True when (doc_id, source) matches a query clause"""
+    doc_id, source = doc
+    if not query:
+        return True
+    (kind, spec), = query.items()
+
+    if kind == 'match_all':
+        return True
+    if kind == 'bool':
+        must = as_list(spec.get('must')) + as_list(spec.get('filter'))
+        if not all(matches(doc, clause) for clause in must):
+            return False
+        if any(matches(doc, clause) for clause in as_list(spec.get('must_not'))):
+            return False
+        should = as_list(spec.get('should'))
+        minimum = spec.get('minimum_should_match', 0 if must else 1)
+        return not should or sum(matches(doc, clause) for clause in should) >= int(minimum)
+    if kind == 'term':
+        (field, wanted), = spec.items()
+        wanted = wanted.get('value') if isinstance(wanted, dict) else wanted
+        if field_name(field) in DATE_FIELDS:
+            wanted = epoch_ms(wanted)
+        return any(_term_equals(value, wanted) for value in values(source, field))
+    if kind == 'terms':
+        (field, wanted), = ((f, w) for f, w in spec.items() if f != 'boost')
+        return any(_term_equals(value, item) for value in values(source, field) for item in wanted)
+    if kind == 'ids':
+        return doc_id in spec.get('values', [])
+    if kind == 'exists':
+        return bool(values(source, spec['field']))
+    if kind == 'range':
+        (field, bounds), = spec.items()
+        is_date = field_name(field) in DATE_FIELDS
+        checks = {'gt': lambda a, b: a > b, 'gte': lambda a, b: a >= b, 'lt': lambda a, b: a < b, 'lte': lambda a, b: a <= b}
+        for value in values(source, field):
+            ok = True
+            for op, bound in bounds.items():
+                if op not in checks:
+                    continue
+                bound = epoch_ms(bound) if is_date else bound
+                candidate = value if is_date else (numeric(value) if isinstance(bound, (int, float)) else value)
+                if candidate is None or not checks[op](candidate, bound):
+                    ok = False
+                    break
+            if ok:
+                return True
+        return False
+    raise unsupported(f"Query [{kind}]")
+
+
+# Sorting and hits -----------------------------------------------------------------------
+
+def parse_sort(sort):
+    """[(field, descending)] from an Elasticsearch sort clause"""
+    parsed = []
+    for item in as_list(sort):
+        if isinstance(item, str):
+            parsed.append((item, item == '_score'))
+            continue
+        (field, order), = item.items()
+        order = order.get('order', 'asc') if isinstance(order, dict) else order
+        parsed.append((field, order == 'desc'))
+    return parsed
+
+
+def _compare(left, right, descending):
+    if left == right:
+        return 0
+    # Missing values sort last in both directions
+    if left is None:
+        return 1
+    if right is None:
+        return -1
+    try:
+        result = -1 if left < right else 1
+    except TypeError:
+        result = -1 if str(left) < str(right) else 1
+    return -result if descending else result
+
+
+def sort_docs(docs, sort):
+    """(ordinal, doc, sort values) in sort order"""
+    spec = parse_sort(sort)
+
+    def keys(ordinal, doc):
+        return [ordinal if field in ('_doc', '_shard_doc') else None if field == '_score' else sort_value(doc[1], field)
+                for field, _ in spec]
+
+    rows = [(ordinal, doc, keys(ordinal, doc)) for ordinal, doc in enumerate(docs)]
+    if not spec:
+        return rows
+
+    try:
+        # One stable pass per sort field, last field first; missing values stay last
+        for position, (field, descending) in reversed(list(enumerate(spec))):
+            def key(row, position=position, descending=descending):
+                value = row[2][position]
+                present = value is not None
+                return (present if descending else not present), value
+            rows.sort(key=key, reverse=descending)
+        return rows
+    except TypeError:
+        pass
+
+    def compare(a, b):
+        for (field, descending), left, right in zip(spec, a[2], b[2]):
+            result = _compare(left, right, descending)
+            if result:
+                return result
+        return 0
+
+    rows.sort(key=functools.cmp_to_key(compare))
+    return rows
+
+
+def after(rows, sort, search_after):
+    spec = parse_sort(sort)
+    position = 0
+    for position, row in enumerate(rows):
+        for (field, descending), value, wanted in zip(spec, row[2], search_after):
+            result = _compare(value, wanted, descending)
+            if result:
+                break
+        else:
+            continue
+        if result > 0:
+            return rows[position:]
+    return []
+
+
+def project_source(source, wanted):
+    if wanted is None or wanted is True:
+        return source
+    if wanted is False:
+        return None
+    if isinstance(wanted, dict):
+        wanted = wanted.get('includes') or wanted.get('include')
+        if not wanted:
+            return source
+    fields = as_list(wanted)
+    return {field: source[field] for field in fields if field in source}
+
+
+def hit(index, doc, sort_values=None, wanted_source=None):
+    doc_id, source = doc
+    entry = {"_index": index, "_id": doc_id, "_score": None}
+    projected = project_source(source, wanted_source)
+    if projected is not None:
+        entry["_source"] = projected
+    if sort_values is not None:
+        entry["sort"] = sort_values
+    return entry
+
+
+def total(count, track_total_hits):
+    if track_total_hits is True:
+        return {"value": count, "relation": "eq"}
+    limit = DEFAULT_TRACK_TOTAL_HITS if track_total_hits in (None, False) else int(track_total_hits)
+    return {"value": min(count, limit), "relation": "eq" if count <= limit else "gte"}
+
+
+# Aggregations ---------------------------------------------------------------------------
+
+METRICS = ('avg', 'sum', 'min', 'max', 'value_count', 'cardinality', 'stats')
+
+
+def aggregate(index, docs, aggs):
+    results = {}
+    pipelines = {}
+    for name, spec in (aggs or {}).items():
+        kind = next(key for key in spec if key not in ('aggs', 'aggregations', 'meta'))
+        if kind == 'bucket_script':
+            pipelines[name] = spec[kind]
+            continue
+        sub_aggs = spec.get('aggs') or spec.get('aggregations')
+        results[name] = _aggregate_one(index, docs, kind, spec[kind], sub_aggs)
+    return results, pipelines
+
+
+def _bucket(index, docs, sub_aggs, **fields):
+    bucket = dict(fields, doc_count=len(docs))
+    if sub_aggs:
+        results, pipelines = aggregate(index, docs, sub_aggs)
+        bucket.update(results)
+        for name, spec in pipelines.items():
+            bucket[name] = {"value": bucket_script(bucket, spec)}
+    return bucket
+
+
+def _metric(docs, kind, spec):
+    field = spec['field']
+    raw = [value for _, source in docs for value in values(source, field)]
+    if kind == 'value_count':
+        return {"value": len(raw)}
+    if kind == 'cardinality':
+        return {"value": len({json.dumps(value, sort_keys=True) for value in raw})}
+    numbers = [n for n in (numeric(value) for value in raw) if n is not None]
+    is_date = field_name(field) in DATE_FIELDS
+
+    def with_string(result):
+        if is_date and result.get("value") is not None:
+            result["value_as_string"] = iso(result["value"])
+        return result
+
+    if kind == 'stats':
+        return {
+            "count": len(numbers),
+            "min": min(numbers) if numbers else None,
+            "max": max(numbers) if numbers else None,
+            "avg": sum(numbers) / len(numbers) if numbers else None,
+            "sum": sum(numbers)
+        }
+    if kind == 'sum':
+        return {"value": sum(numbers)}
+    if not numbers:
+        return {"value": None}
+    if kind == 'avg':
+        return {"value": sum(numbers) / len(numbers)}
+    return with_string({"value": min(numbers) if kind == 'min' else max(numbers)})
+
+
+def _terms(index, docs, spec, sub_aggs):
+    field = spec['field']
+    groups = {}
+    for doc in docs:
+        found = values(doc[1], field)
+        if not found and 'missing' in spec:
+            found = [spec['missing']]
+        for value in set(json.dumps(v) if isinstance(v, (list, dict)) else v for v in found):
+            groups.setdefault(value, []).append(doc)
+
+    buckets = []
+    for key, group in groups.items():
+        fields = {"key": key}
+        if isinstance(key, bool):
+            fields = {"key": int(key), "key_as_string": str(key).lower()}
+        buckets.append(_bucket(index, group, sub_aggs, **fields))
+
+    order = spec.get('order') or [{"_count": "desc"}, {"_key": "asc"}]
+    for clause in reversed(as_list(order) + [{"_key": "asc"}]):
+        (target, direction), = clause.items()
+
+        def sort_key(bucket, target=target):
+            if target == '_count':
+                return bucket['doc_count']
+            if target == '_key':
+                return bucket['key']
+            metric = bucket[target.split('.')[0]]
+            value = metric.get('value') if 'value' in metric else metric.get('doc_count')
+            return value if value is not None else float('-inf')
+
+        buckets.sort(key=sort_key, reverse=direction == 'desc')
+
+    size = int(spec.get('size', 10))
+    shown = buckets[:size]
+    return {
+        "doc_count_error_upper_bound": 0,
+        "sum_other_doc_count": sum(bucket['doc_count'] for bucket in buckets[size:]),
+        "buckets": shown
+    }
+
+
+def _floor(ms, interval):
+    moment = datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+    if interval in ('1d', 'day'):
+        moment = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    elif interval in ('1h', 'hour'):
+        moment = moment.replace(minute=0, second=0, microsecond=0)
+    elif interval in ('1w', 'week'):
+        moment = (moment - timedelta(days=moment.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    elif interval in ('1M', 'month'):
+        moment = moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    else:
+        raise unsupported(f"calendar_interval [{interval}]")
+    return int(moment.timestamp() * 1000)
+
+
+def _step(ms, interval):
+    moment = datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+    if interval in ('1M', 'month'):
+        month = moment.month % 12 + 1
+        return int(moment.replace(year=moment.year + (month == 1), month=month).timestamp() * 1000)
+    return ms + {'1d': 86400, 'day': 86400, '1h': 3600, 'hour': 3600, '1w': 604800, 'week': 604800}[interval] * 1000
+
+
+def _date_histogram(index, docs, spec, sub_aggs):
+    if 'fixed_interval' in spec:
+        match = re.match(r'^(\d+)([smhd])$', spec['fixed_interval'])
+        if not match:
+            raise unsupported(f"fixed_interval [{spec['fixed_interval']}]")
+        width = int(match.group(1)) * _UNIT_SECONDS[match.group(2)] * 1000
+        floor, step = (lambda ms: ms - ms % width), (lambda ms: ms + width)
+    else:
+        interval = spec.get('calendar_interval') or spec.get('interval')
+        floor, step = (lambda ms: _floor(ms, interval)), (lambda ms: _step(ms, interval))
+
+    groups = {}
+    for doc in docs:
+        for value in values(doc[1], spec['field']):
+            groups.setdefault(floor(value), []).append(doc)
+    if not groups:
+        return {"buckets": []}
+
+    keys = sorted(groups)
+    min_doc_count = int(spec.get('min_doc_count', 0))
+    if min_doc_count == 0:
+        filled, key = [], keys[0]
+        while key <= keys[-1]:
+            filled.append(key)
+            key = step(key)
+        keys = filled
+    buckets = [
+        _bucket(index, groups.get(key, []), sub_aggs, key_as_string=iso(key), key=key)
+        for key in keys if len(groups.get(key, [])) >= min_doc_count
+    ]
+    return {"buckets": buckets}
+
+
+def _composite_key(combination):
+    # Ascending, with missing values first as Elasticsearch orders them
+    return [(value is not None, value) for value in combination]
+
+
+def _composite(index, docs, spec, sub_aggs):
+    sources = [next(iter(source.items())) for source in spec['sources']]
+    groups = {}
+    for doc in docs:
+        per_source = []
+        for name, source in sources:
+            (kind, options), = source.items()
+            if options.get('order', 'asc') != 'asc':
+                raise unsupported("Descending composite sources")
+            found = values(doc[1], options['field'])
+            if kind == 'date_histogram':
+                interval = options.get('calendar_interval') or options.get('interval')
+                found = [_floor(value, interval) for value in found]
+            elif kind != 'terms':
+                raise unsupported(f"Composite source [{kind}]")
+            if not found:
+                if not options.get('missing_bucket'):
+                    break
+                found = [None]
+            per_source.append(found)
+        else:
+            for combination in itertools.product(*per_source):
+                groups.setdefault(combination, []).append(doc)
+
+    keys = sorted(groups, key=_composite_key)
+    if spec.get('after'):
+        after_key = _composite_key([spec['after'].get(name) for name, _ in sources])
+        keys = [key for key in keys if _composite_key(key) > after_key]
+    page = keys[:int(spec.get('size', 10))]
+
+    names = [name for name, _ in sources]
+    result = {"buckets": [_bucket(index, groups[key], sub_aggs, key=dict(zip(names, key))) for key in page]}
+    if page:
+        result["after_key"] = dict(zip(names, page[-1]))
+    return result
+
+
+def _aggregate_one(index, docs, kind, spec, sub_aggs):
+    if kind in METRICS:
+        return _metric(docs, kind, spec)
+    if kind == 'terms':
+        return _terms(index, docs, spec, sub_aggs)
+    if kind == 'composite':
+        return _composite(index, docs, spec, sub_aggs)
+    if kind == 'filter':
+        return _bucket(index, [doc for doc in docs if matches(doc, spec)], sub_aggs)
+    if kind == 'filters':
+        named = spec['filters']
+        if isinstance(named, list):
+            raise unsupported("Anonymous filters")
+        return {"buckets": {
+            name: _bucket(index, [doc for doc in docs if matches(doc, query)], sub_aggs)
+            for name, query in named.items()
+        }}
+    if kind == 'date_histogram':
+        return _date_histogram(index, docs, spec, sub_aggs)
+    if kind == 'top_hits':
+        rows = sort_docs(docs, spec.get('sort'))
+        size = int(spec.get('size', 3))
+        return {"hits": {
+            "total": {"value": len(docs), "relation": "eq"},
+            "max_score": None,
+            "hits": [hit(index, doc, keys if spec.get('sort') else None, spec.get('_source')) for _, doc, keys in rows[:size]]
+        }}
+    raise unsupported(f"Aggregation [{kind}]")
+
+
+def bucket_script(bucket, spec):
+    """Evaluate a bucket_script whose script is arithmetic with at most one ?: conditional"""
+    params = {}
+    for name, path in spec['buckets_path'].items():
+        if path == '_count':
+            params[name] = bucket['doc_count']
+            continue
+        agg, _, metric = path.replace('.', '>').partition('>')
+        target = bucket.get(agg, {})
+        params[name] = target.get('doc_count') if metric == '_count' else target.get(metric or 'value')
+
+    script = spec['script']
+    source = script.get('source') if isinstance(script, dict) else script
+    source = re.sub(r'params\.(\w+)', r'params["\1"]', source).replace('&&', ' and ').replace('||', ' or ')
+    conditional = re.match(r'^(.*?)\?(.*?):(.*)$', source)
+    if conditional:
+        source = f"({conditional.group(2)}) if ({conditional.group(1)}) else ({conditional.group(3)})"
+    try:
+        return eval(source, {"__builtins__": {}}, {"params": params})
+    except (TypeError, ZeroDivisionError):
+        return None
+
+
+def run_update_script(source, script):
+    """Emulate an update script on a copy of source; None means the update is a no-op"""
+    params = script.get('params') or {}
+    if 'sums' not in params:
+        raise unsupported("Update scripts other than the rollup merge script")
+    window = params.get('window')
+    if window is not None and source.get('window') is not None and source['window'] >= window:
+        return None
+    updated = dict(source)
+    for field, value in params['sums'].items():
+        updated[field] = (updated.get(field) or 0) + value
+    last_seen = params.get('last_seen')
+    if last_seen is not None and (updated.get('last_seen') is None or updated['last_seen'] < last_seen):
+        updated['last_seen'] = last_seen
+    if window is not None:
+        updated['window'] = window
+    return updated
+
+
+# The cluster ----------------------------------------------------------------------------
+
+class FakeCluster:
+    """In-memory indices and point-in-time snapshots"""
+
+    def __init__(self):
+        self.indices = {}
+        self.pits = {}
+        self._seq_no = 0
+        self._lock = threading.RLock()
+
+    def load(self, index, documents):
+        docs = list(documents)
+        with self._lock:
+            self.indices[index] = {
+                "docs": docs,
+                "ids": {doc_id: n for n, (doc_id, _) in enumerate(docs)},
+                "seq": {}
+            }
+
+    def _index(self, name):
+        index = self.indices.get(name)
+        if index is None:
+            raise ElasticError(404, 'index_not_found_exception', f"no such index [{name}]")
+        return index
+
+    def create_index(self, name):
+        with self._lock:
+            if name in self.indices:
+                raise ElasticError(400, 'resource_already_exists_exception', f"index [{name}] already exists")
+            self.indices[name] = {"docs": [], "ids": {}, "seq": {}}
+        return {"acknowledged": True, "shards_acknowledged": True, "index": name}
+
+    def write(self, index, doc_id, source, create=False, if_seq_no=None):
+        with self._lock:
+            target = self.indices.setdefault(index, {"docs": [], "ids": {}, "seq": {}})
+            doc_id = doc_id or uuid.uuid4().hex
+            position = target['ids'].get(doc_id)
+            if position is not None and create:
+                raise ElasticError(409, 'version_conflict_engine_exception', f"[{doc_id}]: document already exists")
+            if if_seq_no is not None and (position is None or target['seq'].get(doc_id) != int(if_seq_no)):
+                raise ElasticError(
+                    409, 'version_conflict_engine_exception',
+                    f"[{doc_id}]: version conflict, required seqNo [{if_seq_no}], current [{target['seq'].get(doc_id)}]"
+                )
+            # Copy on write: open point-in-time snapshots keep the old list
+            docs = list(target['docs'])
+            if position is None:
+                target['ids'][doc_id] = len(docs)
+                docs.append((doc_id, source))
+                result = 'created'
+            else:
+                docs[position] = (doc_id, source)
+                result = 'updated'
+            target['docs'] = docs
+            self._seq_no += 1
+            target['seq'][doc_id] = self._seq_no
+        return {"_index": index, "_id": doc_id, "_version": 1, "result": result, "_seq_no": self._seq_no, "_primary_term": 1}
+
+    def update(self, index, doc_id, spec):
+        """Partial doc, upsert or emulated script update of one document"""
+        with self._lock:
+            target = self.indices.setdefault(index, {"docs": [], "ids": {}, "seq": {}})
+            position = target['ids'].get(doc_id)
+            if position is None:
+                if 'upsert' in spec:
+                    return self.write(index, doc_id, spec['upsert'])
+                if spec.get('doc_as_upsert') and 'doc' in spec:
+                    return self.write(index, doc_id, spec['doc'])
+                raise ElasticError(404, 'document_missing_exception', f"[{doc_id}]: document missing")
+            source = target['docs'][position][1]
+            updated = run_update_script(source, spec['script']) if 'script' in spec else dict(source, **spec.get('doc', {}))
+            if updated is None or updated == source:
+                return {"_index": index, "_id": doc_id, "_version": 1, "result": "noop",
+                        "_seq_no": target['seq'].get(doc_id, 0), "_primary_term": 1}
+            return self.write(index, doc_id, updated)
+
+    def delete(self, index, doc_id):
+        with self._lock:
+            target = self._index(index)
+            if doc_id not in target['ids']:
+                return {"_index": index, "_id": doc_id, "result": "not_found"}
+            docs = [doc for doc in target['docs'] if doc[0] != doc_id]
+            target['docs'] = docs
+            target['ids'] = {doc_id: n for n, (doc_id, _) in enumerate(docs)}
+            target['seq'].pop(doc_id, None)
+        return {"_index": index, "_id": doc_id, "result": "deleted"}
+
+    def get(self, index, doc_id):
+        target = self._index(index)
+        position = target['ids'].get(doc_id)
+        if position is None:
+            raise ElasticError(404, 'not_found', f"[{doc_id}] not found")
+        return {
+            "_index": index, "_id": doc_id, "_version": 1, "_seq_no": target['seq'].get(doc_id, 0), "_primary_term": 1,
+            "found": True, "_source": target['docs'][position][1]
+        }
+
+    def open_pit(self, index):
+        pit_id = uuid.uuid4().hex
+        with self._lock:
+            self.pits[pit_id] = (index, self._index(index)['docs'])
+        return {"id": pit_id}
+
+    def close_pit(self, pit_id):
+        with self._lock:
+            found = self.pits.pop(pit_id, None) is not None
+        return {"succeeded": found, "num_freed": int(found)}
+
+    def _docs_for(self, index, body):
+        pit = body.get('pit')
+        if pit:
+            snapshot = self.pits.get(pit.get('id'))
+            if snapshot is None:
+                raise ElasticError(404, 'search_context_missing_exception', "No search context found for id")
+            return snapshot
+        return index, self._index(index)['docs']
+
+    def count(self, index, body):
+        docs = self._index(index)['docs']
+        query = (body or {}).get('query')
+        return {"count": sum(1 for doc in docs if matches(doc, query)), "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0}}
+
+    def search(self, index, body):
+        started = time.perf_counter()
+        body = body or {}
+        index, docs = self._docs_for(index, body)
+        matched = [doc for doc in docs if matches(doc, body.get('query'))]
+
+        size = int(body.get('size', 10))
+        start = int(body.get('from', 0))
+        sort = body.get('sort')
+        hits = []
+        if size > 0:
+            rows = sort_docs(matched, sort)
+            if body.get('search_after') is not None:
+                rows = after(rows, sort, body['search_after'])
+            hits = [hit(index, doc, keys if sort else None, body.get('_source')) for _, doc, keys in rows[start:start + size]]
+
+        response = {
+            "timed_out": False,
+            "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+            "hits": {"total": total(len(matched), body.get('track_total_hits')), "max_score": None, "hits": hits}
+        }
+        aggs = body.get('aggs') or body.get('aggregations')
+        if aggs:
+            results, pipelines = aggregate(index, matched, aggs)
+            if pipelines:
+                raise unsupported("Top-level pipeline aggregations")
+            response["aggregations"] = results
+        if body.get('pit'):
+            response["pit_id"] = body['pit']['id']
+        response["took"] = int((time.perf_counter() - started) * 1000)
+        return response
+
+    def msearch(self, default_index, lines):
+        started = time.perf_counter()
+        responses = []
+        for header, body in zip(lines[0::2], lines[1::2]):
+            try:
+                responses.append(dict(self.search(header.get('index', default_index), body), status=200))
+            except ElasticError as e:
+                responses.append(dict(e.body()))
+        return {"took": int((time.perf_counter() - started) * 1000), "responses": responses}
+
+    def bulk(self, default_index, lines):
+        items, errors = [], False
+        position = 0
+        while position < len(lines):
+            (action, meta), = lines[position].items()
+            position += 1
+            index, doc_id = meta.get('_index', default_index), meta.get('_id')
+            try:
+                if action in ('index', 'create'):
+                    result = self.write(index, doc_id, lines[position], create=action == 'create')
+                    position += 1
+                    result['status'] = 201 if result['result'] == 'created' else 200
+                elif action == 'update':
+                    result = self.update(index, doc_id, lines[position])
+                    position += 1
+                    result['status'] = 201 if result['result'] == 'created' else 200
+                elif action == 'delete':
+                    result = dict(self.delete(index, doc_id), status=200)
+                else:
+                    raise unsupported(f"Bulk [{action}]")
+            except ElasticError as e:
+                errors = True
+                result = {"_index": index, "_id": doc_id, "status": e.status, "error": e.body()['error']}
+            items.append({action: result})
+        return {"took": 0, "errors": errors, "items": items}
+
+
+# HTTP -----------------------------------------------------------------------------------
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    cluster = None
+    latency = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._handle('HEAD')
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if not raw.strip():
+            return None, []
+        if raw.lstrip().startswith(b'{') and b'\n{' not in raw.strip():
+            return json.loads(raw), []
+        return None, [json.loads(line) for line in raw.splitlines() if line.strip()]
+
+    def _handle(self, method):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            body, lines = self._read_body()
+            status, payload = self._route(method, parts, params, body, lines)
+        except ElasticError as e:
+            status, payload = e.status, e.body()
+        except (ValueError, KeyError, TypeError) as e:
+            status, payload = 400, ElasticError(400, 'parsing_exception', str(e)).body()
+
+        if self.latency:
+            time.sleep(self.latency)
+        data = b'' if method == 'HEAD' else json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('X-Elastic-Product', 'Elasticsearch')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    def _route(self, method, parts, params, body, lines):
+        cluster = self.cluster
+        if not parts:
+            return 200, {"name": "fake-es", "cluster_name": "benchmark", "version": VERSION, "tagline": "You Know, for Search"}
+
+        if parts[0] == '_pit' and method == 'DELETE':
+            return 200, cluster.close_pit((body or {}).get('id'))
+        if parts[0] == '_search':
+            return 200, cluster.search(None, body)
+        if parts[0] == '_msearch':
+            return 200, cluster.msearch(None, lines)
+        if parts[0] == '_bulk':
+            return 200, cluster.bulk(None, lines)
+
+        index = parts[0]
+        if len(parts) == 1:
+            if method == 'HEAD':
+                return (200 if index in cluster.indices else 404), {}
+            if method == 'PUT':
+                return 200, cluster.create_index(index)
+            if method == 'GET':
+                cluster._index(index)
+                return 200, {index: {"aliases": {}, "mappings": {}, "settings": {}}}
+            raise unsupported(f"{method} /{index}")
+
+        action = parts[1]
+        if action == '_search':
+            return 200, cluster.search(index, body)
+        if action == '_count':
+            return 200, cluster.count(index, body)
+        if action == '_msearch':
+            return 200, cluster.msearch(index, lines)
+        if action == '_bulk':
+            return 200, cluster.bulk(index, lines)
+        if action == '_pit':
+            return 200, cluster.open_pit(index)
+        if action == '_refresh':
+            return 200, {"_shards": {"total": 1, "successful": 1, "failed": 0}}
+        if action == '_doc' and len(parts) == 3:
+            if method == 'GET':
+                return 200, cluster.get(index, parts[2])
+            if method == 'HEAD':
+                return (200 if parts[2] in cluster._index(index)['ids'] else 404), {}
+            if method == 'DELETE':
+                return 200, cluster.delete(index, parts[2])
+            result = cluster.write(index, parts[2], body, params.get('op_type') == 'create', params.get('if_seq_no'))
+            return (201 if result['result'] == 'created' else 200), result
+        if action == '_doc' and method == 'POST':
+            return 201, cluster.write(index, None, body)
+        if action == '_create' and len(parts) == 3:
+            return 201, cluster.write(index, parts[2], body, create=True)
+        if action == '_update' and len(parts) == 3:
+            result = cluster.update(index, parts[2], body)
+            return (201 if result['result'] == 'created' else 200), result
+        raise unsupported(f"{method} /{'/'.join(parts)}")
+
+
+def serve(cluster, host='127.0.0.1', port=9200, latency_ms=0.0):
+    """Start serving cluster on a daemon thread; returns the server (port 0 picks a free one)"""
+    handler = type('FakeElasticsearchHandler', (Handler,), {"cluster": cluster, "latency": latency_ms / 1000})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-es', daemon=True).start()
+    return server
+
+
+def build_cluster(document_count, corpus=None):
+    cluster = FakeCluster()
+    cluster.load(ANALYSIS_INDEX, (corpus or Corpus()).documents(document_count))
+    return cluster
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Elasticsearch REST API")
+    parser.add_argument('--docs', type=int, default=10000, help='synthetic cicd_analysis documents to serve')
+    parser.add_argument('--projects', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9200)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='fixed delay added to every response')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    cluster = build_cluster(args.docs, Corpus(projects=args.projects, seed=args.seed))
+    server = serve(cluster, args.host, args.port, args.latency_ms)
+    print(f"fake Elasticsearch serving {args.docs} documents on http://{args.host}:{server.server_address[1]} "
+          f"(loaded in {time.perf_counter() - started:.1f}s)", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+
+# fake_rag.py - Local stand-in for the RAG chatbot model server (port 5004)
+#
+# POST /chat answers after --first-token-ms, then one token every --token-ms. With
+# "stream": true the answer is NDJSON in the Ollama style chat_stream.py reads
+# ({"response": "...", "done": false} ... {"done": true, ...}); otherwise one JSON body.
+# GET /health answers 200. Point chatbot_api.py at it with CHATBOT_SERVICE_URL.
+#
+# Usage: python -m benchmarks.fake_rag --port 5004 [--first-token-ms 300] [--token-ms 20]
+
+import argparse
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "The latest build failed during dependency resolution because a pinned transitive package "
+    "was removed from the mirror; pin the previous release, clear the runner cache and re-run "
+    "the pipeline, then watch the deployment stage for readiness probe timeouts"
+).split()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    first_token = 0.3
+    per_token = 0.02
+    tokens = 40
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip('/') != '/health':
+            return self._json(404, {"error": "Not found"})
+        self._json(200, {"status": "healthy", "model": "fake-rag"})
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/chat':
+            return self._json(404, {"error": "Not found"})
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        words = [WORDS[n % len(WORDS)] for n in range(self.tokens)]
+        final = {
+            "intent": "failure_analysis",
+            "confidence": 0.87,
+            "session_id": body.get('session_id'),
+            "timestamp": datetime.utcnow().isoformat(),
+            "model": "fake-rag",
+            "knowledge_sources": ["cicd_analysis"],
+            "relevant_knowledge": 3
+        }
+
+        time.sleep(self.first_token)
+        if not body.get('stream'):
+            time.sleep(self.per_token * (len(words) - 1))
+            return self._json(200, dict(final, response=' '.join(words)))
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for n, word in enumerate(words):
+            if n:
+                time.sleep(self.per_token)
+            self._chunk({"response": word if n == 0 else ' ' + word, "done": False})
+        self._chunk(dict(final, done=True))
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _chunk(self, payload):
+        data = json.dumps(payload).encode('utf-8') + b'\n'
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+    def _json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(host='127.0.0.1', port=5004, first_token_ms=300, token_ms=20, tokens=40):
+    """Start serving on a daemon thread; returns the server (port 0 picks a free one)"""
+    handler = type('FakeRagHandler', (Handler,), {
+        "first_token": first_token_ms / 1000, "per_token": token_ms / 1000, "tokens": tokens
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-rag', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the RAG chatbot model server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5004)
+    parser.add_argument('--first-token-ms', type=float, default=300)
+    parser.add_argument('--token-ms', type=float, default=20)
+    parser.add_argument('--tokens', type=int, default=40)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.first_token_ms, args.token_ms, args.tokens)
+    print(f"fake RAG service on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,415 @@
+
+# run.py - Offline load benchmark of the dashboard and chatbot services
+#
+# Starts the Elasticsearch stand-in (fake_es.py) loaded with synthetic cicd_analysis
+# documents and the RAG stand-in (fake_rag.py), starts each service against them with
+# ROLLUP_ENABLED=false, then drives every scenario in scenarios.py with --concurrency
+# keep-alive clients and reports throughput and p50/p95/p99 latency per route.
+#
+# With --rollup both (the default) each service that has a rollup is then restarted with
+# ROLLUP_ENABLED=true. Once the rollup index is built, its rollup scenarios (/projects)
+# run again and are reported as "<service> <scenario> [rollup]". db-asgi only reads the
+# rollup, so it needs backend or db to be benchmarked before it.
+#
+# No cloud cluster or model server is needed, and the data is the same on every run, so
+# results are comparable between commits on the same machine. Absolute numbers include
+# the stand-ins' own cost (a Python engine, not Lucene); use them to track changes.
+#
+# Usage:
+#   python -m benchmarks.run                              all services, 10k documents
+#   python -m benchmarks.run --services db --docs 50000 --requests 500 --concurrency 16
+#   python -m benchmarks.run --services db,db-asgi --scenario projects --rollup on
+#   python -m benchmarks.run --output before.json
+#   python -m benchmarks.run --baseline before.json --fail-on-regression
+#
+# The services' own requirements (Flask, elasticsearch, ...) must be installed; the
+# ASGI variant is benchmarked only when uvicorn is.
+
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from benchmarks.scenarios import SERVICES
+from benchmarks.synthetic import Corpus
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+START_TIMEOUT = 90
+ROLLUP_TIMEOUT = 300
+# Passed to the services so the runner can tell when the rollup has been built
+ROLLUP_STATE_INDEX = 'cicd_analysis_rollup_state'
+REQUEST_TIMEOUT = 60
+
+LAUNCH = "import {module}; {module}.app.run(host='127.0.0.1', port={port}, threaded=True)"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+
+class Processes:
+    """Child processes started for a run; output goes to log files in log_dir"""
+
+    def __init__(self, log_dir):
+        self.log_dir = log_dir
+        self.children = []
+
+    def start(self, name, args, cwd=ROOT, env=None):
+        log_path = os.path.join(self.log_dir, f"{name}.log")
+        log = open(log_path, 'w')
+        process = subprocess.Popen(
+            args, cwd=cwd, env=dict(os.environ, PYTHONUNBUFFERED='1', **(env or {})),
+            stdout=log, stderr=subprocess.STDOUT
+        )
+        self.children.append((name, process, log, log_path))
+        return process, log_path
+
+    def stop(self):
+        for _, process, log, _ in reversed(self.children):
+            if process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            log.close()
+
+
+def wait_until_ready(name, process, log_path, port, path):
+    """Poll path until it answers 200; raises with the tail of the log if the process dies"""
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            with open(log_path) as log:
+                tail = ''.join(log.readlines()[-20:])
+            raise RuntimeError(f"{name} exited with code {process.returncode}:\n{tail}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', path)
+            status = connection.getresponse().status
+            connection.close()
+            if status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{name} was not ready on {path} within {START_TIMEOUT}s; see {log_path}")
+
+
+def rollup_built(es_port):
+    """True once a service has folded the stand-in's documents into the rollup index"""
+    try:
+        connection = http.client.HTTPConnection('127.0.0.1', es_port, timeout=5)
+        connection.request('GET', f'/{ROLLUP_STATE_INDEX}/_doc/watermark')
+        response = connection.getresponse()
+        document = json.loads(response.read() or b'{}')
+        connection.close()
+    except (OSError, ValueError):
+        return False
+    return response.status == 200 and document.get('_source', {}).get('watermark') is not None
+
+
+def wait_for_rollup(name, process, log_path, es_port):
+    """Wait for the rollup the service builds on startup; raises if it dies or never finishes"""
+    deadline = time.monotonic() + ROLLUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} exited with code {process.returncode} while building the rollup; see {log_path}")
+        if rollup_built(es_port):
+            return
+        time.sleep(0.5)
+    raise RuntimeError(f"{name} did not build the rollup within {ROLLUP_TIMEOUT}s; see {log_path}")
+
+
+def start_service(processes, name, service, environment, rollup_es_port=None):
+    """Start service and wait until it is ready (and, given rollup_es_port, its rollup is built)"""
+    port = free_port()
+    cwd = os.path.join(ROOT, service.directory)
+    if service.asgi:
+        args = [sys.executable, '-m', 'uvicorn', f'{service.module}:app', '--host', '127.0.0.1', '--port', str(port),
+                '--log-level', 'warning', '--workers', os.environ.get('WEB_CONCURRENCY', '4')]
+    else:
+        args = [sys.executable, '-c', LAUNCH.format(module=service.module, port=port)]
+    process, log_path = processes.start(name, args, cwd, dict(environment, PORT=str(port)))
+    wait_until_ready(name, process, log_path, port, service.ready_path)
+    if rollup_es_port is not None:
+        wait_for_rollup(name, process, log_path, rollup_es_port)
+    return port
+
+
+class Worker(threading.Thread):
+    """One keep-alive client sending requests until the shared counter runs out"""
+
+    def __init__(self, port, scenario, corpus, doc_count, next_index, etags, samples):
+        super().__init__(daemon=True)
+        self.port = port
+        self.scenario = scenario
+        self.corpus = corpus
+        self.doc_count = doc_count
+        self.next_index = next_index
+        self.etags = etags
+        self.samples = samples
+        self.connection = None
+
+    def run(self):
+        while True:
+            index = self.next_index()
+            if index is None:
+                break
+            self.samples.append(self.send(index))
+        if self.connection is not None:
+            self.connection.close()
+
+    def send(self, index):
+        rng = random.Random(f"{self.scenario.name}:{index}")
+        method, path, body, headers = self.scenario.build(rng, self.corpus, self.doc_count)
+        if self.scenario.revalidate and path in self.etags:
+            headers['If-None-Match'] = self.etags[path]
+
+        started = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=REQUEST_TIMEOUT)
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            first = response.read(1)
+            first_byte = time.perf_counter() - started
+            size = len(first) + len(response.read())
+            elapsed = time.perf_counter() - started
+            if response.getheader('ETag'):
+                self.etags[path] = response.getheader('ETag')
+            if response.will_close:
+                self.connection.close()
+                self.connection = None
+            return {"status": response.status, "seconds": elapsed, "first_byte": first_byte, "bytes": size}
+        except (OSError, http.client.HTTPException) as e:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+            return {"status": type(e).__name__, "seconds": time.perf_counter() - started, "first_byte": None, "bytes": 0}
+
+
+def run_scenario(port, scenario, corpus, doc_count, requests, concurrency, warmup):
+    etags = {}
+    # Warm up caches and connection pools the way a running service would be
+    for index in range(warmup):
+        Worker(port, scenario, corpus, doc_count, None, etags, []).send(-1 - index)
+
+    total = max(1, int(requests * scenario.share))
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def next_index():
+        with lock:
+            return next(counter, None)
+
+    samples = []
+    workers = [
+        Worker(port, scenario, corpus, doc_count, next_index, etags, samples)
+        for _ in range(min(concurrency, total))
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    wall = time.perf_counter() - started
+    return summarize(samples, wall)
+
+
+def summarize(samples, wall):
+    ok = [sample for sample in samples if sample["status"] in (200, 304)]
+    latencies = sorted(sample["seconds"] * 1000 for sample in ok)
+    first_bytes = sorted(sample["first_byte"] * 1000 for sample in ok if sample["first_byte"] is not None)
+    statuses = {}
+    for sample in samples:
+        statuses[str(sample["status"])] = statuses.get(str(sample["status"]), 0) + 1
+
+    def rounded(value):
+        return round(value, 2) if value is not None else None
+
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "statuses": statuses,
+        "seconds": round(wall, 3),
+        "rps": round(len(samples) / wall, 1) if wall else None,
+        "p50_ms": rounded(percentile(latencies, 0.50)),
+        "p95_ms": rounded(percentile(latencies, 0.95)),
+        "p99_ms": rounded(percentile(latencies, 0.99)),
+        "max_ms": rounded(latencies[-1] if latencies else None),
+        "ttfb_p50_ms": rounded(percentile(first_bytes, 0.50)),
+        "avg_bytes": round(sum(sample["bytes"] for sample in ok) / len(ok)) if ok else 0
+    }
+
+
+def compare(result, baseline, threshold):
+    """' +12.3%' style p95 change against the baseline; flags a regression beyond threshold percent"""
+    if not baseline or not baseline.get("p95_ms") or result.get("p95_ms") is None:
+        return "", False
+    change = (result["p95_ms"] - baseline["p95_ms"]) * 100 / baseline["p95_ms"]
+    regressed = change > threshold or result["errors"] > baseline.get("errors", 0)
+    return f"{change:+7.1f}%{' ⚠️' if regressed else ''}", regressed
+
+
+def print_row(key, result, delta=""):
+    print(
+        f"{key:<42} {result['rps'] or 0:>8.1f} {result['p50_ms'] or 0:>8.1f} {result['p95_ms'] or 0:>8.1f} "
+        f"{result['p99_ms'] or 0:>8.1f} {result['ttfb_p50_ms'] or 0:>8.1f} {result['errors']:>6} {delta}"
+    )
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline load benchmark of the dashboard and chatbot services")
+    parser.add_argument('--services', default=','.join(SERVICES), help=f"comma separated, from: {', '.join(SERVICES)}")
+    parser.add_argument('--scenario', help='only scenarios whose name contains this text')
+    parser.add_argument('--rollup', choices=['off', 'on', 'both'], default='both',
+                        help='run the services with the /projects rollup disabled, enabled, or both in turn')
+    parser.add_argument('--docs', type=int, default=10000, help='synthetic cicd_analysis documents')
+    parser.add_argument('--projects', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario (scaled by its share)')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=5, help='unmeasured requests before each scenario')
+    parser.add_argument('--es-latency-ms', type=float, default=0.0, help='delay the stand-in adds to every Elasticsearch response')
+    parser.add_argument('--rag-first-token-ms', type=float, default=300)
+    parser.add_argument('--rag-token-ms', type=float, default=20)
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--baseline', help='results JSON from an earlier run to compare p95 against')
+    parser.add_argument('--threshold', type=float, default=10.0, help='p95 increase (percent) counted as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    names = [name.strip() for name in args.services.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SERVICES]
+    if unknown:
+        sys.exit(f"Unknown services: {', '.join(unknown)}")
+    if any(SERVICES[name].asgi for name in names) and importlib.util.find_spec('uvicorn') is None:
+        print("⏭️  uvicorn is not installed; skipping the ASGI service")
+        names = [name for name in names if not SERVICES[name].asgi]
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    corpus = Corpus(projects=args.projects, seed=args.seed)
+    log_dir = tempfile.mkdtemp(prefix='alpha-ui-bench-')
+    processes = Processes(log_dir)
+    results = {}
+    regressions = []
+    try:
+        es_port, rag_port = free_port(), free_port()
+        print(f"📦 Loading {args.docs:,} synthetic documents into the Elasticsearch stand-in...")
+        process, log_path = processes.start('fake_es', [
+            sys.executable, '-m', 'benchmarks.fake_es', '--docs', str(args.docs), '--projects', str(args.projects),
+            '--seed', str(args.seed), '--port', str(es_port), '--latency-ms', str(args.es_latency_ms)
+        ])
+        wait_until_ready('fake_es', process, log_path, es_port, '/')
+        process, log_path = processes.start('fake_rag', [
+            sys.executable, '-m', 'benchmarks.fake_rag', '--port', str(rag_port),
+            '--first-token-ms', str(args.rag_first_token_ms), '--token-ms', str(args.rag_token_ms)
+        ])
+        wait_until_ready('fake_rag', process, log_path, rag_port, '/health')
+
+        environment = {
+            'ELASTICSEARCH_URL': f'http://127.0.0.1:{es_port}',
+            'ELASTICSEARCH_API_KEY': 'benchmark',
+            'ROLLUP_ENABLED': 'false',
+            'ROLLUP_STATE_INDEX': ROLLUP_STATE_INDEX,
+            'CHATBOT_SERVICE_URL': f'http://127.0.0.1:{rag_port}'
+        }
+        # Fold everything loaded so far; the stand-in's documents are already settled
+        rollup_environment = dict(environment, ROLLUP_ENABLED='true', ROLLUP_SETTLE_SECONDS='0')
+        modes = {'off': [False], 'on': [True], 'both': [False, True]}[args.rollup]
+
+        print(f"\n{'scenario':<42} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ttfb ms':>8} {'errors':>6}")
+        runs = [(name, rollup) for name in names for rollup in modes if not rollup or SERVICES[name].rollup]
+        for name, rollup in runs:
+            service = SERVICES[name]
+            scenarios = [
+                s for s in service.scenarios
+                if (not args.scenario or args.scenario in s.name) and (s.rollup or not rollup)
+            ]
+            if not scenarios:
+                continue
+            label = f"{name}-rollup" if rollup else name
+            if rollup and service.rollup == 'read' and not rollup_built(es_port):
+                print(f"⏭️  {label}: reads the rollup built by backend or db; benchmark one of them first")
+                continue
+            try:
+                if rollup:
+                    port = start_service(processes, label, service, rollup_environment, es_port)
+                else:
+                    port = start_service(processes, label, service, environment)
+            except RuntimeError as e:
+                print(f"❌ {label}: {e}")
+                continue
+            for scenario in scenarios:
+                key = f"{name} {scenario.name}" + (" [rollup]" if rollup else "")
+                result = run_scenario(port, scenario, corpus, args.docs, args.requests, args.concurrency, args.warmup)
+                results[key] = result
+                delta, regressed = compare(result, baseline.get(key), args.threshold)
+                if regressed:
+                    regressions.append(key)
+                print_row(key, result, delta)
+    finally:
+        processes.stop()
+
+    print(f"\n📁 Service logs: {log_dir}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                "meta": {
+                    "started": datetime.utcnow().isoformat(),
+                    "commit": git_commit(),
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "cpus": os.cpu_count(),
+                    "docs": args.docs,
+                    "projects": args.projects,
+                    "seed": args.seed,
+                    "requests": args.requests,
+                    "concurrency": args.concurrency,
+                    "es_latency_ms": args.es_latency_ms
+                },
+                "results": results
+            }, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+    if regressions:
+        print(f"⚠️  p95 regressed by more than {args.threshold:g}% (or errors increased): {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
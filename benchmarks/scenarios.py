@@ -0,0 +1,208 @@
+
+# scenarios.py - Request mixes for every HTTP route of the three Flask services
+#
+# A scenario builds one request from a seeded random.Random and the Corpus the stand-in
+# Elasticsearch was loaded from, so projects, tools, environments, servers and document
+# ids always exist. Scenarios marked revalidate resend the ETag they were given as
+# If-None-Match (a dashboard polling unchanged data); share scales the request count for
+# routes that are expensive by design (exports) or slow by design (chat). Scenarios marked
+# rollup read the rollup index when ROLLUP_ENABLED=true and are run in both rollup modes.
+#
+# Server-Sent Event streams (/events, /api/projects/<name>/events) stay open until the
+# client leaves and are not load tested here.
+
+import json
+from urllib.parse import quote, urlencode
+
+from benchmarks.synthetic import LOG_TYPES, SEVERITIES
+
+
+class Scenario:
+    def __init__(self, name, path, method='GET', body=None, headers=None, share=1.0, revalidate=False, rollup=False):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.body = body
+        self.headers = headers or {}
+        self.share = share
+        self.revalidate = revalidate
+        self.rollup = rollup
+
+    def build(self, rng, corpus, doc_count):
+        """(method, path, body bytes or None, headers) for one request"""
+        path = self.path(rng, corpus, doc_count) if callable(self.path) else self.path
+        headers = dict(self.headers)
+        body = None
+        if self.body is not None:
+            payload = self.body(rng, corpus, doc_count) if callable(self.body) else self.body
+            body = json.dumps(payload).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        return self.method, path, body, headers
+
+
+class Service:
+    """rollup is 'refresh' for services that build the rollup index themselves, 'read' for
+    services that only read one built by another service, None for services without one"""
+
+    def __init__(self, directory, module, ready_path, scenarios, asgi=False, rollup=None):
+        self.directory = directory
+        self.module = module
+        self.ready_path = ready_path
+        self.scenarios = scenarios
+        self.asgi = asgi
+        self.rollup = rollup
+
+
+def project(rng, corpus):
+    # Busy projects are looked at more often, as they produce most analyses
+    weights = [1 / (rank + 1) for rank in range(len(corpus.projects))]
+    return rng.choices(corpus.projects, weights)[0]
+
+
+def tool_project(rng, corpus):
+    name = project(rng, corpus)
+    return rng.choice(corpus.project_tools[name]), name
+
+
+def environment_server(rng, corpus):
+    environment = rng.choice(list(corpus.servers))
+    return environment, rng.choice(corpus.servers[environment])
+
+
+def doc_id(rng, doc_count):
+    return f"analysis-{rng.randrange(doc_count):08d}"
+
+
+def q(value):
+    return quote(value, safe='')
+
+
+def _backend_logs(rng, corpus, doc_count):
+    environment, server = environment_server(rng, corpus)
+    params = {"project": project(rng, corpus), "limit": rng.choice([20, 50, 100])}
+    if rng.random() < 0.5:
+        params["environment"] = environment
+    if rng.random() < 0.3:
+        params["log_type"] = rng.choice(LOG_TYPES)
+    if rng.random() < 0.3:
+        params["severity"] = rng.choice(SEVERITIES)
+    return f"/api/logs?{urlencode(params)}"
+
+
+def _backend_export(rng, corpus, doc_count):
+    environment, server = environment_server(rng, corpus)
+    params = {"project": project(rng, corpus), "environment": environment, "format": rng.choice(['ndjson', 'csv'])}
+    return f"/api/logs/export?{urlencode(params)}"
+
+
+def _db_servers(rng, corpus, doc_count):
+    tool, name = tool_project(rng, corpus)
+    return f"/servers/{q(tool)}/{q(name)}/{q(rng.choice(list(corpus.servers)))}"
+
+
+def _db_logs(rng, corpus, doc_count):
+    environment, server = environment_server(rng, corpus)
+    return f"/logs/{q(environment)}/{q(server)}?limit={rng.choice([50, 100])}"
+
+
+def _db_stages(rng, corpus, doc_count):
+    tool, name = tool_project(rng, corpus)
+    path = f"/pipeline-stages/{q(tool)}/{q(name)}"
+    if rng.random() < 0.5:
+        environment, server = environment_server(rng, corpus)
+        path += f"/{q(environment)}" + (f"/{q(server)}" if rng.random() < 0.5 else "")
+    return path
+
+
+def _db_batch(rng, corpus, doc_count):
+    """What the project page loads at once"""
+    tool, name = tool_project(rng, corpus)
+    environment = rng.choice(list(corpus.servers))
+    params = {"tool": tool, "project": name}
+    return {"requests": {
+        "metrics": {"endpoint": "project-metrics", "params": params},
+        "analyses": {"endpoint": "project-analyses", "params": params},
+        "environments": {"endpoint": "environments", "params": params},
+        "servers": {"endpoint": "servers", "params": dict(params, environment=environment)},
+        "stages": {"endpoint": "pipeline-stages", "params": params}
+    }}
+
+
+def _tool_project_path(prefix):
+    def path(rng, corpus, doc_count):
+        tool, name = tool_project(rng, corpus)
+        return f"{prefix}/{q(tool)}/{q(name)}"
+    return path
+
+
+QUESTIONS = [
+    "Why did the last build fail?",
+    "What are the most common failures this week?",
+    "Which servers have the most errors?",
+    "How do I fix the dependency resolution failure?"
+]
+
+
+def _chat(stream, cached):
+    def body(rng, corpus, doc_count):
+        session = f"bench-{rng.getrandbits(48):012x}"
+        if cached:
+            # A handful of repeated questions: answered from answer_cache.py after the first
+            return {"message": rng.choice(QUESTIONS), "session_id": session, "stream": stream}
+        message = f"Why did {project(rng, corpus)} fail in {rng.choice(list(corpus.servers))}? ({rng.getrandbits(32):x})"
+        return {"message": message, "session_id": session, "stream": stream, "cache": False}
+    return body
+
+
+BACKEND = [
+    Scenario('health', '/api/health'),
+    Scenario('live', '/api/live'),
+    Scenario('ready', '/api/ready'),
+    Scenario('projects', '/api/projects', rollup=True),
+    Scenario('projects (revalidate)', '/api/projects', revalidate=True, rollup=True),
+    Scenario('project details', lambda rng, corpus, n: f"/api/projects/{q(project(rng, corpus))}"),
+    Scenario('environments', lambda rng, corpus, n: f"/api/projects/{q(project(rng, corpus))}/environments"),
+    Scenario('servers', lambda rng, corpus, n: (
+        f"/api/projects/{q(project(rng, corpus))}/environments/{q(rng.choice(list(corpus.servers)))}/servers"
+    )),
+    Scenario('logs', _backend_logs),
+    Scenario('logs (revalidate)', _backend_logs, revalidate=True),
+    Scenario('log', lambda rng, corpus, n: f"/api/logs/{doc_id(rng, n)}"),
+    Scenario('logs export', _backend_export, share=0.1),
+    Scenario('metrics', '/metrics')
+]
+
+DB_SERVICE = [
+    Scenario('health', '/health'),
+    Scenario('live', '/live'),
+    Scenario('ready', '/ready'),
+    Scenario('projects', '/projects', rollup=True),
+    Scenario('projects (revalidate)', '/projects', revalidate=True, rollup=True),
+    Scenario('project metrics', _tool_project_path('/project-metrics')),
+    Scenario('project metrics (revalidate)', _tool_project_path('/project-metrics'), revalidate=True),
+    Scenario('project analyses', _tool_project_path('/project-analyses')),
+    Scenario('environments', _tool_project_path('/environments')),
+    Scenario('servers', _db_servers),
+    Scenario('logs', _db_logs),
+    Scenario('analysis', lambda rng, corpus, n: f"/analysis/{doc_id(rng, n)}"),
+    Scenario('pipeline stages', _db_stages),
+    Scenario('batch', '/batch', method='POST', body=_db_batch),
+    Scenario('metrics', '/metrics')
+]
+
+CHATBOT = [
+    Scenario('health', '/health'),
+    Scenario('live', '/live'),
+    Scenario('ready', '/ready'),
+    Scenario('chat', '/chat', method='POST', body=_chat(stream=False, cached=False), share=0.25),
+    Scenario('chat (stream)', '/chat', method='POST', body=_chat(stream=True, cached=False), share=0.25),
+    Scenario('chat (cached)', '/chat', method='POST', body=_chat(stream=False, cached=True)),
+    Scenario('metrics', '/metrics')
+]
+
+SERVICES = {
+    'backend': Service('alpha-ui-main', 'backend_fixed', '/api/ready', BACKEND, rollup='refresh'),
+    'db': Service('chatbot/services', 'db_service_ui', '/ready', DB_SERVICE, rollup='refresh'),
+    'db-asgi': Service('chatbot/services', 'db_service_asgi', '/ready', DB_SERVICE, asgi=True, rollup='read'),
+    'chat': Service('chatbot/services', 'chatbot_api', '/ready', CHATBOT)
+}
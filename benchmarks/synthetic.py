@@ -0,0 +1,131 @@
+
+# synthetic.py - Deterministic synthetic cicd_analysis documents
+#
+# Documents carry every field the dashboards read: the project/tool/environment/server
+# dimensions, log_type pipeline stages, status and severity, counts and scores, build
+# durations, resolution estimates in the formats seen in production, and the JSON-encoded
+# full_synthesis / llm_response blobs. The same seed always gives the same corpus, so runs
+# against different commits are comparable.
+#
+# Usage: python -m benchmarks.synthetic [document_count] > analyses.ndjson
+
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+
+TOOLS = ['jenkins', 'github-actions', 'gitlab-ci', 'azure-devops']
+ENVIRONMENTS = ['dev', 'qa', 'staging', 'production']
+LOG_TYPES = ['git-checkout', 'build', 'test', 'sonarqube-issues', 'deployment']
+SEVERITIES = ['low', 'medium', 'high', 'critical']
+FAILURE_CATEGORIES = ['dependency', 'configuration', 'test-failure', 'infrastructure', 'code-quality', 'network']
+COMPONENTS = ['api', 'db', 'cache', 'queue', 'auth', 'ui', 'scheduler', 'storage']
+COMPLEXITY = ['low', 'medium', 'high']
+RESOLUTION_ESTIMATES = [
+    '15 minutes', '30 minutes', '45 minutes', '10-15 minutes', '30-60 minutes', '1 hour', '2 hours',
+    '4 hours', '1-2 hours', '2-4 hours', '4-8 hours', '1 day', '1-2 days', '1 hour 30 minutes',
+    'approximately 2 hours', 'Unknown'
+]
+SUMMARIES = [
+    "Build failed because a transitive dependency could not be resolved",
+    "Unit tests failed after a change to the serialization layer",
+    "Deployment rolled back after readiness probes timed out",
+    "Static analysis reported new blocker issues in the payment module",
+    "Checkout failed because the repository mirror was unreachable"
+]
+
+
+class Corpus:
+    """Dimension values shared by the generated documents and the benchmark scenarios"""
+
+    def __init__(self, projects=40, servers_per_environment=6, seed=42):
+        rng = random.Random(seed)
+        self.seed = seed
+        self.projects = [f"project-{n:02d}" for n in range(1, projects + 1)]
+        # Each project is built by one or two tools
+        self.project_tools = {
+            project: rng.sample(TOOLS, rng.choice([1, 1, 2])) for project in self.projects
+        }
+        self.servers = {
+            environment: [f"{environment}-server-{n}" for n in range(1, servers_per_environment + 1)]
+            for environment in ENVIRONMENTS
+        }
+
+    def documents(self, count, days=30, end=None):
+        """Yield count (id, source) pairs spread over the last days days"""
+        rng = random.Random(self.seed + count)
+        end = end or datetime(2025, 1, 31, 12, 0, 0)
+        span = days * 86400
+        # A few busy projects produce most analyses, as in production
+        weights = [1 / (rank + 1) for rank in range(len(self.projects))]
+
+        for n in range(count):
+            project = rng.choices(self.projects, weights)[0]
+            tool = rng.choice(self.project_tools[project])
+            environment = rng.choices(ENVIRONMENTS, [4, 3, 2, 1])[0]
+            timestamp = end - timedelta(seconds=rng.randrange(span))
+            yield f"analysis-{n:08d}", self.document(rng, project, tool, environment, timestamp)
+
+    def document(self, rng, project, tool, environment, timestamp):
+        status = rng.choices(['success', 'warning', 'error'], [6, 2, 2])[0]
+        severity = 'low' if status == 'success' else rng.choice(SEVERITIES)
+        category = rng.choice(FAILURE_CATEGORIES)
+        summary = rng.choice(SUMMARIES)
+        estimate = rng.choice(RESOLUTION_ESTIMATES)
+
+        synthesis = {
+            "failure_summary": summary,
+            "root_cause": {
+                "category": category,
+                "description": f"{summary}; first seen after commit {rng.getrandbits(40):010x}",
+                "evidence": [f"log line {rng.randint(100, 9999)}" for _ in range(rng.randint(1, 4))]
+            },
+            "fix_suggestion": {
+                "steps": [f"Step {step}: check the {category} configuration and re-run" for step in range(1, rng.randint(2, 6))],
+                "estimated_effort": estimate
+            },
+            "rollback_plan": {"required": status == 'error', "target": f"v1.{rng.randint(0, 40)}.{rng.randint(0, 9)}"},
+            "auto_fix": {"status": rng.choice(['available', 'applied', 'not_available'])}
+        }
+        llm_response = dict(
+            synthesis,
+            severity_level=severity,
+            confidence_score=round(rng.uniform(0.5, 0.99), 2)
+        )
+
+        return {
+            "project": project,
+            "tool": tool,
+            "environment": environment,
+            "server": rng.choice(self.servers[environment]),
+            "log_type": rng.choice(LOG_TYPES),
+            "status": status,
+            "severity_level": severity,
+            "analysis_timestamp": timestamp.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z',
+            "correlation_id": f"{rng.getrandbits(64):016x}",
+            "affected_components": rng.sample(COMPONENTS, rng.randint(1, 3)),
+            "failure_category": category,
+            "deployment_success": status != 'error',
+            "error_count": 0 if status == 'success' else rng.randint(1, 25),
+            "warning_count": rng.randint(0, 40),
+            "business_impact_score": round(rng.random(), 3),
+            "confidence_score": llm_response["confidence_score"],
+            "executive_summary": summary,
+            "resolution_time_estimate": estimate,
+            "technical_complexity": rng.choice(COMPLEXITY),
+            "monitoring_recommendations": f"Alert on {category} failures in the {environment} pipeline",
+            "build_duration_seconds": rng.randint(45, 1800),
+            "processing_time_ms": rng.choice(range(200, 5000, 50)),
+            "full_synthesis": json.dumps(synthesis),
+            "llm_response": json.dumps(llm_response)
+        }
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    for doc_id, source in Corpus().documents(count):
+        sys.stdout.write(json.dumps(dict(source, _id=doc_id)) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+
+# admission.py - Bounded concurrency with a fair queue for calls to the chatbot model server
+#
+# At most max_concurrent chat messages are forwarded to the RAG service at once. Others
+# wait in a queue that is served round-robin across sessions, so one user sending a burst
+# of messages cannot delay everyone else. Requests are rejected immediately instead of
+# piling up threads when:
+#   - their session already has max_per_session messages waiting    -> 429
+#   - the queue holds max_queue messages                              -> 503
+#   - no slot frees up within max_wait seconds                        -> 503
+# Each rejection carries a Retry-After estimate based on recent service times.
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import metrics
+
+CHAT_MAX_CONCURRENT = int(os.environ.get('CHAT_MAX_CONCURRENT', 4))
+CHAT_MAX_QUEUE = int(os.environ.get('CHAT_MAX_QUEUE', 32))
+CHAT_MAX_PER_SESSION = int(os.environ.get('CHAT_MAX_PER_SESSION', 2))
+CHAT_MAX_WAIT = float(os.environ.get('CHAT_MAX_WAIT', 20))
+
+QUEUE_WAIT = metrics.Histogram('chat_queue_wait_seconds', 'Time a chat message waited for a model server slot', ('outcome',))
+REJECTED = metrics.Counter('chat_rejected_total', 'Chat messages turned away by admission control', ('reason',))
+
+
+class Rejected(Exception):
+    """A request was not admitted; status is 429 or 503"""
+
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    __slots__ = ('session', 'granted', 'event')
+
+    def __init__(self, session):
+        self.session = session
+        self.granted = False
+        self.event = threading.Event()
+
+
+class AdmissionController:
+    """Semaphore with a per-session round-robin wait queue"""
+
+    def __init__(self, max_concurrent=CHAT_MAX_CONCURRENT, max_queue=CHAT_MAX_QUEUE,
+                 max_per_session=CHAT_MAX_PER_SESSION, max_wait=CHAT_MAX_WAIT):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_per_session = max_per_session
+        self.max_wait = max_wait
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queued = 0
+        # session -> waiting tickets; sessions take turns in insertion order
+        self._waiting = OrderedDict()
+        # Moving average of how long an admitted request holds its slot
+        self._service_seconds = 5.0
+
+        self._admitted = 0
+        self._max_queued = 0
+
+    def acquire(self, session):
+        """Wait for a slot; returns a release() callable or raises Rejected"""
+        started = time.monotonic()
+        with self._lock:
+            if self._active < self.max_concurrent and not self._queued:
+                return self._admit(started, 'immediate')
+
+            waiting = self._waiting.get(session)
+            if waiting is not None and len(waiting) >= self.max_per_session:
+                raise self._reject('session', 429, "Too many messages waiting for this session")
+            if self._queued >= self.max_queue:
+                raise self._reject('queue_full', 503, "Chatbot is busy, please retry shortly")
+
+            ticket = _Ticket(session)
+            self._waiting.setdefault(session, deque()).append(ticket)
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+
+        ticket.event.wait(self.max_wait)
+
+        with self._lock:
+            if ticket.granted:
+                # The slot was counted as active when it was handed over
+                return self._admit(started, 'queued', counted=True)
+            waiting = self._waiting[session]
+            waiting.remove(ticket)
+            if not waiting:
+                del self._waiting[session]
+            self._queued -= 1
+            QUEUE_WAIT.observe(time.monotonic() - started, outcome='timeout')
+            raise self._reject('timeout', 503, "Timed out waiting for the chatbot")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": self._active,
+                "max_concurrent": self.max_concurrent,
+                "queued": self._queued,
+                "max_queue": self.max_queue,
+                "max_queued_seen": self._max_queued,
+                "waiting_sessions": len(self._waiting),
+                "admitted": self._admitted,
+                "avg_service_seconds": round(self._service_seconds, 3)
+            }
+
+    def _admit(self, started, outcome, counted=False):
+        if not counted:
+            self._active += 1
+        self._admitted += 1
+        QUEUE_WAIT.observe(time.monotonic() - started, outcome=outcome)
+        admitted_at = time.monotonic()
+        released = []
+
+        def release():
+            if released:
+                return
+            released.append(True)
+            with self._lock:
+                self._service_seconds = 0.8 * self._service_seconds + 0.2 * (time.monotonic() - admitted_at)
+                self._active -= 1
+                self._hand_over()
+
+        return release
+
+    def _hand_over(self):
+        """Give free slots to the next waiting sessions, one message per session per turn"""
+        while self._active < self.max_concurrent and self._waiting:
+            session, waiting = next(iter(self._waiting.items()))
+            ticket = waiting.popleft()
+            if waiting:
+                self._waiting.move_to_end(session)
+            else:
+                del self._waiting[session]
+            self._queued -= 1
+            self._active += 1
+            ticket.granted = True
+            ticket.event.set()
+
+    def _reject(self, reason, status, message):
+        REJECTED.inc(reason=reason)
+        # Time for the queue ahead to drain through the available slots
+        retry_after = math.ceil(self._service_seconds * (self._queued + 1) / self.max_concurrent)
+        return Rejected(message, status, max(1, retry_after))
+
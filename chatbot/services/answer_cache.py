@@ -0,0 +1,145 @@
+
+# answer_cache.py - Cache of chatbot answers for repeated questions
+#
+# Answers are keyed on the normalized question plus a version stamp of cicd_analysis
+# (match count + newest analysis_timestamp, see conditional.version_tag). When a new
+# analysis is indexed the stamp moves, so every older answer stops matching and ages
+# out of the LRU; nothing has to be invalidated explicitly. Answers do not depend on
+# the session, so one user's question serves everyone asking the same thing.
+#
+# Only the wording is normalized (case, Unicode forms, punctuation, contractions and
+# filler words); questions that mean the same thing in different words still go to
+# the model.
+
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+ANSWER_CACHE_ENABLED = os.environ.get('ANSWER_CACHE_ENABLED', 'true').lower() == 'true'
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get('ANSWER_CACHE_MAX_ENTRIES', 1000))
+# Upper bound on an answer's age even while the data does not change
+ANSWER_CACHE_TTL = int(os.environ.get('ANSWER_CACHE_TTL', 3600))
+# How long a fetched data version is trusted before asking Elasticsearch again
+DATA_VERSION_TTL = float(os.environ.get('DATA_VERSION_TTL', 10))
+
+CONTRACTIONS = {
+    "what's": "what is", "where's": "where is", "why's": "why is", "how's": "how is",
+    "who's": "who is", "it's": "it is", "didn't": "did not", "doesn't": "does not",
+    "don't": "do not", "isn't": "is not", "aren't": "are not", "wasn't": "was not",
+    "can't": "cannot", "won't": "will not"
+}
+FILLER_WORDS = frozenset({'a', 'an', 'the', 'please', 'pls', 'hi', 'hey', 'hello', 'thanks', 'thank'})
+
+
+def normalize_message(message):
+    """Canonical form of a question: 'Why did the build FAIL for project X?' -> 'why did build fail for project x'"""
+    text = unicodedata.normalize('NFKC', message).casefold().replace('’', "'")
+    words = []
+    for word in text.split():
+        word = CONTRACTIONS.get(word.strip('?!.,;:'), word)
+        # Keep characters that occur inside names (alpha-ui, v1.2, api/v2, #123)
+        word = re.sub(r"[^\w\s\-./#]", ' ', word)
+        for part in word.split():
+            part = part.strip('.-/')
+            if part and part not in FILLER_WORDS:
+                words.append(part)
+    return ' '.join(words)
+
+
+class DataVersion:
+    """The current data version, fetched at most once per ttl; None while unavailable"""
+
+    def __init__(self, fetch, ttl=DATA_VERSION_TTL):
+        self.fetch = fetch
+        self.ttl = ttl
+        self._value = None
+        self._fetched_at = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        with self._lock:
+            if self._fetched_at is not None and time.monotonic() - self._fetched_at < self.ttl:
+                return self._value
+            try:
+                self._value = self.fetch()
+            except Exception:
+                # An unknown version must not match answers cached under an old one
+                self._value = None
+            self._fetched_at = time.monotonic()
+            return self._value
+
+
+class AnswerCache:
+    """Bounded LRU of formatted answers keyed on (normalized question, data version)"""
+
+    def __init__(self, data_version, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl=ANSWER_CACHE_TTL, enabled=ANSWER_CACHE_ENABLED):
+        self.data_version = data_version
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._bypassed = 0
+        self._stored = 0
+        self._evictions = 0
+
+    def key(self, message, use_cache=True):
+        """Cache key for message, or None when the cache must not be used for it"""
+        if not self.enabled or not use_cache:
+            with self._lock:
+                self._bypassed += 1
+            return None
+        version = self.data_version.current()
+        normalized = normalize_message(message)
+        if version is None or not normalized:
+            with self._lock:
+                self._bypassed += 1
+            return None
+        return (normalized, version)
+
+    def get(self, key):
+        if key is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now >= entry[1]:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key, answer):
+        if key is None:
+            return
+        with self._lock:
+            self._entries[key] = (answer, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            self._stored += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "bypassed": self._bypassed,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "stored": self._stored,
+                "evictions": self._evictions
+            }
@@ -0,0 +1,96 @@
+
+# bench_resolution_time.py - Micro-benchmark for the resolution_time_estimate parser
+#
+# Usage: python bench_resolution_time.py [document_count]
+
+import os
+import random
+import re
+import sys
+import time
+
+# Modules shared with alpha-ui-main (es_client, metrics, rollup, ...) live in ../../common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+
+import resolution_time
+
+# Roughly the distinct values seen in cicd_analysis
+ESTIMATES = [
+    '15 minutes', '30 minutes', '45 minutes', '60 minutes', '90 minutes', '5 minutes',
+    '10-15 minutes', '15-30 minutes', '30-45 minutes', '30-60 minutes', '45-60 minutes',
+    '1 hour', '2 hours', '3 hours', '4 hours', '6 hours', '8 hours', '12 hours', '24 hours',
+    '1-2 hours', '2-3 hours', '2-4 hours', '3-5 hours', '4-6 hours', '4-8 hours', '6-8 hours',
+    '8-12 hours', '12-24 hours', '1.5 hours', '0.5 hours', '1 day', '1-2 days', '2-3 days',
+    '1 week', '1-2 hours approx', 'approximately 2 hours', '1 hour 30 minutes',
+    'Unknown', 'N/A', ''
+]
+
+
+def legacy_parse(resolution_estimate):
+    """The per-hit parsing previously inlined in calculate_mttr_for_tool_project"""
+    if 'hour' in resolution_estimate.lower():
+        if '-' in resolution_estimate:
+            hours_range = resolution_estimate.lower().replace('hours', '').replace('hour', '').strip()
+            if '-' in hours_range:
+                start, end = hours_range.split('-')
+                return (float(start.strip()) + float(end.strip())) / 2
+            return float(hours_range)
+        return float(resolution_estimate.lower().replace('hours', '').replace('hour', '').strip())
+    elif 'minute' in resolution_estimate.lower():
+        minutes_str = resolution_estimate.lower().replace('minutes', '').replace('minute', '').strip()
+        minutes = float(re.findall(r'\d+', minutes_str)[0]) if re.findall(r'\d+', minutes_str) else 30
+        return minutes / 60
+    return 1.0
+
+
+def legacy_loop(estimates):
+    hours = []
+    for estimate in estimates:
+        try:
+            hours.append(legacy_parse(estimate))
+        except ValueError:
+            hours.append(0.0)
+    return hours
+
+
+def memoized_loop(estimates):
+    return [resolution_time.parse_resolution_hours(estimate) for estimate in estimates]
+
+
+def _raises(estimate):
+    try:
+        legacy_parse(estimate)
+        return False
+    except ValueError:
+        return True
+
+
+def timed(label, fn, estimates, baseline=None):
+    start = time.perf_counter()
+    fn(estimates)
+    elapsed = time.perf_counter() - start
+    speedup = f"  ({baseline / elapsed:5.1f}x)" if baseline else ""
+    print(f"{label:<28} {elapsed * 1000:10.1f} ms  {len(estimates) / elapsed / 1e6:8.2f} M/s{speedup}")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(42)
+    estimates = [rng.choice(ESTIMATES) for _ in range(count)]
+
+    print(f"📊 Parsing {count:,} estimates drawn from {len(ESTIMATES)} distinct values")
+    print(f"   NumPy available: {resolution_time.np is not None}")
+
+    failures = sum(1 for estimate in ESTIMATES if _raises(estimate))
+    print(f"   Legacy parser raises on {failures}/{len(ESTIMATES)} distinct values")
+
+    baseline = timed("legacy per-hit parse", legacy_loop, estimates)
+    resolution_time.parse_resolution_hours.cache_clear()
+    timed("memoized parse", memoized_loop, estimates, baseline)
+    resolution_time.parse_resolution_hours.cache_clear()
+    timed("batch parse", resolution_time.parse_resolution_hours_batch, estimates, baseline)
+
+
+if __name__ == '__main__':
+    main()
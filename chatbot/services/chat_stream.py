@@ -0,0 +1,127 @@
+
+# chat_stream.py - Incremental relay of RAG chatbot answers as Server-Sent Events
+#
+# The RAG service is asked for a streamed answer ("stream": true). Whatever framing it
+# answers with is relayed token by token:
+#   - text/event-stream   "data: {...}" lines ("data: [DONE]" ends the stream)
+#   - NDJSON              one JSON object per line (Ollama style: {"response": "...", "done": false})
+#   - application/json    a service without streaming support; the whole answer is one token
+# Each chunk's token is read from "token", "response" or "message.content"; any other
+# fields (intent, knowledge_sources, ...) are collected into the final "done" event.
+#
+# Events sent to the browser:
+#   event: token  data: {"token": "..."}
+#   event: done   data: the same payload as the buffered /chat response, plus ttft_ms
+#                       and "cached" (true when replayed from answer_cache.py)
+#   event: error  data: {"error": "..."}
+
+import json
+import logging
+import time
+
+import metrics
+from change_feed import sse_message
+
+logger = logging.getLogger(__name__)
+
+TOKEN_KEYS = ('token', 'response', 'message', 'done')
+
+CHAT_TTFT = metrics.Histogram(
+    'chat_time_to_first_token_seconds',
+    'From receiving a chat message to sending the first answer token (buffered: the whole answer)', ('mode',)
+)
+CHAT_DURATION = metrics.Histogram('chat_generation_seconds', 'From receiving a chat message to the complete answer', ('mode',))
+CHAT_TOKENS = metrics.Counter('chat_tokens_relayed_total', 'Answer chunks relayed to streaming clients')
+
+
+def format_response(response_data, session_id):
+    """Shape a RAG service answer for the UI"""
+    return {
+        "message": response_data.get('response', 'No response'),
+        "intent": response_data.get('intent', 'unknown'),
+        "confidence": response_data.get('confidence', 0.8),
+        "session_id": response_data.get('session_id', session_id),
+        "timestamp": response_data.get('timestamp'),
+        "model": response_data.get('model', 'llama3.1:8b'),
+        "knowledge_sources": response_data.get('knowledge_sources', []),
+        "relevant_knowledge": response_data.get('relevant_knowledge', 0)
+    }
+
+
+def chunk_token(chunk):
+    """The answer text carried by one upstream chunk, or ''"""
+    token = chunk.get('token')
+    if token is None:
+        token = chunk.get('response')
+    if token is None and isinstance(chunk.get('message'), dict):
+        token = chunk['message'].get('content')
+    return token if isinstance(token, str) else ''
+
+
+def upstream_chunks(upstream):
+    """Decoded chunks from a streaming (or plain JSON) RAG service response"""
+    content_type = upstream.headers.get('Content-Type', '')
+    if content_type.startswith('application/json'):
+        yield upstream.json()
+        return
+
+    event_stream = content_type.startswith('text/event-stream')
+    for line in upstream.iter_lines(decode_unicode=True):
+        if not line:
+            continue
+        if event_stream:
+            if not line.startswith('data:'):
+                continue
+            line = line[5:].strip()
+            if line == '[DONE]':
+                return
+        try:
+            chunk = json.loads(line)
+        except ValueError:
+            # Plain text framing: the line is the token
+            chunk = {"token": line}
+        if isinstance(chunk, dict):
+            yield chunk
+
+
+def relay(upstream, session_id, started, on_done=None):
+    """Generate SSE messages for a streaming upstream response; closes it when done.
+
+    on_done(payload) is called with the formatted answer once it is complete.
+    """
+    parts = []
+    final = {}
+    ttft = None
+    try:
+        for chunk in upstream_chunks(upstream):
+            final.update({key: value for key, value in chunk.items() if key not in TOKEN_KEYS})
+            token = chunk_token(chunk)
+            if not token:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - started
+                CHAT_TTFT.observe(ttft, mode='stream')
+            parts.append(token)
+            CHAT_TOKENS.inc()
+            yield sse_message('token', {"token": token})
+
+        CHAT_DURATION.observe(time.perf_counter() - started, mode='stream')
+        final['response'] = ''.join(parts) or 'No response'
+        payload = format_response(final, session_id)
+        if on_done is not None and parts:
+            on_done(payload)
+        yield sse_message('done', dict(
+            payload, cached=False, ttft_ms=round(ttft * 1000, 1) if ttft is not None else None
+        ))
+    except Exception as e:
+        logger.error(f"Error relaying chat stream: {e}")
+        yield sse_message('error', {"error": "Chatbot stream interrupted"})
+    finally:
+        upstream.close()
+
+
+def replay(answer, started):
+    """SSE messages for an already complete (cached) answer"""
+    CHAT_TTFT.observe(time.perf_counter() - started, mode='cached')
+    yield sse_message('token', {"token": answer['message']})
+    yield sse_message('done', dict(answer, cached=True, ttft_ms=round((time.perf_counter() - started) * 1000, 1)))
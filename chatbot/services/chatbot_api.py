@@ -1,56 +1,143 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
+from requests.adapters import HTTPAdapter
 import requests
 import logging
+import os
+import sys
+import time
+
+# Modules shared with alpha-ui-main (es_client, metrics, rollup, ...) live in ../../common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+
+import metrics
+from admission import CHAT_MAX_CONCURRENT, AdmissionController, Rejected
+from answer_cache import AnswerCache, DataVersion
+from chat_stream import CHAT_DURATION, CHAT_TTFT, format_response, relay, replay
+from conditional import version_body, version_tag
+from dashboard_queries import ANALYSIS_INDEX
+from es_client import create_client
+from health_monitor import HealthMonitor
 
 app = Flask(__name__)
 CORS(app)
+metrics.install(app, request, g)  # /metrics, including time to first token
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # RAG Chatbot service URL (assuming it's running on port 5004)
-CHATBOT_SERVICE_URL = "http://localhost:5004"
+CHATBOT_SERVICE_URL = os.environ.get('CHATBOT_SERVICE_URL', "http://localhost:5004")
+
+# Keep-alive connections to the RAG service, shared by all request threads
+UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', CHAT_MAX_CONCURRENT + 2))
+upstream = requests.Session()
+upstream.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=UPSTREAM_POOL_SIZE))
+upstream.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=UPSTREAM_POOL_SIZE))
+
+# Bounded, per-session fair concurrency towards the model server (admission.py)
+admission = AdmissionController()
+metrics.expose('chat_admission', admission.stats)
+
+# Repeated questions are answered from answer_cache.py until a new analysis is indexed
+es = create_client()
+data_version = DataVersion(
+    lambda: version_tag(es.budget('interactive').search(index=ANALYSIS_INDEX, body=version_body()))
+)
+answer_cache = AnswerCache(data_version)
+metrics.expose('answer_cache', answer_cache.stats)
+
+# Dependencies are probed in the background; /health, /live and /ready read the result.
+# Elasticsearch only feeds the answer cache, so it does not gate readiness.
+health = HealthMonitor().add(
+    'chatbot_service', lambda: upstream.get(f"{CHATBOT_SERVICE_URL}/health", timeout=5).status_code == 200
+).add('elasticsearch', es.budget('interactive').ping, critical=False).start()
+metrics.expose('dependency', health.stats)
+
+def cache_answer(key, answer):
+    """Keep a formatted answer for other sessions asking the same question"""
+    answer_cache.put(key, {name: value for name, value in answer.items() if name != 'session_id'})
 
 @app.route('/chat', methods=['POST'])
+@app.route('/api/chat', methods=['POST'])  # path used by src/services/chatbot.js
 def chat():
-    """Proxy endpoint for chatbot communication"""
+    """Proxy endpoint for chatbot communication.
+
+    With "stream": true in the body (or Accept: text/event-stream) the answer is relayed
+    as Server-Sent Events while it is generated; see chat_stream.py for the events.
+    "cache": false (or Cache-Control: no-cache) skips the answer cache for this message.
+    """
+    started = time.perf_counter()
     try:
         data = request.get_json()
         message = data.get('message', '')
         session_id = data.get('session_id', 'default')
+        stream = bool(data.get('stream')) or request.accept_mimetypes.best == 'text/event-stream'
         
         if not message:
             return jsonify({"error": "Message is required"}), 400
+
+        use_cache = data.get('cache', True) is not False and 'no-cache' not in request.headers.get('Cache-Control', '')
+        cache_key = answer_cache.key(message, use_cache)
+        cached = answer_cache.get(cache_key)
+        if cached is not None:
+            answer = dict(cached, session_id=session_id)
+            if stream:
+                return Response(replay(answer, started), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+            CHAT_TTFT.observe(time.perf_counter() - started, mode='cached')
+            return jsonify(dict(answer, cached=True))
         
-        # Forward request to RAG chatbot service
-        chatbot_response = requests.post(
-            f"{CHATBOT_SERVICE_URL}/chat",
-            json={
-                "message": message,
-                "session_id": session_id
-            },
-            timeout=30
-        )
-        
-        if chatbot_response.status_code == 200:
-            response_data = chatbot_response.json()
-            
+        try:
+            release = admission.acquire(session_id)
+        except Rejected as e:
+            return jsonify({"error": str(e)}), e.status, {'Retry-After': str(e.retry_after)}
+
+        streaming = False
+        try:
+            # Forward request to RAG chatbot service; when streaming, the read timeout
+            # applies between chunks rather than to the whole answer
+            chatbot_response = upstream.post(
+                f"{CHATBOT_SERVICE_URL}/chat",
+                json={
+                    "message": message,
+                    "session_id": session_id,
+                    "stream": stream
+                },
+                timeout=30,
+                stream=stream
+            )
+
+            if chatbot_response.status_code != 200:
+                chatbot_response.close()
+                return jsonify({"error": "Chatbot service unavailable"}), 503
+
+            if stream:
+                response = Response(
+                    stream_with_context(relay(
+                        chatbot_response, session_id, started, on_done=lambda answer: cache_answer(cache_key, answer)
+                    )),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+                )
+                # The slot is held until the stream ends, even if the client leaves early
+                response.call_on_close(chatbot_response.close)
+                response.call_on_close(release)
+                streaming = True
+                return response
+
             # Format response for UI
-            formatted_response = {
-                "message": response_data.get('response', 'No response'),
-                "intent": response_data.get('intent', 'unknown'),
-                "confidence": response_data.get('confidence', 0.8),
-                "session_id": response_data.get('session_id', session_id),
-                "timestamp": response_data.get('timestamp'),
-                "model": response_data.get('model', 'llama3.1:8b'),
-                "knowledge_sources": response_data.get('knowledge_sources', []),
-                "relevant_knowledge": response_data.get('relevant_knowledge', 0)
-            }
-            
-            return jsonify(formatted_response)
-        else:
-            return jsonify({"error": "Chatbot service unavailable"}), 503
+            response_data = chatbot_response.json()
+        finally:
+            if not streaming:
+                release()
+
+        formatted_response = format_response(response_data, session_id)
+        if response_data.get('response'):
+            cache_answer(cache_key, formatted_response)
+        elapsed = time.perf_counter() - started
+        CHAT_TTFT.observe(elapsed, mode='buffered')
+        CHAT_DURATION.observe(elapsed, mode='buffered')
+        return jsonify(dict(formatted_response, cached=False))
             
     except requests.exceptions.Timeout:
         return jsonify({"error": "Chatbot service timeout"}), 504
@@ -61,17 +148,25 @@ def chat():
         return jsonify({"error": "Internal server error"}), 500
 
 @app.route('/health', methods=['GET'])
-def health():
-    """Health check endpoint"""
-    try:
-        # Check if chatbot service is available
-        health_response = requests.get(f"{CHATBOT_SERVICE_URL}/health", timeout=5)
-        if health_response.status_code == 200:
-            return jsonify({"status": "healthy", "chatbot_service": "connected"})
-        else:
-            return jsonify({"status": "degraded", "chatbot_service": "disconnected"}), 503
-    except:
-        return jsonify({"status": "degraded", "chatbot_service": "disconnected"}), 503
+def health_check():
+    """Health check endpoint; dependency state comes from the background monitor"""
+    dependencies = health.snapshot()
+    if dependencies['chatbot_service']['healthy']:
+        return jsonify({"status": "healthy", "chatbot_service": "connected", "dependencies": dependencies})
+    else:
+        return jsonify({"status": "degraded", "chatbot_service": "disconnected", "dependencies": dependencies}), 503
+
+@app.route('/live', methods=['GET'])
+def liveness():
+    """Liveness probe: the process is up and serving, whatever its dependencies' state"""
+    return jsonify({"status": "alive", "uptime_seconds": health.uptime_seconds()}), 200
+
+@app.route('/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 503 while the RAG service is down"""
+    dependencies = health.snapshot()
+    ready = health.ready(dependencies)
+    return jsonify({"status": "ready" if ready else "not_ready", "dependencies": dependencies}), 200 if ready else 503
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5006, debug=True)
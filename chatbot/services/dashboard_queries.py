@@ -0,0 +1,528 @@
+
+# dashboard_queries.py - Elasticsearch query bodies and response formatting for the dashboard API
+#
+# Every endpoint is split into a `<name>_query(...)` builder that returns the search body
+# and a `format_<name>(response)` function that shapes the raw search response into the
+# JSON payload. The Flask app (db_service_ui.py) and the async app (db_service_asgi.py)
+# only differ in how they execute the search.
+
+import logging
+import os
+
+from pagination import clamp_page_size
+from records import AnalysisCard, StageEntry, decode_llm_response, decode_object
+from resolution_time import weighted_mean_hours
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_INDEX = 'cicd_analysis'
+
+# Stage entry fields selectable with ?fields=, mapped to the _source field behind each
+STAGE_FIELDS = {
+    "id": None,
+    "timestamp": "analysis_timestamp",
+    "status": "status",
+    "severity_level": "severity_level",
+    "confidence_score": "confidence_score",
+    "analysis": "llm_response"
+}
+
+# Pipeline stages (log_type values) shown on the project page, in display order
+PIPELINE_STAGES = [
+    stage.strip()
+    for stage in os.environ.get('PIPELINE_STAGES', 'git-checkout,build,test,sonarqube-issues').split(',')
+    if stage.strip()
+]
+# Most recent analyses returned per stage; top_hits is capped at 100 by Elasticsearch
+DEFAULT_STAGE_LIMIT = int(os.environ.get('PIPELINE_STAGE_LIMIT', 20))
+MAX_STAGE_LIMIT = 100
+
+def parse_full_synthesis(synthesis):
+    """Safely parse full_synthesis field"""
+    return decode_object(synthesis)
+
+def parse_llm_response(llm_response):
+    """Parse LLM response JSON string"""
+    return decode_llm_response(llm_response)
+
+def parse_fields(raw_fields, allowed=None):
+    """Parse a comma separated ?fields= projection; None means every field"""
+    if not raw_fields:
+        return None
+    fields = [field.strip() for field in raw_fields.split(',') if field.strip()]
+    if allowed is not None:
+        unknown = [field for field in fields if field not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+def project_filters(tool, project, environment=None, server=None):
+    """Term filters selecting one project, optionally narrowed to an environment/server"""
+    must_filters = [
+        {"term": {"tool": tool}},
+        {"term": {"project": project}}
+    ]
+
+    if environment:
+        must_filters.append({"term": {"environment": environment}})
+    if server:
+        must_filters.append({"term": {"server": server}})
+
+    return must_filters
+
+def projects_query():
+    return {
+        "size": 0,
+        "aggs": {
+            "tools": {
+                "terms": {"field": "tool", "size": 20},
+                "aggs": {
+                    "projects": {
+                        "terms": {"field": "project", "size": 100}
+                    }
+                }
+            }
+        }
+    }
+
+def format_projects(response):
+    """Group project buckets under their tool"""
+    tools_data = []
+
+    if 'aggregations' not in response:
+        logger.warning("No aggregations found in projects response")
+        return tools_data
+
+    for tool_bucket in response['aggregations']['tools']['buckets']:
+        projects = []
+        for project_bucket in tool_bucket['projects']['buckets']:
+            projects.append({
+                "name": project_bucket['key'],
+                "doc_count": project_bucket['doc_count']
+            })
+
+        tools_data.append({
+            "tool": tool_bucket['key'],
+            "projects": projects,
+            "total_builds": tool_bucket['doc_count']
+        })
+    return tools_data
+
+def projects_rollup_query():
+    """projects_query against ROLLUP_INDEX; rollup rows are weighted by their count"""
+    return {
+        "size": 0,
+        "aggs": {
+            "tools": {
+                "terms": {"field": "tool", "size": 20, "order": {"count": "desc"}},
+                "aggs": {
+                    "count": {"sum": {"field": "count"}},
+                    "projects": {
+                        "terms": {"field": "project", "size": 100, "order": {"count": "desc"}},
+                        "aggs": {"count": {"sum": {"field": "count"}}}
+                    }
+                }
+            }
+        }
+    }
+
+def format_projects_rollup(response):
+    """format_projects for a projects_rollup_query response"""
+    tools_data = []
+    for tool_bucket in response['aggregations']['tools']['buckets']:
+        projects = [
+            {"name": project_bucket['key'], "doc_count": int(project_bucket['count']['value'])}
+            for project_bucket in tool_bucket['projects']['buckets']
+        ]
+        tools_data.append({
+            "tool": tool_bucket['key'],
+            "projects": projects,
+            "total_builds": int(tool_bucket['count']['value'])
+        })
+    return tools_data
+
+def project_metrics_query(tool, project):
+    return {
+        "query": {
+            "bool": {
+                "must": project_filters(tool, project)
+            }
+        },
+        "size": 0,
+        "aggs": {
+            "total_builds": {"value_count": {"field": "build_duration_seconds"}},
+            "successful_builds": {"filter": {"term": {"deployment_success": True}}},
+            "failed_builds": {"filter": {"term": {"deployment_success": False}}},
+            "avg_build_time": {"avg": {"field": "build_duration_seconds"}},
+            "total_errors": {"filter": {"term": {"status": "error"}}},
+            "processing_times": {"terms": {"field": "processing_time_ms", "size": 1000}},
+            # MTTR inputs: distinct resolution estimates across error incidents with their counts
+            "incidents": {
+                "filter": {"term": {"status": "error"}},
+                "aggs": {
+                    "resolution_estimates": {
+                        "terms": {
+                            "field": "resolution_time_estimate",
+                            "size": 500,
+                            "missing": "30 minutes"
+                        }
+                    }
+                }
+            },
+            "recent_builds": {
+                "date_histogram": {
+                    "field": "analysis_timestamp",
+                    "calendar_interval": "1d",
+                    "min_doc_count": 0
+                },
+                "aggs": {
+                    "success_rate": {
+                        "bucket_script": {
+                            "buckets_path": {
+                                "total": "_count",
+                                "successful": "successful_builds>_count"
+                            },
+                            "script": "params.total > 0 ? (params.successful / params.total) * 100 : 0"
+                        }
+                    },
+                    "successful_builds": {"filter": {"term": {"deployment_success": True}}}
+                }
+            }
+        }
+    }
+
+def format_project_metrics(response):
+    """Turn the metrics aggregation into rates, MTTR, trend data and a health score"""
+    aggs = response.get('aggregations', {})
+
+    # Calculate basic metrics
+    total_builds = aggs.get('total_builds', {}).get('value', 0) or 0
+    successful_builds = aggs.get('successful_builds', {}).get('doc_count', 0) or 0
+    failed_builds = aggs.get('failed_builds', {}).get('doc_count', 0) or 0
+    avg_build_time = aggs.get('avg_build_time', {}).get('value', 0) or 0
+    total_errors = aggs.get('total_errors', {}).get('doc_count', 0) or 0
+
+    # Calculate rates
+    success_rate = (successful_builds / total_builds) * 100 if total_builds > 0 else 0
+    failure_rate = (failed_builds / total_builds) * 100 if total_builds > 0 else 0
+    deployment_rate = success_rate  # Assuming deployment rate equals success rate
+
+    # Calculate MTTR from resolution time estimates
+    mttr_hours = calculate_mttr_from_buckets(
+        aggs.get('incidents', {}).get('resolution_estimates', {}).get('buckets', [])
+    )
+
+    # Build trend data
+    trend_data = []
+    for bucket in aggs.get('recent_builds', {}).get('buckets', []):
+        trend_data.append({
+            "date": bucket['key_as_string'],
+            "builds": bucket['doc_count'],
+            "success_rate": bucket.get('success_rate', {}).get('value', 0)
+        })
+
+    return {
+        "success_rate": round(success_rate, 1),
+        "failure_rate": round(failure_rate, 1),
+        "avg_build_time_minutes": round(avg_build_time / 60, 1) if avg_build_time > 0 else 0,
+        "deployment_rate": round(deployment_rate, 1),
+        "mttr_hours": mttr_hours,
+        "total_builds": int(total_builds),
+        "successful_builds": int(successful_builds),
+        "failed_builds": int(failed_builds),
+        "total_errors": int(total_errors),
+        "trend_data": trend_data[-7:],  # Last 7 days
+        "health_score": calculate_health_score(success_rate, mttr_hours, failure_rate)
+    }
+
+def calculate_mttr_from_buckets(buckets):
+    """Calculate Mean Time To Recovery from resolution_time_estimate terms buckets.
+
+    Each bucket is one distinct estimate string with the number of incidents that
+    carry it, so the mean is weighted by doc_count instead of walking every hit.
+    """
+    try:
+        mttr_hours = weighted_mean_hours(
+            [bucket['key'] for bucket in buckets],
+            [bucket['doc_count'] for bucket in buckets]
+        )
+        return round(mttr_hours, 2)
+    except Exception as e:
+        logger.error(f"Error calculating MTTR: {e}")
+        return 0.0
+
+def calculate_health_score(success_rate, mttr_hours, failure_rate):
+    """Calculate overall health score for a project"""
+    # Weight factors
+    success_weight = 0.4
+    mttr_weight = 0.3
+    failure_weight = 0.3
+
+    # Normalize MTTR (lower is better, max expected is 24 hours)
+    mttr_score = max(0, 100 - (mttr_hours / 24) * 100)
+    failure_score = max(0, 100 - failure_rate)
+
+    health_score = (success_rate * success_weight +
+                   mttr_score * mttr_weight +
+                   failure_score * failure_weight)
+
+    return round(health_score, 1)
+
+def project_analyses_query(tool, project):
+    return {
+        "query": {
+            "bool": {
+                "must": project_filters(tool, project)
+            }
+        },
+        "size": 50,
+        "sort": [{"analysis_timestamp": {"order": "desc"}}],
+        "_source": [
+            "failure_category", "severity_level", "business_impact_score",
+            "confidence_score", "analysis_timestamp", "environment",
+            "server", "error_count", "full_synthesis", "status",
+            "affected_components", "resolution_time_estimate"
+        ]
+    }
+
+def format_project_analyses(response):
+    """Build one analysis card per hit"""
+    return [AnalysisCard.from_hit(hit) for hit in response['hits']['hits']]
+
+def environments_query(tool, project):
+    return {
+        "query": {
+            "bool": {
+                "must": project_filters(tool, project)
+            }
+        },
+        "size": 0,
+        "aggs": {
+            "environments": {
+                "terms": {"field": "environment", "size": 20}
+            }
+        }
+    }
+
+def format_environments(response):
+    environments = []
+
+    for bucket in response['aggregations']['environments']['buckets']:
+        environments.append({
+            "name": bucket['key'],
+            "count": bucket['doc_count']
+        })
+
+    return environments
+
+def servers_query(tool, project, environment):
+    return {
+        "query": {
+            "bool": {
+                "must": project_filters(tool, project, environment)
+            }
+        },
+        "size": 0,
+        "aggs": {
+            "servers": {
+                "terms": {"field": "server", "size": 100},
+                "aggs": {
+                    "health": {
+                        "terms": {"field": "status"}
+                    },
+                    "last_seen": {
+                        "max": {"field": "analysis_timestamp"}
+                    }
+                }
+            }
+        }
+    }
+
+def format_servers(response):
+    """Score each server by its share of error analyses"""
+    servers = []
+
+    for bucket in response['aggregations']['servers']['buckets']:
+        error_count = 0
+        for health_bucket in bucket['health']['buckets']:
+            if health_bucket['key'] == 'error':
+                error_count = health_bucket['doc_count']
+
+        health_score = max(0, 100 - (error_count / bucket['doc_count']) * 100)
+
+        servers.append({
+            "name": bucket['key'],
+            "total_logs": bucket['doc_count'],
+            "error_count": error_count,
+            "health_score": round(health_score, 1),
+            "last_seen": bucket['last_seen']['value_as_string'],
+            "status": "healthy" if health_score > 80 else "warning" if health_score > 50 else "critical"
+        })
+
+    return servers
+
+def logs_query(environment, server, fields=None):
+    """Filter for one server's logs; size and ordering are set by the paginator"""
+    body = {
+        "query": {
+            "bool": {
+                "must": [
+                    {"term": {"environment": environment}},
+                    {"term": {"server": server}}
+                ]
+            }
+        }
+    }
+    if fields is not None:
+        body["_source"] = fields
+    return body
+
+def format_logs(response):
+    return [hit['_source'] for hit in response['hits']['hits']]
+
+def parse_stages(raw_stages):
+    """Stage list from a comma separated ?stages= override, else the configured stages"""
+    if not raw_stages:
+        return PIPELINE_STAGES
+    return [stage.strip() for stage in raw_stages.split(',') if stage.strip()] or PIPELINE_STAGES
+
+def empty_pipeline_stages(stages=None):
+    return {stage: [] for stage in (stages or PIPELINE_STAGES)}
+
+def pipeline_stages_query(tool, project, environment=None, server=None, fields=None,
+                          stages=None, per_stage=DEFAULT_STAGE_LIMIT):
+    """One filters bucket per stage with its most recent analyses as top_hits"""
+    stages = stages or PIPELINE_STAGES
+    source_fields = [
+        STAGE_FIELDS[field] for field in (fields or STAGE_FIELDS) if STAGE_FIELDS[field]
+    ]
+    return {
+        "query": {
+            "bool": {
+                "must": project_filters(tool, project, environment, server),
+                "filter": [{"terms": {"log_type": stages}}]
+            }
+        },
+        "size": 0,
+        "aggs": {
+            "stages": {
+                "filters": {
+                    "filters": {stage: {"term": {"log_type": stage}} for stage in stages}
+                },
+                "aggs": {
+                    "latest": {
+                        "top_hits": {
+                            "size": per_stage,
+                            "sort": [{"analysis_timestamp": {"order": "desc"}}],
+                            "_source": source_fields or False
+                        }
+                    }
+                }
+            }
+        }
+    }
+
+def format_pipeline_stages(response, fields=None, stages=None):
+    """Stage name -> its most recent analyses, with every requested stage present"""
+    stages = empty_pipeline_stages(stages)
+    buckets = response.get('aggregations', {}).get('stages', {}).get('buckets', {})
+
+    for stage, bucket in buckets.items():
+        if stage in stages:
+            stages[stage] = [format_stage_entry(hit, fields) for hit in bucket['latest']['hits']['hits']]
+
+    return stages
+
+def format_stage_entry(hit, fields=None):
+    """One stage card; llm_response is only parsed when the analysis field is requested"""
+    entry = StageEntry.from_hit(hit, with_analysis=fields is None or 'analysis' in fields)
+    return entry if fields is None else entry.to_dict(fields)
+
+def format_analysis_detail(document):
+    """A single analysis document with its LLM response and synthesis decoded"""
+    source = dict(document['_source'])
+    source['id'] = document['_id']
+    source['llm_response'] = parse_llm_response(source.get('llm_response'))
+    source['full_synthesis'] = parse_full_synthesis(source.get('full_synthesis'))
+    return source
+
+# Batch hydration: POST /batch runs several of the endpoints above as one _msearch.
+# Each handler takes the sub-request params (the same values the GET routes take in
+# the path and query string) and returns (search body, formatter).
+MAX_BATCH_REQUESTS = int(os.environ.get('MAX_BATCH_REQUESTS', 20))
+
+def _required(params, *names):
+    missing = [name for name in names if not params.get(name)]
+    if missing:
+        raise ValueError(f"Missing parameters: {', '.join(missing)}")
+    return [params[name] for name in names]
+
+def _batch_pipeline_stages(params):
+    tool, project = _required(params, 'tool', 'project')
+    fields = parse_fields(params.get('fields'), STAGE_FIELDS)
+    stages = parse_stages(params.get('stages'))
+    per_stage = clamp_page_size(params.get('limit'), default=DEFAULT_STAGE_LIMIT, maximum=MAX_STAGE_LIMIT)
+    body = pipeline_stages_query(tool, project, params.get('environment'), params.get('server'), fields, stages, per_stage)
+    return body, lambda response: format_pipeline_stages(response, fields, stages)
+
+BATCH_ENDPOINTS = {
+    'projects': lambda params: (projects_query(), format_projects),
+    'project-metrics': lambda params: (project_metrics_query(*_required(params, 'tool', 'project')), format_project_metrics),
+    'project-analyses': lambda params: (project_analyses_query(*_required(params, 'tool', 'project')), format_project_analyses),
+    'environments': lambda params: (environments_query(*_required(params, 'tool', 'project')), format_environments),
+    'servers': lambda params: (servers_query(*_required(params, 'tool', 'project', 'environment')), format_servers),
+    'pipeline-stages': _batch_pipeline_stages
+}
+
+def plan_batch(sub_requests):
+    """Validate a batch payload.
+
+    sub_requests maps a caller-chosen name to {"endpoint": ..., "params": {...}}.
+    Returns (planned, responses): planned is a list of (name, body, formatter) to run,
+    responses already holds the 400 result of every sub-request that failed validation.
+    Raises ValueError when the payload as a whole is malformed.
+    """
+    if not isinstance(sub_requests, dict) or not sub_requests:
+        raise ValueError("'requests' must be a non-empty object of named sub-requests")
+    if len(sub_requests) > MAX_BATCH_REQUESTS:
+        raise ValueError(f"At most {MAX_BATCH_REQUESTS} sub-requests per batch")
+
+    planned, responses = [], {}
+    for name, spec in sub_requests.items():
+        spec = spec if isinstance(spec, dict) else {}
+        handler = BATCH_ENDPOINTS.get(spec.get('endpoint'))
+        if handler is None:
+            responses[name] = {"status": 400, "error": f"Unknown endpoint: {spec.get('endpoint')}"}
+            continue
+        try:
+            body, formatter = handler(spec.get('params') or {})
+        except ValueError as e:
+            responses[name] = {"status": 400, "error": str(e)}
+            continue
+        planned.append((name, body, formatter))
+    return planned, responses
+
+def msearch_lines(planned, index=ANALYSIS_INDEX):
+    """Header/body pairs for _msearch, in planned order"""
+    lines = []
+    for _, body, _ in planned:
+        lines.extend([{"index": index}, body])
+    return lines
+
+def format_batch(planned, response):
+    """Per-sub-request results from an _msearch response; one failure does not fail the rest"""
+    results = {}
+    for (name, _, formatter), item in zip(planned, response['responses']):
+        if 'error' in item:
+            error = item['error']
+            results[name] = {
+                "status": item.get('status', 500),
+                "error": error.get('reason', str(error)) if isinstance(error, dict) else str(error)
+            }
+            continue
+        try:
+            results[name] = {"status": 200, "body": formatter(item)}
+        except Exception as e:
+            logger.error(f"Error formatting batch sub-request {name}: {e}")
+            results[name] = {"status": 500, "error": str(e)}
+    return results
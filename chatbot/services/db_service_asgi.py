@@ -0,0 +1,296 @@
+
+# db_service_asgi.py - Async (ASGI) serving mode for the dashboard API in db_service_ui.py
+#
+# Same routes and payloads as db_service_ui.py, but every route awaits its Elasticsearch
+# query on AsyncElasticsearch, so one worker can hold hundreds of in-flight requests.
+# Dependency probes and the change feed poller run on background threads with a small
+# synchronous client of their own. The rollup index is maintained by db_service_ui.py
+# (or backend_fixed.py) and only read here.
+# Requires: quart, quart-cors, uvicorn and elasticsearch[async] (which brings in aiohttp).
+#
+# Run with:  SERVER_MODE=asgi WEB_CONCURRENCY=4 python db_service_ui.py
+#       or:  uvicorn db_service_asgi:app --host 0.0.0.0 --port 5005 --workers 4
+
+import logging
+import os
+import sys
+
+from elasticsearch import NotFoundError
+from quart import Quart, Response, g, jsonify, make_response, request
+from quart_cors import cors
+
+# Modules shared with alpha-ui-main (es_client, metrics, rollup, ...) live in ../../common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+
+import dashboard_queries as queries
+import fast_json
+import metrics
+from change_feed import ChangeFeed
+from conditional import NO_STORE, AsyncConditionalGet, version_body, version_tag
+from dashboard_queries import ANALYSIS_INDEX as analysis_index
+from es_client import create_async_client, create_client
+from health_monitor import HealthMonitor
+from pagination import CursorExpired, InvalidCursor, async_search_page, clamp_page_size
+from rollup import ROLLUP_ENABLED, ROLLUP_INDEX, version_body as rollup_version_body, version_tag as rollup_version_tag
+from singleflight import AsyncSingleFlight, search_key
+
+app = cors(Quart(__name__), expose_headers=['X-Next-Cursor'])
+metrics.install(app, request, g)  # /metrics; installed first so response sizes are measured after compression
+fast_json.install(app, request)  # orjson serialization + gzip/brotli for large responses
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Upper bound on concurrent connections each worker keeps open to the cluster
+ES_CONNECTIONS_PER_WORKER = int(os.environ.get('ES_CONNECTIONS_PER_WORKER', 100))
+
+es = create_async_client(connections_per_node=ES_CONNECTIONS_PER_WORKER)
+background_es = create_client(connections_per_node=4)
+
+# Cluster reachability is probed in the background; /health, /live and /ready read the result
+health = HealthMonitor().add('elasticsearch', background_es.budget('interactive').ping).start()
+
+# Open dashboards are pushed new analyses instead of polling
+change_feed = ChangeFeed(background_es.budget('background'), analysis_index)
+
+# Identical concurrent searches share one in-flight Elasticsearch request
+search_flight = AsyncSingleFlight()
+
+async def search(body, index=analysis_index):
+    """Run a search, coalescing identical concurrent queries into one request"""
+    return await search_flight.do(
+        search_key(index, body),
+        lambda: es.budget('aggregation').search(index=index, body=body)
+    )
+
+# Read endpoints answer If-None-Match with 304 while their data version is unchanged
+conditional = AsyncConditionalGet(request, make_response)
+
+metrics.expose('search_coalescing', search_flight.stats)
+metrics.expose('conditional_get', conditional.stats)
+metrics.expose('elasticsearch_breaker', es.breaker.stats)
+metrics.expose('change_feed', change_feed.stats)
+metrics.expose('dependency', health.stats)
+
+async def data_version(filters=None):
+    """Cheap version string (match count + newest analysis) for the documents behind a response"""
+    return version_tag(await search(version_body(filters)))
+
+async def project_version(tool, project, environment=None, server=None):
+    return await data_version(queries.project_filters(tool, project, environment, server))
+
+async def logs_version(environment, server):
+    # Pages after the first sit behind a point-in-time that expires; never answer them with 304
+    if request.args.get('cursor'):
+        return None
+    return await data_version([queries.logs_query(environment, server)['query']])
+
+async def analysis_version(doc_id):
+    return await data_version([{"ids": {"values": [doc_id]}}])
+
+async def projects_version():
+    if ROLLUP_ENABLED:
+        try:
+            response = await search(rollup_version_body(), ROLLUP_INDEX)
+            if response['aggregations']['count']['value']:
+                return rollup_version_tag(response)
+        except Exception:
+            pass
+    return await data_version()
+
+@app.after_serving
+async def close_elasticsearch():
+    health.stop()
+    await es.close()
+    background_es.close()
+
+@app.route('/health', methods=['GET'])
+async def health_check():
+    try:
+        dependencies = health.snapshot()
+        if not dependencies['elasticsearch']['healthy']:
+            raise ConnectionError(dependencies['elasticsearch']['error'] or "Elasticsearch ping failed")
+        return jsonify({
+            "status": "healthy",
+            "elasticsearch": "connected",
+            "dependencies": dependencies,
+            "elasticsearch_breaker": es.breaker.stats(),
+            "search_coalescing": search_flight.stats(),
+            "change_feed": change_feed.stats(),
+            "conditional_get": conditional.stats()
+        }), 200
+    except Exception as e:
+        return jsonify({"status": "unhealthy", "error": str(e)}), 500
+
+@app.route('/live', methods=['GET'])
+async def liveness():
+    """Liveness probe: the process is up and serving, whatever the cluster's state"""
+    return jsonify({"status": "alive", "uptime_seconds": health.uptime_seconds()}), 200
+
+@app.route('/ready', methods=['GET'])
+async def readiness():
+    """Readiness probe: 503 while Elasticsearch is down"""
+    dependencies = health.snapshot()
+    ready = health.ready(dependencies)
+    return jsonify({"status": "ready" if ready else "not_ready", "dependencies": dependencies}), 200 if ready else 503
+
+@app.route('/projects', methods=['GET'])
+@conditional(projects_version)
+async def get_projects():
+    """Get all projects grouped by tool"""
+    # The rollup is refreshed by the Flask service; until it has rows use the live aggregation
+    if ROLLUP_ENABLED:
+        try:
+            tools_data = queries.format_projects_rollup(await search(queries.projects_rollup_query(), ROLLUP_INDEX))
+            if tools_data:
+                return jsonify(tools_data)
+        except Exception as e:
+            logger.error(f"Error reading projects from rollup, falling back to live aggregation: {e}")
+
+    try:
+        response = await search(queries.projects_query())
+        return jsonify(queries.format_projects(response))
+    except Exception as e:
+        logger.error(f"Error fetching projects: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/events/<tool>/<project>', methods=['GET'])
+async def project_events(tool, project):
+    """Server-Sent Events stream of new analyses for a project"""
+    async def events():
+        subscription = change_feed.async_subscribe(tool, project)
+        async for message in change_feed.async_stream(subscription):
+            yield message.encode('utf-8')
+
+    response = Response(
+        events(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # The stream stays open until the client leaves
+    response.timeout = None
+    return response
+
+@app.route('/project-metrics/<tool>/<project>', methods=['GET'])
+@conditional(project_version)
+async def get_project_metrics(tool, project):
+    """Get comprehensive metrics for a specific project"""
+    try:
+        response = await search(queries.project_metrics_query(tool, project))
+        return jsonify(queries.format_project_metrics(response))
+    except Exception as e:
+        logger.error(f"Error fetching project metrics: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/project-analyses/<tool>/<project>', methods=['GET'])
+@conditional(project_version)
+async def get_project_analyses(tool, project):
+    """Get real-time error analysis for a project"""
+    try:
+        response = await search(queries.project_analyses_query(tool, project))
+        return jsonify(queries.format_project_analyses(response))
+    except Exception as e:
+        logger.error(f"Error fetching project analyses: {e}")
+        return jsonify({"error": str(e)}), 200, NO_STORE
+
+@app.route('/environments/<tool>/<project>', methods=['GET'])
+@conditional(project_version)
+async def get_environments_for_project(tool, project):
+    """Get all available environments"""
+    try:
+        response = await search(queries.environments_query(tool, project))
+        return jsonify(queries.format_environments(response))
+    except Exception as e:
+        logger.error(f"Error fetching environments: {e}")
+        return jsonify({"error": str(e)}), 200, NO_STORE
+
+@app.route('/servers/<tool>/<project>/<environment>', methods=['GET'])
+@conditional(project_version)
+async def get_servers_for_project(tool, project, environment):
+    """Get servers for a specific environment"""
+    try:
+        response = await search(queries.servers_query(tool, project, environment))
+        return jsonify(queries.format_servers(response))
+    except Exception as e:
+        logger.error(f"Error fetching servers: {e}")
+        return jsonify({"error": str(e)}), 200, NO_STORE
+
+@app.route('/logs/<environment>/<server>', methods=['GET'])
+@conditional(logs_version)
+async def get_logs(environment, server):
+    """Get one page of logs for a specific environment and server (see db_service_ui.get_logs)"""
+    try:
+        size = clamp_page_size(request.args.get('limit'), default=100)
+        fields = queries.parse_fields(request.args.get('fields'))
+        response, next_cursor = await async_search_page(
+            es.budget('interactive'), analysis_index, queries.logs_query(environment, server, fields), size, request.args.get('cursor')
+        )
+        headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+        return jsonify(queries.format_logs(response)), 200, headers
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+    except CursorExpired as e:
+        return jsonify({"error": str(e)}), 410
+    except Exception as e:
+        logger.error(f"Error fetching logs: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/analysis/<doc_id>', methods=['GET'])
+@conditional(analysis_version)
+async def get_analysis(doc_id):
+    """Get one analysis document with decoded llm_response and full_synthesis"""
+    try:
+        document = await es.budget('interactive').get(index=analysis_index, id=doc_id)
+        return jsonify(queries.format_analysis_detail(document))
+    except NotFoundError:
+        return jsonify({"error": f"Analysis {doc_id} not found"}), 404
+    except Exception as e:
+        logger.error(f"Error fetching analysis: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/pipeline-stages/<tool>/<project>', methods=['GET'])
+@app.route('/pipeline-stages/<tool>/<project>/<environment>', methods=['GET'])
+@app.route('/pipeline-stages/<tool>/<project>/<environment>/<server>', methods=['GET'])
+@conditional(project_version)
+async def get_pipeline_stages(tool, project, environment=None, server=None):
+    """Get the most recent analyses per pipeline stage (log_type).
+
+    ?stages= overrides the configured stage list, ?limit= sets analyses per stage
+    and ?fields= limits each stage entry.
+    """
+    try:
+        fields = queries.parse_fields(request.args.get('fields'), queries.STAGE_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    stages = queries.parse_stages(request.args.get('stages'))
+    per_stage = clamp_page_size(
+        request.args.get('limit'), default=queries.DEFAULT_STAGE_LIMIT, maximum=queries.MAX_STAGE_LIMIT
+    )
+
+    try:
+        response = await search(queries.pipeline_stages_query(
+            tool, project, environment, server, fields, stages, per_stage
+        ))
+        return jsonify(queries.format_pipeline_stages(response, fields, stages))
+    except Exception as e:
+        logger.error(f"Error fetching pipeline stages: {e}")
+        return jsonify(queries.empty_pipeline_stages(stages)), 200, NO_STORE
+
+@app.route('/batch', methods=['POST'])
+async def batch():
+    """Run several dashboard endpoints in one Elasticsearch _msearch (see db_service_ui.batch)"""
+    payload = await request.get_json(silent=True) or {}
+    try:
+        planned, responses = queries.plan_batch(payload.get('requests'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if planned:
+        try:
+            response = await es.budget('aggregation').msearch(body=queries.msearch_lines(planned))
+            responses.update(queries.format_batch(planned, response))
+        except Exception as e:
+            logger.error(f"Error running batch: {e}")
+            responses.update({name: {"status": 500, "error": str(e)} for name, _, _ in planned})
+
+    return jsonify({"responses": responses})
@@ -1,526 +1,289 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, make_response, request, stream_with_context
 from flask_cors import CORS
-from elasticsearch import Elasticsearch
+from elasticsearch import NotFoundError
 import logging
+import os
+import sys
 from datetime import datetime
-import re, json
 
-def parse_full_synthesis(synthesis):
-    """Safely parse full_synthesis field"""
-    if synthesis:
-        try:
-            if isinstance(synthesis, dict):
-                return synthesis
-            elif isinstance(synthesis, str):
-                return json.loads(synthesis)
-            else:
-                return {}
-        except Exception as e:
-            return {}
-    return {}
+# Modules shared with alpha-ui-main (es_client, metrics, rollup, ...) live in ../../common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+
+import dashboard_queries as queries
+import fast_json
+import metrics
+from change_feed import ChangeFeed
+from conditional import NO_STORE, ConditionalGet, version_body, version_tag
+from dashboard_queries import ANALYSIS_INDEX as analysis_index
+from es_client import create_client
+from health_monitor import HealthMonitor
+from pagination import CursorExpired, InvalidCursor, clamp_page_size, search_page
+from rollup import ROLLUP_INDEX, AnalysisRollup, version_body as rollup_version_body, version_tag as rollup_version_tag
+from singleflight import SingleFlight, search_key
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['X-Next-Cursor'])
+metrics.install(app, request, g)  # /metrics; installed first so response sizes are measured after compression
+fast_json.install(app, request)  # orjson serialization + gzip/brotli for large responses
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Elasticsearch configuration
-es = Elasticsearch([
-    'https://a705a31d6c434d5d9b8801b99d0ef7f7.us-central1.gcp.cloud.es.io'
-], 
-api_key='SEtWQlVKY0JRLUE2QldTNnB3c0U6TXJ6a1dKZ0xIQ01fTndYNWtLRVhhdw==')
+# Serving mode: 'dev' runs the Flask development server, 'asgi' runs db_service_asgi
+# under uvicorn with WEB_CONCURRENCY worker processes
+SERVER_MODE = os.environ.get('SERVER_MODE', 'dev')
+PORT = int(os.environ.get('PORT', 5005))
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 4))
+
+# Pooled client with read retries, a circuit breaker and per-query timeout budgets (es_client.py)
+es = create_client()
+
+# Identical concurrent searches share one in-flight Elasticsearch request
+search_flight = SingleFlight()
+
+# Cluster reachability is probed in the background; /health, /live and /ready read the result
+health = HealthMonitor().add('elasticsearch', es.budget('interactive').ping).start()
+
+# /projects totals come from the rollup index once it has been built; this process keeps
+# it up to date (other instances refreshing the same cluster coordinate via the watermark).
+# Source field names come from ROLLUP_FIELD_SUFFIX, shared with backend_fixed.py.
+rollup = AnalysisRollup(es.budget('background'), source_index=analysis_index)
+rollup.start()
+
+# Open dashboards are pushed new analyses instead of polling
+change_feed = ChangeFeed(es.budget('background'), analysis_index)
+
+def search(body, index=analysis_index):
+    """Run a search, coalescing identical concurrent queries into one request"""
+    return search_flight.do(
+        search_key(index, body),
+        lambda: es.budget('aggregation').search(index=index, body=body)
+    )
+
+# Read endpoints answer If-None-Match with 304 while their data version is unchanged
+conditional = ConditionalGet(request, make_response)
 
-analysis_index = 'cicd_analysis'
+metrics.expose('search_coalescing', search_flight.stats)
+metrics.expose('conditional_get', conditional.stats)
+metrics.expose('elasticsearch_breaker', es.breaker.stats)
+metrics.expose('rollup', rollup.stats)
+metrics.expose('change_feed', change_feed.stats)
+metrics.expose('dependency', health.stats)
+
+def data_version(filters=None):
+    """Cheap version string (match count + newest analysis) for the documents behind a response"""
+    return version_tag(search(version_body(filters)))
+
+def project_version(tool, project, environment=None, server=None):
+    return data_version(queries.project_filters(tool, project, environment, server))
+
+def logs_version(environment, server):
+    # Pages after the first sit behind a point-in-time that expires; never answer them with 304
+    if request.args.get('cursor'):
+        return None
+    return data_version([queries.logs_query(environment, server)['query']])
+
+def projects_version():
+    if rollup.is_ready():
+        return rollup_version_tag(search(rollup_version_body(), ROLLUP_INDEX))
+    return data_version()
 
 @app.route('/health', methods=['GET'])
 def health_check():
     try:
-        es.ping()
-        return jsonify({"status": "healthy", "elasticsearch": "connected"}), 200
+        dependencies = health.snapshot()
+        if not dependencies['elasticsearch']['healthy']:
+            raise ConnectionError(dependencies['elasticsearch']['error'] or "Elasticsearch ping failed")
+        return jsonify({
+            "status": "healthy",
+            "elasticsearch": "connected",
+            "dependencies": dependencies,
+            "elasticsearch_breaker": es.breaker.stats(),
+            "search_coalescing": search_flight.stats(),
+            "rollup": rollup.stats(),
+            "change_feed": change_feed.stats(),
+            "conditional_get": conditional.stats()
+        }), 200
     except Exception as e:
         return jsonify({"status": "unhealthy", "error": str(e)}), 500
 
+@app.route('/live', methods=['GET'])
+def liveness():
+    """Liveness probe: the process is up and serving, whatever the cluster's state"""
+    return jsonify({"status": "alive", "uptime_seconds": health.uptime_seconds()}), 200
+
+@app.route('/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 503 while Elasticsearch is down"""
+    dependencies = health.snapshot()
+    ready = health.ready(dependencies)
+    return jsonify({"status": "ready" if ready else "not_ready", "dependencies": dependencies}), 200 if ready else 503
+
 @app.route('/projects', methods=['GET'])
+@conditional(projects_version)
 def get_projects():
     """Get all projects grouped by tool"""
+    if rollup.is_ready():
+        try:
+            tools_data = queries.format_projects_rollup(search(queries.projects_rollup_query(), ROLLUP_INDEX))
+            if tools_data:
+                return jsonify(tools_data)
+        except Exception as e:
+            logger.error(f"Error reading projects from rollup, falling back to live aggregation: {e}")
+
     try:
-        body = {
-            "size": 0,
-            "aggs": {
-                "tools": {
-                    "terms": {"field": "tool", "size": 20},
-                    "aggs": {
-                        "projects": {
-                            "terms": {"field": "project", "size": 100}
-                        }
-                    }
-                }
-            }
-        }
-        
-        response = es.search(index=analysis_index, body=body)
-
-        print("Raw elasticsearch response:", response)  # Debugging line
-
-        tools_data = []
-        
-        if 'aggregations' not in response:
-            print("No aggregations found in response")
-            return jsonify([])
-
-
-        for tool_bucket in response['aggregations']['tools']['buckets']:
-            projects = []
-            for project_bucket in tool_bucket['projects']['buckets']:
-                projects.append({
-                    "name": project_bucket['key'],
-                    "doc_count": project_bucket['doc_count']
-                })
-            
-            tools_data.append({
-                "tool": tool_bucket['key'],
-                "projects": projects,
-                "total_builds": tool_bucket['doc_count']
-            })
-        print("Formatted tools data:", tools_data)  # Debugging line
-        return jsonify(tools_data)
+        response = search(queries.projects_query())
+        return jsonify(queries.format_projects(response))
     except Exception as e:
         logger.error(f"Error fetching projects: {e}")
-        print(f"Exception details: {e}")  # Debugging line
         return jsonify({"error": str(e)}), 500
 
+@app.route('/events/<tool>/<project>', methods=['GET'])
+def project_events(tool, project):
+    """Server-Sent Events stream of new analyses for a project"""
+    subscription = change_feed.subscribe(tool, project)
+    return Response(
+        stream_with_context(change_feed.stream(subscription)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/project-metrics/<tool>/<project>', methods=['GET'])
+@conditional(project_version)
 def get_project_metrics(tool, project):
     """Get comprehensive metrics for a specific project"""
     try:
-        # Main metrics query
-        body = {
-            "query": {
-                "bool": {
-                    "must": [
-                        {"term": {"tool": tool}},
-                        {"term": {"project": project}}
-                    ]
-                }
-            },
-            "size": 0,
-            "aggs": {
-                "total_builds": {"value_count": {"field": "build_duration_seconds"}},
-                "successful_builds": {"filter": {"term": {"deployment_success": True}}},
-                "failed_builds": {"filter": {"term": {"deployment_success": False}}},
-                "avg_build_time": {"avg": {"field": "build_duration_seconds"}},
-                "total_errors": {"filter": {"term": {"status": "error"}}},
-                "processing_times": {"terms": {"field": "processing_time_ms", "size": 1000}},
-                "recent_builds": {
-                    "date_histogram": {
-                        "field": "analysis_timestamp",
-                        "calendar_interval": "1d",
-                        "min_doc_count": 0
-                    },
-                    "aggs": {
-                        "success_rate": {
-                            "bucket_script": {
-                                "buckets_path": {
-                                    "total": "_count",
-                                    "successful": "successful_builds>_count"
-                                },
-                                "script": "params.total > 0 ? (params.successful / params.total) * 100 : 0"
-                            }
-                        },
-                        "successful_builds": {"filter": {"term": {"deployment_success": True}}}
-                    }
-                }
-            }
-        }
-        
-        response = es.search(index=analysis_index, body=body)
-        aggs = response.get('aggregations', {})
-        
-        # Calculate basic metrics
-        total_builds = aggs.get('total_builds', {}).get('value', 0) or 0
-        successful_builds = aggs.get('successful_builds', {}).get('doc_count', 0) or 0
-        failed_builds = aggs.get('failed_builds', {}).get('doc_count', 0) or 0
-        avg_build_time = aggs.get('avg_build_time', {}).get('value', 0) or 0
-        total_errors = aggs.get('total_errors', {}).get('doc_count', 0) or 0
-        
-        # Calculate rates
-        success_rate = (successful_builds / total_builds) * 100 if total_builds > 0 else 0
-        failure_rate = (failed_builds / total_builds) * 100 if total_builds > 0 else 0
-        deployment_rate = success_rate  # Assuming deployment rate equals success rate
-        if avg_build_time is not None and avg_build_time > 0:
-            avg_build_time_minutes = round(avg_build_time / 60, 1)
-        else:
-            avg_build_time_minutes = 0       
-        # Calculate MTTR from resolution time estimates
-        try:
-            mttr_hours = calculate_mttr_for_tool_project(tool, project)
-        except Exception as e:
-            logger.error(f"Error calculating MTTR for project {project}: {e}")
-            mttr_hours =0.0
-        
-        # Build trend data
-        trend_data = []
-        for bucket in aggs.get('recent_builds', {}).get('buckets', []):
-            trend_data.append({
-                "date": bucket['key_as_string'],
-                "builds": bucket['doc_count'],
-                "success_rate": bucket.get('success_rate', {}).get('value', 0)
-            })
-        
-        metrics = {
-            "success_rate": round(success_rate, 1),
-            "failure_rate": round(failure_rate, 1),
-            "avg_build_time_minutes": round(avg_build_time / 60, 1) if avg_build_time > 0 else 0,
-            "deployment_rate": round(deployment_rate, 1),
-            "mttr_hours": mttr_hours,
-            "total_builds": int(total_builds),
-            "successful_builds": int(successful_builds),
-            "failed_builds": int(failed_builds),
-            "total_errors": int(total_errors),
-            "trend_data": trend_data[-7:],  # Last 7 days
-            "health_score": calculate_health_score(success_rate, mttr_hours, failure_rate)
-        }
-        
-        return jsonify(metrics)
+        response = search(queries.project_metrics_query(tool, project))
+        return jsonify(queries.format_project_metrics(response))
     except Exception as e:
         logger.error(f"Error fetching project metrics: {e}")
         return jsonify({"error": str(e)}), 500
 
-def calculate_mttr_for_tool_project(tool, project):
-    """Calculate Mean Time To Recovery for a project"""
-    try:
-        body = {
-            "query": {
-                "bool": {
-                    "must": [
-                        {"term": {"tool": tool}},
-                        {"term": {"project": project}},
-                        {"term": {"status": "error"}}
-                    ]
-                }
-            },
-            "size": 1000,
-            "_source": ["resolution_time_estimate"]
-        }
-        
-        response = es.search(index=analysis_index, body=body)
-        
-        total_resolution_time_hours = 0
-        incident_count = 0
-        
-        for hit in response['hits']['hits']:
-            source = hit['_source']
-            resolution_estimate = source.get('resolution_time_estimate', '30 minutes')
-            
-            # Parse resolution time
-            if 'hour' in resolution_estimate.lower():
-                if '-' in resolution_estimate:
-                    hours_range = resolution_estimate.lower().replace('hours', '').replace('hour', '').strip()
-                    if '-' in hours_range:
-                        start, end = hours_range.split('-')
-                        avg_hours = (float(start.strip()) + float(end.strip())) / 2
-                    else:
-                        avg_hours = float(hours_range)
-                else:
-                    avg_hours = float(resolution_estimate.lower().replace('hours', '').replace('hour', '').strip())
-            elif 'minute' in resolution_estimate.lower():
-                minutes_str = resolution_estimate.lower().replace('minutes', '').replace('minute', '').strip()
-                minutes = float(re.findall(r'\d+', minutes_str)[0]) if re.findall(r'\d+', minutes_str) else 30
-                avg_hours = minutes / 60
-            else:
-                avg_hours = 1.0
-            
-            total_resolution_time_hours += avg_hours
-            incident_count += 1
-        
-        return round(total_resolution_time_hours / incident_count, 2) if incident_count > 0 else 0.0
-    except Exception as e:
-        logger.error(f"Error calculating MTTR: {e}")
-        return 0.0
-
-def calculate_health_score(success_rate, mttr_hours, failure_rate):
-    """Calculate overall health score for a project"""
-    # Weight factors
-    success_weight = 0.4
-    mttr_weight = 0.3
-    failure_weight = 0.3
-    
-    # Normalize MTTR (lower is better, max expected is 24 hours)
-    mttr_score = max(0, 100 - (mttr_hours / 24) * 100)
-    failure_score = max(0, 100 - failure_rate)
-    
-    health_score = (success_rate * success_weight + 
-                   mttr_score * mttr_weight + 
-                   failure_score * failure_weight)
-    
-    return round(health_score, 1)
-
-@app.route('/project-analyses/<project>', methods=['GET'])
+@app.route('/project-analyses/<tool>/<project>', methods=['GET'])
+@conditional(project_version)
 def get_project_analyses(tool, project):
     """Get real-time error analysis for a project"""
     try:
-        body = {
-            "query": {
-                "bool": {
-                    "must": [
-                        {"term": {"tool": tool}},
-                        {"term": {"project": project}}
-                    ]
-                }
-            },
-            "size": 50,
-            "sort": [{"analysis_timestamp": {"order": "desc"}}],
-            "_source": [
-                "failure_category", "severity_level", "business_impact_score",
-                "confidence_score", "analysis_timestamp", "environment",
-                "server", "error_count", "full_synthesis", "status",
-                "affected_components", "resolution_time_estimate"
-            ]
-        }
-        
-        response = es.search(index=analysis_index, body=body)
-        analyses = []
-        
-        for hit in response['hits']['hits']:
-            source = hit['_source']
-            
-            # Parse full_synthesis if it exists
-            synthesis_data = parse_full_synthesis(source.get('full_synthesis'))
-            
-            analysis_card = {
-                "id": hit['_id'],
-                "failure_category": source.get('failure_category', 'Unknown'),
-                "severity_level": source.get('severity_level', 'medium'),
-                "business_impact_score": source.get('business_impact_score', 0.5),
-                "confidence_score": source.get('confidence_score', 0.8),
-                "timestamp": source.get('analysis_timestamp'),
-                "environment": source.get('environment', 'unknown'),
-                "server": source.get('server', 'unknown'),
-                "error_count": source.get('error_count', 1),
-                "status": source.get('status', 'error'),
-                "affected_components": source.get('affected_components', []),
-                "resolution_time_estimate": source.get('resolution_time_estimate', 'Unknown'),
-                "summary": synthesis_data.get('failure_summary', 'No summary available'),
-                "root_cause": synthesis_data.get('root_cause', {}),
-                "fix_suggestion": synthesis_data.get('fix_suggestion', {}),
-                "auto_fix_status": synthesis_data.get('auto_fix', {}).get('status', 'Unknown')
-            }
-            
-            analyses.append(analysis_card)
-        
-        return jsonify(analyses)
+        response = search(queries.project_analyses_query(tool, project))
+        return jsonify(queries.format_project_analyses(response))
     except Exception as e:
         logger.error(f"Error fetching project analyses: {e}")
-        return jsonify({"error": str(e)}), 200
+        return jsonify({"error": str(e)}), 200, NO_STORE
 
 @app.route('/environments/<tool>/<project>', methods=['GET'])
+@conditional(project_version)
 def get_environments_for_project(tool, project):
     """Get all available environments"""
     try:
-        body = {
-            "query":{
-                "bool": {
-                    "must": [
-                        {"term": {"tool": tool}},
-                        {"term": {"project": project}}
-                    ]
-                }
-            },
-            "size": 0,
-            "aggs": {
-                "environments": {
-                    "terms": {"field": "environment", "size": 20}
-                }
-            }
-        }
-        
-        response = es.search(index=analysis_index, body=body)
-        environments = []
-        
-        for bucket in response['aggregations']['environments']['buckets']:
-            environments.append({
-                "name": bucket['key'],
-                "count": bucket['doc_count']
-            })
-        
-        return jsonify(environments)
+        response = search(queries.environments_query(tool, project))
+        return jsonify(queries.format_environments(response))
     except Exception as e:
         logger.error(f"Error fetching environments: {e}")
-        return jsonify({"error": str(e)}), 200
+        return jsonify({"error": str(e)}), 200, NO_STORE
 
 @app.route('/servers/<tool>/<project>/<environment>', methods=['GET'])
+@conditional(project_version)
 def get_servers_for_project(tool, project, environment):
     """Get servers for a specific environment"""
     try:
-        body = {
-            "query": {
-                "bool": {
-                    "must": [
-                        {"term": {"tool": tool}},
-                        {"term": {"project": project}},
-                        {"term": {"environment": environment}}
-                    ]
-                }
-            },
-            "size": 0,
-            "aggs": {
-                "servers": {
-                    "terms": {"field": "server", "size": 100},
-                    "aggs": {
-                        "health": {
-                            "terms": {"field": "status"}
-                        },
-                        "last_seen": {
-                            "max": {"field": "analysis_timestamp"}
-                        }
-                    }
-                }
-            }
-        }
-        
-        response = es.search(index=analysis_index, body=body)
-        servers = []
-        
-        for bucket in response['aggregations']['servers']['buckets']:
-            error_count = 0
-            for health_bucket in bucket['health']['buckets']:
-                if health_bucket['key'] == 'error':
-                    error_count = health_bucket['doc_count']
-            
-            health_score = max(0, 100 - (error_count / bucket['doc_count']) * 100)
-            
-            servers.append({
-                "name": bucket['key'],
-                "total_logs": bucket['doc_count'],
-                "error_count": error_count,
-                "health_score": round(health_score, 1),
-                "last_seen": bucket['last_seen']['value_as_string'],
-                "status": "healthy" if health_score > 80 else "warning" if health_score > 50 else "critical"
-            })
-        
-        return jsonify(servers)
+        response = search(queries.servers_query(tool, project, environment))
+        return jsonify(queries.format_servers(response))
     except Exception as e:
         logger.error(f"Error fetching servers: {e}")
-        return jsonify({"error": str(e)}), 200
+        return jsonify({"error": str(e)}), 200, NO_STORE
 
 @app.route('/logs/<environment>/<server>', methods=['GET'])
+@conditional(logs_version)
 def get_logs(environment, server):
-    """Get logs for a specific environment and server"""
+    """Get one page of logs for a specific environment and server.
+
+    The token for the next page, if any, is returned in the X-Next-Cursor header
+    and is passed back as ?cursor=.
+    """
     try:
-        body = {
-            "query": {
-                "bool": {
-                    "must": [
-                        {"term": {"environment": environment}},
-                        {"term": {"server": server}}
-                    ]
-                }
-            },
-            "size": 100,
-            "sort": [{"analysis_timestamp": {"order": "desc"}}]
-        }
-        
-        response = es.search(index=analysis_index, body=body)
-        logs = [hit['_source'] for hit in response['hits']['hits']]
-        
-        return jsonify(logs)
+        size = clamp_page_size(request.args.get('limit'), default=100)
+        fields = queries.parse_fields(request.args.get('fields'))
+        response, next_cursor = search_page(
+            es.budget('interactive'), analysis_index, queries.logs_query(environment, server, fields), size, request.args.get('cursor')
+        )
+        headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+        return jsonify(queries.format_logs(response)), 200, headers
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+    except CursorExpired as e:
+        return jsonify({"error": str(e)}), 410
     except Exception as e:
         logger.error(f"Error fetching logs: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/analysis/<doc_id>', methods=['GET'])
+@conditional(lambda doc_id: data_version([{"ids": {"values": [doc_id]}}]))
+def get_analysis(doc_id):
+    """Get one analysis document with decoded llm_response and full_synthesis"""
+    try:
+        document = es.budget('interactive').get(index=analysis_index, id=doc_id)
+        return jsonify(queries.format_analysis_detail(document))
+    except NotFoundError:
+        return jsonify({"error": f"Analysis {doc_id} not found"}), 404
+    except Exception as e:
+        logger.error(f"Error fetching analysis: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/pipeline-stages/<tool>/<project>', methods=['GET'])
 @app.route('/pipeline-stages/<tool>/<project>/<environment>', methods=['GET'])
 @app.route('/pipeline-stages/<tool>/<project>/<environment>/<server>', methods=['GET'])
+@conditional(project_version)
 def get_pipeline_stages(tool, project, environment=None, server=None):
-    """Get pipeline stage analysis grouped by log_type"""
+    """Get the most recent analyses per pipeline stage (log_type).
+
+    ?stages= overrides the configured stage list, ?limit= sets analyses per stage
+    and ?fields= limits each stage entry.
+    """
     try:
-        # Build query filters
-        must_filters = [
-            {"term": {"tool": tool}},
-            {"term": {"project": project}}
-        ]
-        
-        if environment:
-            must_filters.append({"term": {"environment": environment}})
-        if server:
-            must_filters.append({"term": {"server": server}})
-        
-        body = {
-            "query": {
-                "bool": {
-                    "must": must_filters
-                }
-            },
-            "size": 1000,
-            "sort": [{"analysis_timestamp": {"order": "desc"}}],
-            "_source": [
-                "log_type", "llm_response", "analysis_timestamp", 
-                "status", "severity_level", "confidence_score"
-            ]
-        }
-        
-        response = es.search(index=analysis_index, body=body)
-        
-        # Group by log_type (pipeline stages)
-        stages = {
-            "git-checkout": [],
-            "build": [],
-            "test": [],
-            "sonarqube-issues": []
-        }
-        
-        for hit in response['hits']['hits']:
-            source = hit['_source']
-            log_type = source.get('log_type', 'unknown')
-            
-            if log_type in stages:
-                # Parse LLM response
-                llm_analysis = parse_llm_response(source.get('llm_response'))
-                
-                stage_analysis = {
-                    "id": hit['_id'],
-                    "timestamp": source.get('analysis_timestamp'),
-                    "status": source.get('status', 'unknown'),
-                    "severity_level": source.get('severity_level', 'medium'),
-                    "confidence_score": source.get('confidence_score', 0.8),
-                    "analysis": llm_analysis
-                }
-                
-                stages[log_type].append(stage_analysis)
-        
-        return jsonify(stages)
-        
+        fields = queries.parse_fields(request.args.get('fields'), queries.STAGE_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    stages = queries.parse_stages(request.args.get('stages'))
+    per_stage = clamp_page_size(
+        request.args.get('limit'), default=queries.DEFAULT_STAGE_LIMIT, maximum=queries.MAX_STAGE_LIMIT
+    )
+
+    try:
+        response = search(queries.pipeline_stages_query(
+            tool, project, environment, server, fields, stages, per_stage
+        ))
+        return jsonify(queries.format_pipeline_stages(response, fields, stages))
     except Exception as e:
         logger.error(f"Error fetching pipeline stages: {e}")
-        return jsonify({
-            "git-checkout": [],
-            "build": [],
-            "test": [],
-            "sonarqube-issues": []
-        }), 200
+        return jsonify(queries.empty_pipeline_stages(stages)), 200, NO_STORE
+
+@app.route('/batch', methods=['POST'])
+def batch():
+    """Run several dashboard endpoints in one Elasticsearch _msearch.
 
-def parse_llm_response(llm_response):
-    """Parse LLM response JSON string"""
-    if llm_response:
+    Body: {"requests": {"<name>": {"endpoint": "project-metrics", "params": {"tool": ..., "project": ...}}}}
+    Returns {"responses": {"<name>": {"status": 200, "body": ...} | {"status": ..., "error": ...}}}.
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        planned, responses = queries.plan_batch(payload.get('requests'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if planned:
         try:
-            if isinstance(llm_response, dict):
-                return llm_response
-            elif isinstance(llm_response, str):
-                return json.loads(llm_response)
+            response = es.budget('aggregation').msearch(body=queries.msearch_lines(planned))
+            responses.update(queries.format_batch(planned, response))
         except Exception as e:
-            logger.error(f"Error parsing LLM response: {e}")
-    
-    return {
-        "failure_summary": "No analysis available",
-        "root_cause": {},
-        "fix_suggestion": {},
-        "rollback_plan": {},
-        "auto_fix": {},
-        "severity_level": "unknown",
-        "confidence_score": 0.0
-    }
+            logger.error(f"Error running batch: {e}")
+            responses.update({name: {"status": 500, "error": str(e)} for name, _, _ in planned})
+
+    return jsonify({"responses": responses})
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5005, debug=True)
+    if SERVER_MODE == 'asgi':
+        import uvicorn
+        uvicorn.run('db_service_asgi:app', host='0.0.0.0', port=PORT, workers=WEB_CONCURRENCY)
+    else:
+        app.run(host='0.0.0.0', port=PORT, debug=True)
@@ -50,22 +50,26 @@ const ChatbotWidget = () => {
     setIsLoading(true);
     setIsTyping(true);
 
+    const botId = Date.now() + 1;
+    let streamed = '';
+
     try {
-      const response = await chatbotService.sendMessage(inputMessage);
-      
-      // Simulate typing delay for better UX
-      setTimeout(() => {
-        const botMessage = {
-          id: Date.now() + 1,
-          type: 'bot',
-          content: response.response || 'I apologize, but I encountered an issue processing your request. Please try again.',
-          timestamp: new Date(),
-          sources: response.relevant_knowledge || 0
-        };
+      // Show the answer as it is generated instead of waiting for the whole reply
+      const response = await chatbotService.streamMessage(inputMessage, (token) => {
+        if (!streamed) {
+          setIsTyping(false);
+          setMessages(prev => [...prev, { id: botId, type: 'bot', content: '', timestamp: new Date(), sources: 0 }]);
+        }
+        streamed += token;
+        setMessages(prev => prev.map(m => m.id === botId ? { ...m, content: streamed } : m));
+      });
 
-        setMessages(prev => [...prev, botMessage]);
-        setIsTyping(false);
-      }, 1000);
+      const content = response.message || streamed || 'I apologize, but I encountered an issue processing your request. Please try again.';
+      const sources = response.relevant_knowledge || 0;
+      setMessages(prev => prev.some(m => m.id === botId)
+        ? prev.map(m => m.id === botId ? { ...m, content, sources } : m)
+        : [...prev, { id: botId, type: 'bot', content, timestamp: new Date(), sources }]);
+      setIsTyping(false);
       
     } catch (error) {
       console.error('Chatbot error:', error);
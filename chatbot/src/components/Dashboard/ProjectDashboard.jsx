@@ -142,6 +142,11 @@ const ProjectDashboard = ({ onRefresh }) => {
     loadProjectData();
     
     if (realTimeEnabled) {
+      // Reload only when the backend pushes new analyses for this project
+      if (typeof EventSource !== 'undefined') {
+        return apiService.subscribeToProject(tool, project, () => loadProjectData());
+      }
+
       const interval = setInterval(() => {
         loadProjectData();
       }, 30000); // Update every 30 seconds
@@ -653,6 +653,16 @@ class ApiService {
   async getStats() {
     return await this.request('/stats');
   }
+
+  // Push channel for new analyses of one tool's project; returns a function that closes it
+  subscribeToProject(tool, project, onChange) {
+    const source = new EventSource(
+      `${API_BASE_URL}/api/projects/${encodeURIComponent(project)}/events?tool=${encodeURIComponent(tool)}`
+    );
+    source.addEventListener('change', (event) => onChange(JSON.parse(event.data)));
+    source.addEventListener('resync', () => onChange(null));
+    return () => source.close();
+  }
 }
 
 export const apiService = new ApiService();
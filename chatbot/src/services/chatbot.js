@@ -36,6 +36,57 @@ class ChatbotService {
     }
   }
 
+  // Streams the answer as it is generated: onToken(token) per chunk, resolves with the
+  // final payload ({ message, intent, knowledge_sources, ttft_ms, ... })
+  async streamMessage(message, onToken, sessionId = null) {
+    const response = await fetch(`${CHATBOT_API_URL}/api/chat`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Accept': 'text/event-stream',
+      },
+      body: JSON.stringify({
+        message: message,
+        session_id: sessionId || this.sessionId,
+        user_id: 'dashboard_user',
+        stream: true
+      }),
+    });
+
+    if (!response.ok || !response.body) {
+      throw new Error(`Chatbot API Error: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let event = 'message';
+        let data = '';
+        block.split('\n').forEach(line => {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          else if (line.startsWith('data:')) data += line.slice(5).trim();
+        });
+        if (!data) continue;
+
+        const payload = JSON.parse(data);
+        if (event === 'token') onToken(payload.token);
+        else if (event === 'done') return payload;
+        else if (event === 'error') throw new Error(payload.error);
+      }
+    }
+    throw new Error('Chatbot stream ended unexpectedly');
+  }
+
   async getChatHistory(sessionId = null) {
     try {
       const response = await fetch(
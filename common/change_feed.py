@@ -0,0 +1,320 @@
+
+# change_feed.py - Server-Sent Events push of new analyses per (tool, project)
+#
+# One poller thread per process asks Elasticsearch for analyses newer than the last
+# analysis_timestamp it has seen, grouped by tool and project. Subscribers of a project
+# that changed get one event with the delta; everyone else gets nothing. Each poll
+# re-reads CHANGE_POLL_OVERLAP seconds behind that watermark, so analyses indexed late
+# (after newer ones were already seen) are still picked up; ids already published in
+# that window are skipped, so nothing is announced twice. Polling cost
+# depends on how often analyses arrive, not on how many dashboards are open. The poller
+# only runs while someone is subscribed. ASGI services subscribe with async_subscribe()
+# and read async_stream(), which waits on the event loop instead of a thread.
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CHANGE_POLL_INTERVAL = float(os.environ.get('CHANGE_POLL_INTERVAL', 5))
+# Seconds re-read behind the newest analysis seen; should cover the ingest delay
+CHANGE_POLL_OVERLAP = float(os.environ.get('CHANGE_POLL_OVERLAP', 30))
+# Analyses read per poll; a larger backlog is drained over the following polls
+CHANGE_POLL_SIZE = int(os.environ.get('CHANGE_POLL_SIZE', 1000))
+# Comment lines sent on idle streams so proxies do not drop the connection
+SSE_KEEPALIVE_SECONDS = float(os.environ.get('SSE_KEEPALIVE_SECONDS', 15))
+# Events buffered per subscriber before it is told to reload instead
+SUBSCRIBER_QUEUE_SIZE = int(os.environ.get('SUBSCRIBER_QUEUE_SIZE', 100))
+# Newest analyses included in each change event
+CHANGE_EVENT_ANALYSES = int(os.environ.get('CHANGE_EVENT_ANALYSES', 10))
+
+DELTA_SOURCE = [
+    "analysis_timestamp", "environment", "server", "log_type",
+    "status", "severity_level", "error_count", "warning_count"
+]
+
+
+def sse_message(event, data):
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str, separators=(',', ':'))}\n\n"
+
+
+class Subscription:
+    """A subscriber's event queue; tool None matches the project under any tool"""
+
+    def __init__(self, tool, project, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.tool = tool
+        self.project = project
+        self.events = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def push(self, message):
+        try:
+            self.events.put_nowait(message)
+        except queue.Full:
+            # A slow client gets one resync event instead of an unbounded backlog
+            self.overflowed = True
+
+
+class AsyncSubscription(Subscription):
+    """Subscription read on an asyncio event loop; the poller thread hands events to the loop"""
+
+    def __init__(self, tool, project, loop, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.tool = tool
+        self.project = project
+        self.events = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+        self.loop = loop
+
+    def push(self, message):
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        try:
+            self.events.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class ChangeFeed:
+    """Shared change detection for every open event stream in the process"""
+
+    def __init__(self, es, index, field_suffix='', poll_interval=CHANGE_POLL_INTERVAL,
+                 keepalive=SSE_KEEPALIVE_SECONDS, event_analyses=CHANGE_EVENT_ANALYSES,
+                 overlap=CHANGE_POLL_OVERLAP, poll_size=CHANGE_POLL_SIZE):
+        self.es = es
+        self.index = index
+        self.field_suffix = field_suffix
+        self.poll_interval = poll_interval
+        self.keepalive = keepalive
+        self.event_analyses = event_analyses
+        self.overlap_ms = int(overlap * 1000)
+        self.poll_size = poll_size
+
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._latest = {}
+        self._latest_ms = {}
+        self._primed = False
+        self._watermark = None
+        self._watermark_ms = None
+        # Analyses already published, by id, with their timestamp; pruned to the overlap window
+        self._seen = {}
+        self._thread = None
+        self._polls = 0
+        self._events_sent = 0
+        self._poll_failures = 0
+
+    def subscribe(self, tool, project):
+        return self._add(Subscription(tool, project))
+
+    def async_subscribe(self, tool, project):
+        """subscribe() for a coroutine; events are delivered on the running event loop"""
+        return self._add(AsyncSubscription(tool, project, asyncio.get_running_loop()))
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscribers.setdefault((subscription.tool, subscription.project), set()).add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='change-feed', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            key = (subscription.tool, subscription.project)
+            subscribers = self._subscribers.get(key, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscribers.pop(key, None)
+
+    def stream(self, subscription):
+        """Yield SSE text for a subscription until the client disconnects"""
+        try:
+            yield from self._greeting(subscription)
+            while True:
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    yield sse_message('resync', {"project": subscription.project})
+                try:
+                    yield subscription.events.get(timeout=self.keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+    async def async_stream(self, subscription):
+        """stream() for an AsyncSubscription"""
+        try:
+            for message in self._greeting(subscription):
+                yield message
+            while True:
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    yield sse_message('resync', {"project": subscription.project})
+                try:
+                    yield await asyncio.wait_for(subscription.events.get(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+    def _greeting(self, subscription):
+        return [
+            f"retry: {int(self.poll_interval * 1000)}\n\n",
+            sse_message('hello', {
+                "tool": subscription.tool,
+                "project": subscription.project,
+                "latest_timestamp": self.latest_timestamp(subscription.tool, subscription.project)
+            })
+        ]
+
+    def latest_timestamp(self, tool, project):
+        with self._lock:
+            if tool is not None:
+                return self._latest.get((tool, project))
+            timestamps = [ts for (t, p), ts in self._latest.items() if p == project]
+        return max(timestamps) if timestamps else None
+
+    def stats(self):
+        with self._lock:
+            subscribers = sum(len(s) for s in self._subscribers.values())
+        return {
+            "subscribers": subscribers,
+            "watermark": self._watermark,
+            "polls": self._polls,
+            "events_sent": self._events_sent,
+            "poll_failures": self._poll_failures
+        }
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # Start from a fresh snapshot when the next subscriber arrives
+                    self._thread = None
+                    self._primed = False
+                    self._watermark = None
+                    self._watermark_ms = None
+                    self._seen = {}
+                    return
+            try:
+                self.poll()
+            except Exception as e:
+                self._poll_failures += 1
+                logger.error(f"Change feed poll failed: {e}")
+            time.sleep(self.poll_interval)
+
+    def poll(self):
+        """One change-detection query; publishes an event per changed (tool, project)"""
+        if self._primed:
+            self._poll_changes()
+        else:
+            self._prime()
+        self._polls += 1
+
+    def _prime(self):
+        """Record the newest analysis per (tool, project) without publishing anything"""
+        response = self.es.search(index=self.index, body={
+            "size": 0,
+            "aggs": {
+                "tools": {
+                    "terms": {"field": "tool" + self.field_suffix, "size": 50},
+                    "aggs": {
+                        "projects": {
+                            "terms": {"field": "project" + self.field_suffix, "size": 1000},
+                            "aggs": {"latest": {"max": {"field": "analysis_timestamp"}}}
+                        }
+                    }
+                }
+            }
+        })
+        for tool_bucket in response['aggregations']['tools']['buckets']:
+            for project_bucket in tool_bucket['projects']['buckets']:
+                latest = project_bucket['latest']
+                if latest.get('value') is not None:
+                    self._advance((tool_bucket['key'], project_bucket['key']), int(latest['value']), latest.get('value_as_string'))
+
+        if self._watermark_ms is not None:
+            # Analyses already inside the overlap window are history, not news
+            response = self.es.search(index=self.index, body={
+                "size": self.poll_size,
+                "query": {"range": {"analysis_timestamp": {"gte": self._watermark_ms - self.overlap_ms, "format": "epoch_millis"}}},
+                "sort": [{"analysis_timestamp": {"order": "desc"}}],
+                "_source": False
+            })
+            self._seen = {hit['_id']: int(hit['sort'][0]) for hit in response['hits']['hits']}
+        self._primed = True
+
+    def _poll_changes(self):
+        """Read analyses from the overlap window that have not been published yet"""
+        filters = []
+        if self._watermark_ms is not None:
+            since = self._watermark_ms - self.overlap_ms
+            filters.append({"range": {"analysis_timestamp": {"gte": since, "format": "epoch_millis"}}})
+        excluded = [{"ids": {"values": list(self._seen)}}] if self._seen else []
+        response = self.es.search(index=self.index, body={
+            "size": self.poll_size,
+            "query": {"bool": {"filter": filters, "must_not": excluded}},
+            "sort": [{"analysis_timestamp": {"order": "asc"}}],
+            "_source": DELTA_SOURCE + ["tool", "project"]
+        })
+
+        changes = {}
+        for hit in response['hits']['hits']:
+            if hit['_id'] in self._seen:
+                continue
+            timestamp_ms = int(hit['sort'][0])
+            self._seen[hit['_id']] = timestamp_ms
+            source = hit['_source']
+            key = (source.get('tool'), source.get('project'))
+            changes.setdefault(key, []).append(hit)
+            self._advance(key, timestamp_ms, source.get('analysis_timestamp'))
+
+        if self._watermark_ms is not None:
+            horizon = self._watermark_ms - self.overlap_ms
+            self._seen = {doc_id: ms for doc_id, ms in self._seen.items() if ms >= horizon}
+        for key, hits in changes.items():
+            self._publish(key, self._delta(key, hits))
+
+    def _advance(self, key, timestamp_ms, timestamp):
+        if key not in self._latest_ms or timestamp_ms > self._latest_ms[key]:
+            self._latest_ms[key] = timestamp_ms
+            with self._lock:
+                self._latest[key] = timestamp
+        if self._watermark_ms is None or timestamp_ms > self._watermark_ms:
+            self._watermark_ms = timestamp_ms
+            self._watermark = timestamp
+
+    def _delta(self, key, hits):
+        """Change event for a project's new hits (oldest first)"""
+        status_counts = {}
+        for hit in hits:
+            status = hit['_source'].get('status')
+            if status is not None:
+                status_counts[status] = status_counts.get(status, 0) + 1
+        newest = sorted(hits, key=lambda hit: hit['sort'][0], reverse=True)[:self.event_analyses]
+        return sse_message('change', {
+            "tool": key[0],
+            "project": key[1],
+            "latest_timestamp": self._latest.get(key),
+            "new_analyses": len(hits),
+            "status_counts": status_counts,
+            "analyses": [
+                dict({field: hit['_source'].get(field) for field in DELTA_SOURCE if field in hit['_source']}, id=hit['_id'])
+                for hit in newest
+            ]
+        })
+
+    def _publish(self, key, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(key, ())) + list(self._subscribers.get((None, key[1]), ()))
+        for subscription in subscribers:
+            subscription.push(message)
+            self._events_sent += 1
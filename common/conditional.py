@@ -0,0 +1,182 @@
+
+# conditional.py - ETag / If-None-Match support for read endpoints
+#
+# A route's version is a cheap size-0 search over the documents it reads: the match
+# count plus the newest analysis_timestamp. The weak ETag is derived from the request
+# path and that version. If-None-Match is checked before the route runs, so unchanged
+# data costs one small query and an empty 304, without aggregating or serializing.
+# A path's version is reused for CONDITIONAL_VERSION_TTL seconds and concurrent lookups
+# for it share one query, so a burst of polls costs a single version search.
+# Views read the version their ETag is built from with current_version(); a view that
+# caches its payload keys the cache by it, so a body is never tagged with a newer version
+# than the data it was computed from.
+
+import contextvars
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from singleflight import AsyncSingleFlight, SingleFlight
+
+# Paths whose most recent version is remembered for reuse
+VERSION_MEMORY = 1024
+# Seconds a path's version is reused before it is looked up again (0 looks it up every request)
+VERSION_TTL = int(os.environ.get('CONDITIONAL_VERSION_TTL', 2))
+
+# Headers for fallback or error bodies served with a 200: they get no ETag and are not cached
+NO_STORE = {'Cache-Control': 'no-store'}
+
+
+def version_body(filters=None, timestamp_field='analysis_timestamp'):
+    """Search body returning the match count and newest timestamp for filters"""
+    return {
+        "size": 0,
+        "track_total_hits": True,
+        "query": {"bool": {"filter": filters or []}},
+        "aggs": {"latest": {"max": {"field": timestamp_field}}}
+    }
+
+
+def version_tag(response):
+    """Version string from a version_body response"""
+    total = response['hits']['total']
+    count = total['value'] if isinstance(total, dict) else total
+    return f"{count}:{response['aggregations']['latest'].get('value_as_string')}"
+
+
+def make_etag(path, version):
+    return hashlib.sha1(f"{path}|{version}".encode('utf-8')).hexdigest()[:20]
+
+
+class ConditionalGet:
+    """Decorator factory for routes that can answer 304 Not Modified.
+
+    version(**view_kwargs) returns the data version string for a request, or None when
+    the response should not be conditional (e.g. a page behind an expiring cursor);
+    while the view runs, current_version() returns it. Responses sent with
+    Cache-Control: no-store (NO_STORE) are not tagged.
+    """
+
+    def __init__(self, request, response_factory, version_ttl=VERSION_TTL):
+        self.request = request
+        self.response_factory = response_factory
+        self.version_ttl = version_ttl
+        self._versions = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._current = contextvars.ContextVar('conditional_version', default=None)
+        self.not_modified = 0
+        self.version_failures = 0
+        self.versions_reused = 0
+
+    def __call__(self, version):
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                path = self.request.full_path
+                current = self._version(path, version, kwargs)
+                token = self._current.set(current)
+                try:
+                    if current is None:
+                        return view(*args, **kwargs)
+                    etag = make_etag(path, current)
+                    if self.request.if_none_match.contains_weak(etag):
+                        return self._not_modified(etag)
+                    return self._tag(self.response_factory(view(*args, **kwargs)), etag)
+                finally:
+                    self._current.reset(token)
+            return wrapper
+        return decorator
+
+    def current_version(self):
+        """Version the current response's ETag is built from; None outside a view or without one"""
+        return self._current.get()
+
+    def stats(self):
+        return {
+            "not_modified": self.not_modified,
+            "version_failures": self.version_failures,
+            "versions_reused": self.versions_reused
+        }
+
+    def _version(self, path, version, kwargs):
+        current = self._recent(path)
+        if current is None:
+            try:
+                current = self._flight.do(path, lambda: version(**kwargs))
+            except Exception:
+                # No validator is better than a failed request
+                self.version_failures += 1
+                return None
+            if current is not None:
+                self._remember(path, current)
+        return current
+
+    def _recent(self, path):
+        """The path's version if it was looked up less than version_ttl seconds ago"""
+        with self._lock:
+            entry = self._versions.get(path)
+        if entry is not None and time.monotonic() - entry[1] < self.version_ttl:
+            self.versions_reused += 1
+            return entry[0]
+        return None
+
+    def _remember(self, path, current):
+        with self._lock:
+            self._versions.pop(path, None)
+            self._versions[path] = (current, time.monotonic())
+            if len(self._versions) > VERSION_MEMORY:
+                self._versions.popitem(last=False)
+
+    def _not_modified(self, etag):
+        return self._mark_not_modified(self.response_factory('', 304), etag)
+
+    def _mark_not_modified(self, response, etag):
+        self.not_modified += 1
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    @staticmethod
+    def _tag(response, etag):
+        if response.status_code == 200 and 'no-store' not in response.headers.get('Cache-Control', ''):
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+
+class AsyncConditionalGet(ConditionalGet):
+    """ConditionalGet for async views; version(**view_kwargs) is a coroutine function"""
+
+    def __init__(self, request, response_factory, version_ttl=VERSION_TTL):
+        super().__init__(request, response_factory, version_ttl)
+        self._flight = AsyncSingleFlight()
+
+    def __call__(self, version):
+        def decorator(view):
+            @wraps(view)
+            async def wrapper(*args, **kwargs):
+                path = self.request.full_path
+                current = self._recent(path)
+                if current is None:
+                    try:
+                        current = await self._flight.do(path, lambda: version(**kwargs))
+                    except Exception:
+                        self.version_failures += 1
+                        return await view(*args, **kwargs)
+                    if current is None:
+                        return await view(*args, **kwargs)
+                    self._remember(path, current)
+                etag = make_etag(path, current)
+                if self.request.if_none_match.contains_weak(etag):
+                    return self._mark_not_modified(await self.response_factory('', 304), etag)
+                token = self._current.set(current)
+                try:
+                    return self._tag(await self.response_factory(await view(*args, **kwargs)), etag)
+                finally:
+                    self._current.reset(token)
+            return wrapper
+        return decorator
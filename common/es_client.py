@@ -0,0 +1,261 @@
+
+# es_client.py - Shared Elasticsearch client factory
+#
+# Every service builds its client here, configured from the environment:
+#   - a sized connection pool and a short default request timeout
+#   - per-query timeout budgets: es.budget('aggregation').search(...)
+#   - bounded retries with exponential backoff and full jitter, for read calls only
+#     (a retried bulk/index could apply twice)
+#   - a circuit breaker that fails fast with CircuitOpen after repeated cluster
+#     failures, so a degraded cluster does not hold every worker thread for the
+#     full timeout; callers fall back to cached data where they have it. A call is
+#     one failure however many retries it made, counted once they are exhausted
+#   - every call attempt is timed into metrics.py (wall time vs took, slow-query log)
+
+import asyncio
+import functools
+import logging
+import os
+import random
+import threading
+import time
+
+from elasticsearch import AsyncElasticsearch, Elasticsearch, TransportError
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+ELASTICSEARCH_URL = os.environ.get(
+    'ELASTICSEARCH_URL', 'https://a705a31d6c434d5d9b8801b99d0ef7f7.us-central1.gcp.cloud.es.io'
+)
+# Base64 "id:api_key" as shown by Kibana
+ELASTICSEARCH_API_KEY = os.environ.get(
+    'ELASTICSEARCH_API_KEY', 'SEtWQlVKY0JRLUE2QldTNnB3c0U6TXJ6a1dKZ0xIQ01fTndYNWtLRVhhdw=='
+)
+
+ES_CONNECTIONS_PER_NODE = int(os.environ.get('ES_CONNECTIONS_PER_NODE', 25))
+ES_REQUEST_TIMEOUT = float(os.environ.get('ES_REQUEST_TIMEOUT', 10))
+ES_MAX_RETRIES = int(os.environ.get('ES_MAX_RETRIES', 2))
+ES_RETRY_BACKOFF = float(os.environ.get('ES_RETRY_BACKOFF', 0.25))
+ES_RETRY_BACKOFF_MAX = float(os.environ.get('ES_RETRY_BACKOFF_MAX', 2))
+# Sniffing is off by default: Elastic Cloud sits behind a proxy that hides the nodes
+ES_SNIFF = os.environ.get('ES_SNIFF', 'false').lower() == 'true'
+
+# Consecutive failed calls (after their retries) that open the breaker, and how long it stays open
+ES_BREAKER_FAILURES = int(os.environ.get('ES_BREAKER_FAILURES', 5))
+ES_BREAKER_RESET_SECONDS = float(os.environ.get('ES_BREAKER_RESET_SECONDS', 30))
+
+# Request timeout (seconds) per kind of query
+TIMEOUT_BUDGETS = {
+    'interactive': float(os.environ.get('ES_TIMEOUT_INTERACTIVE', 5)),    # page reads, point lookups
+    'aggregation': float(os.environ.get('ES_TIMEOUT_AGGREGATION', 15)),   # dashboard aggregations
+    'export': float(os.environ.get('ES_TIMEOUT_EXPORT', 60)),             # export batches
+    'background': float(os.environ.get('ES_TIMEOUT_BACKGROUND', 30))      # rollup, change feed
+}
+
+# Calls that only read, so a retry cannot apply anything twice
+RETRYABLE_CALLS = frozenset({
+    'search', 'msearch', 'count', 'get', 'exists', 'ping', 'info',
+    'open_point_in_time', 'close_point_in_time'
+})
+RETRYABLE_STATUS = frozenset({429, 502, 503, 504})
+NAMESPACES = frozenset({'indices', 'cluster'})
+
+
+class CircuitOpen(Exception):
+    """Elasticsearch calls are failing fast while the cluster recovers"""
+
+
+def is_cluster_failure(error):
+    """Connection errors, timeouts and overload statuses; 4xx answers do not count"""
+    return isinstance(error, TransportError) or getattr(error, 'status_code', None) in RETRYABLE_STATUS
+
+
+def backoff_delay(attempt, base=ES_RETRY_BACKOFF, maximum=ES_RETRY_BACKOFF_MAX):
+    """Full-jitter exponential backoff for retry number attempt (0-based)"""
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Closed -> open after failure_threshold consecutive failures -> half-open after reset_seconds.
+
+    While half-open a single trial call is let through; its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold=ES_BREAKER_FAILURES, reset_seconds=ES_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._rejected = 0
+        self._opened = 0
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return
+            if state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self._rejected += 1
+        raise CircuitOpen("Elasticsearch is unavailable; failing fast until it recovers")
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or (self._opened_at is None and self._failures >= self.failure_threshold):
+                if self._opened_at is None:
+                    self._opened += 1
+                    logger.error(f"Elasticsearch circuit opened after {self._failures} failures")
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "times_opened": self._opened,
+                "rejected_calls": self._rejected
+            }
+
+
+class GuardedElasticsearch:
+    """Wraps an Elasticsearch client (or namespace) with the breaker and read retries"""
+
+    def __init__(self, client, breaker, max_retries=ES_MAX_RETRIES, budgets=None, budget_name='default', namespace=''):
+        self._client = client
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self._budgets = budgets if budgets is not None else {}
+        # Labels for the call metrics
+        self.budget_name = budget_name
+        self._namespace = namespace
+
+    def budget(self, name):
+        """This client with the request timeout of TIMEOUT_BUDGETS[name]"""
+        if name not in self._budgets:
+            self._budgets[name] = self._wrap(self._client.options(request_timeout=TIMEOUT_BUDGETS[name]), budget_name=name)
+        return self._budgets[name]
+
+    def options(self, **kwargs):
+        return self._wrap(self._client.options(**kwargs))
+
+    def __getattr__(self, name):
+        target = getattr(self._client, name)
+        if name in NAMESPACES:
+            return self._wrap(target, namespace=f"{name}.")
+        if not callable(target):
+            return target
+        return functools.partial(self._call, name, target)
+
+    def _wrap(self, client, budget_name=None, namespace=''):
+        return type(self)(client, self.breaker, self.max_retries, {}, budget_name or self.budget_name, namespace)
+
+    def _observe(self, name, kwargs, started, result=None, error=None):
+        metrics.observe_elasticsearch(
+            self._namespace + name, self.budget_name, kwargs, time.perf_counter() - started, result, error
+        )
+
+    def _attempts(self, name):
+        return 1 + (self.max_retries if name in RETRYABLE_CALLS else 0)
+
+    def _call(self, name, method, *args, **kwargs):
+        # The breaker admits and judges the logical call, not each attempt
+        self.breaker.before_call()
+        attempts = self._attempts(name)
+        for attempt in range(attempts):
+            started = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            except Exception as e:
+                self._observe(name, kwargs, started, error=e)
+                if not is_cluster_failure(e):
+                    self.breaker.record_success()
+                    raise
+                if attempt + 1 >= attempts:
+                    self.breaker.record_failure()
+                    raise
+                time.sleep(backoff_delay(attempt))
+                continue
+            self._observe(name, kwargs, started, result)
+            # ping() reports an unreachable cluster as False rather than raising
+            if name == 'ping' and result is False:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return result
+
+
+class AsyncGuardedElasticsearch(GuardedElasticsearch):
+    """GuardedElasticsearch for AsyncElasticsearch"""
+
+    async def _call(self, name, method, *args, **kwargs):
+        self.breaker.before_call()
+        attempts = self._attempts(name)
+        for attempt in range(attempts):
+            started = time.perf_counter()
+            try:
+                result = await method(*args, **kwargs)
+            except Exception as e:
+                self._observe(name, kwargs, started, error=e)
+                if not is_cluster_failure(e):
+                    self.breaker.record_success()
+                    raise
+                if attempt + 1 >= attempts:
+                    self.breaker.record_failure()
+                    raise
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            self._observe(name, kwargs, started, result)
+            if name == 'ping' and result is False:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return result
+
+
+def client_options(**overrides):
+    """Keyword arguments for Elasticsearch()/AsyncElasticsearch() from the environment"""
+    options = {
+        "hosts": [ELASTICSEARCH_URL],
+        "api_key": ELASTICSEARCH_API_KEY,
+        "verify_certs": True,
+        "connections_per_node": ES_CONNECTIONS_PER_NODE,
+        "request_timeout": ES_REQUEST_TIMEOUT,
+        # Retries are done by GuardedElasticsearch, with jitter and only for reads
+        "max_retries": 0,
+        "retry_on_timeout": False
+    }
+    if ES_SNIFF:
+        options.update(sniff_on_start=True, sniff_on_node_failure=True, min_delay_between_sniffing=60)
+    options.update(overrides)
+    return options
+
+
+def create_client(**overrides):
+    """Pooled, guarded Elasticsearch client"""
+    return GuardedElasticsearch(Elasticsearch(**client_options(**overrides)), CircuitBreaker())
+
+
+def create_async_client(**overrides):
+    """Pooled, guarded AsyncElasticsearch client"""
+    return AsyncGuardedElasticsearch(AsyncElasticsearch(**client_options(**overrides)), CircuitBreaker())
@@ -0,0 +1,165 @@
+
+# fast_json.py - orjson-backed JSON responses and gzip/brotli response compression
+#
+# install(app, request) swaps the app's JSON provider for one that serializes with
+# orjson straight to bytes (falling back to the stdlib encoder when orjson is missing)
+# and compresses JSON responses above COMPRESS_MIN_BYTES for clients that accept it.
+# Works for Flask and Quart apps; streamed responses (exports, SSE) are left alone.
+
+import gzip
+import inspect
+import json
+import os
+from datetime import date, datetime
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder is used without it
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Responses smaller than this are sent uncompressed; the saving would not pay for the CPU
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+# Level 3 is about as fast as level 1 and close to level 6 in size for JSON payloads
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 3))
+# Brotli quality 4-5 compresses better than gzip -6 at a similar speed; 11 is for static files
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 4))
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/csv')
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'to_dict'):
+        # records.py types; orjson serializes them natively
+        return value.to_dict()
+    return str(value)
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps_bytes(obj):
+        """Serialize obj to compact UTF-8 JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps_bytes(obj):
+        """Serialize obj to compact UTF-8 JSON bytes"""
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps(obj):
+    return dumps_bytes(obj).decode('utf-8')
+
+
+def _quality(params):
+    """q value of one Accept-Encoding entry's parameters; a malformed q counts as 0"""
+    for param in params:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def choose_encoding(accept_encoding, available=None):
+    """Encoding the client prefers by q value (brotli before gzip on a tie), or None.
+
+    available limits the choice (e.g. to the precompressed variants of a static file);
+    by default it is every encoding this process can produce. An encoding the header
+    does not name gets the q value of "*", if present.
+    """
+    offered = {}
+    for part in (accept_encoding or '').split(','):
+        coding, *params = part.split(';')
+        offered[coding.strip().lower()] = _quality(params)
+    if available is None:
+        available = ['br', 'gzip'] if brotli is not None else ['gzip']
+    candidates = [coding for coding in ('br', 'gzip') if coding in available]
+    if not candidates:
+        return None
+
+    def quality(coding):
+        return offered.get(coding, offered.get('*', 0))
+
+    best = max(candidates, key=quality)
+    return best if quality(best) > 0 else None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _negotiable(response):
+    """Responses whose encoding depends on Accept-Encoding; streamed bodies are never compressed"""
+    return (
+        response.mimetype in COMPRESSIBLE_MIMETYPES
+        and not getattr(response, 'is_streamed', False)
+        and not getattr(response, 'direct_passthrough', False)
+    )
+
+
+def _should_compress(response, min_bytes):
+    return (
+        response.status_code == 200
+        and 'Content-Encoding' not in response.headers
+        and (response.content_length or 0) >= min_bytes
+    )
+
+
+def _apply(response, data, encoding):
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+
+
+def install(app, request, min_bytes=COMPRESS_MIN_BYTES):
+    """Use dumps_bytes for jsonify() and compress JSON responses on app"""
+    provider_class = type(app.json)
+
+    class FastJSONProvider(provider_class):
+        def dumps(self, obj, **kwargs):
+            return dumps(obj)
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s) if orjson is not None else json.loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = args[0] if len(args) == 1 else (args or kwargs)
+            return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
+
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
+
+    # Quart responses read their body asynchronously
+    if inspect.iscoroutinefunction(app.response_class.get_data):
+        @app.after_request
+        async def compress_response(response):
+            if not _negotiable(response):
+                return response
+            response.vary.add('Accept-Encoding')
+            encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+            if encoding and _should_compress(response, min_bytes):
+                _apply(response, await response.get_data(), encoding)
+            return response
+    else:
+        @app.after_request
+        def compress_response(response):
+            if not _negotiable(response):
+                return response
+            # Caches must key on Accept-Encoding whether or not this response was compressed
+            response.vary.add('Accept-Encoding')
+            encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+            if encoding and _should_compress(response, min_bytes):
+                _apply(response, response.get_data(), encoding)
+            return response
+
+    return app
@@ -0,0 +1,148 @@
+
+# health_monitor.py - Background dependency probing for health, liveness and readiness
+#
+# Each dependency (Elasticsearch, the RAG service, ...) is probed on its own daemon
+# thread every HEALTH_PROBE_INTERVAL seconds. Health endpoints read the last results
+# from memory, so a load balancer polling every second costs no upstream calls and a
+# slow dependency cannot make a health check slow.
+#
+#   liveness  - the process is serving; never depends on a dependency
+#   readiness - every critical dependency's latest probe succeeded and is recent
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_INTERVAL = float(os.environ.get('HEALTH_PROBE_INTERVAL', 5))
+# Consecutive failed probes before a dependency is reported down
+HEALTH_FAILURE_THRESHOLD = int(os.environ.get('HEALTH_FAILURE_THRESHOLD', 2))
+# A result older than this many intervals (e.g. a probe stuck on a hung connection) is not trusted
+HEALTH_STALE_INTERVALS = float(os.environ.get('HEALTH_STALE_INTERVALS', 3))
+
+
+class _Probe:
+    def __init__(self, name, check, critical):
+        self.name = name
+        self.check = check
+        self.critical = critical
+        self.healthy = None
+        self.checked_at = None
+        self.last_checked = None
+        self.last_success = None
+        self.last_failure = None
+        self.latency_ms = None
+        self.error = None
+        self.consecutive_failures = 0
+        self.checks = 0
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            ok = bool(self.check())
+            error = None if ok else "check returned false"
+        except Exception as e:
+            ok, error = False, str(e)
+        latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        now = datetime.utcnow().isoformat()
+        return ok, error, latency_ms, now
+
+
+class HealthMonitor:
+    """Probes dependencies in the background and answers health questions from memory"""
+
+    def __init__(self, interval=HEALTH_PROBE_INTERVAL, failure_threshold=HEALTH_FAILURE_THRESHOLD,
+                 stale_intervals=HEALTH_STALE_INTERVALS):
+        self.interval = interval
+        self.failure_threshold = failure_threshold
+        self.stale_after = interval * stale_intervals
+        self.started_at = time.monotonic()
+        self._probes = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def add(self, name, check, critical=True):
+        """Probe check() (truthy or raises) on an interval; critical probes gate readiness"""
+        self._probes.append(_Probe(name, check, critical))
+        return self
+
+    def start(self):
+        for probe in self._probes:
+            threading.Thread(target=self._run, args=(probe,), name=f'health-{probe.name}', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def snapshot(self):
+        """Latest result per dependency"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                probe.name: {
+                    "healthy": bool(probe.healthy) and not self._stale(probe, now),
+                    "critical": probe.critical,
+                    "stale": self._stale(probe, now),
+                    "last_checked": probe.last_checked,
+                    "last_success": probe.last_success,
+                    "last_failure": probe.last_failure,
+                    "latency_ms": probe.latency_ms,
+                    "consecutive_failures": probe.consecutive_failures,
+                    "checks": probe.checks,
+                    "error": probe.error
+                }
+                for probe in self._probes
+            }
+
+    def ready(self, snapshot=None):
+        """True when every critical dependency is healthy and recently checked"""
+        snapshot = snapshot if snapshot is not None else self.snapshot()
+        return all(result["healthy"] for result in snapshot.values() if result["critical"])
+
+    def uptime_seconds(self):
+        return round(time.monotonic() - self.started_at, 3)
+
+    def stats(self):
+        """Numeric view for /metrics"""
+        return {
+            name: {
+                "healthy": result["healthy"],
+                "latency_ms": result["latency_ms"] or 0.0,
+                "consecutive_failures": result["consecutive_failures"]
+            }
+            for name, result in self.snapshot().items()
+        }
+
+    def _stale(self, probe, now):
+        return probe.checked_at is None or now - probe.checked_at > self.stale_after
+
+    def _run(self, probe):
+        while not self._stopped.is_set():
+            self._record(probe, *probe.run())
+            self._stopped.wait(self.interval)
+
+    def _record(self, probe, ok, error, latency_ms, now):
+        with self._lock:
+            probe.checks += 1
+            probe.checked_at = time.monotonic()
+            probe.last_checked = now
+            probe.latency_ms = latency_ms
+            probe.error = error
+            if ok:
+                probe.healthy = True
+                probe.consecutive_failures = 0
+                probe.last_success = now
+                return
+            probe.consecutive_failures += 1
+            probe.last_failure = now
+            # A single failed probe does not flip a healthy dependency
+            went_down = probe.healthy is not False and (
+                probe.healthy is None or probe.consecutive_failures >= self.failure_threshold
+            )
+            if went_down:
+                probe.healthy = False
+        if went_down:
+            logger.warning(f"Dependency {probe.name} is down: {error}")
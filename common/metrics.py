@@ -0,0 +1,291 @@
+
+# metrics.py - Prometheus metrics for the dashboard services
+#
+# A small in-process registry rendered in the Prometheus text exposition format at
+# /metrics, so no client library is needed. Values are per process: with several
+# workers each one is scraped (or summed) separately.
+#
+#   install(app, request, g)   - per-route latency histogram, response bytes, in-flight
+#                                gauge and the /metrics route (Flask or Quart)
+#   observe_elasticsearch(...) - called by es_client for every cluster call: wall time vs
+#                                the cluster's own `took`, errors, and slow-query logging
+#   expose(prefix, stats_fn)   - publish an existing stats() dict (caches, coalescing, ...)
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+# Elasticsearch calls slower than this (wall time, milliseconds) are logged with their query hash
+SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 1000))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Request parameters that change from page to page of the same query
+VOLATILE_PARAMS = frozenset({'search_after', 'pit', 'id', 'request_timeout'})
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, description, labelnames=()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, description, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), then sum and count
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, [list(series[0]), series[1], series[2]]) for key, series in self._values.items())
+        lines = self._header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _labels(self.labelnames + ('le',), key + (_number(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(float(total))}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class _StatsCollector:
+    """Publishes the numeric fields of a stats() dict as untyped samples"""
+
+    def __init__(self, prefix, stats_fn):
+        self.prefix = prefix
+        self.stats_fn = stats_fn
+
+    def render(self):
+        try:
+            stats = self.stats_fn()
+        except Exception as e:
+            logger.warning(f"Could not collect {self.prefix} metrics: {e}")
+            return []
+        lines = []
+        for key, value in _flatten(stats):
+            name = re.sub(r'[^a-zA-Z0-9_]', '_', f"{self.prefix}_{key}")
+            lines += [f"# TYPE {name} untyped", f"{name} {_number(value)}"]
+        return lines
+
+
+def _flatten(stats, prefix=''):
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}_")
+        elif isinstance(value, (bool, int, float)):
+            yield f"{prefix}{key}", value
+
+
+REGISTRY = []
+
+
+def expose(prefix, stats_fn):
+    """Publish stats_fn()'s numeric fields on /metrics as <prefix>_<field>"""
+    REGISTRY.append(_StatsCollector(prefix, stats_fn))
+
+
+def render():
+    """The whole registry in Prometheus text format"""
+    lines = []
+    for metric in list(REGISTRY):
+        lines += metric.render()
+    return '\n'.join(lines) + '\n'
+
+
+HTTP_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time to produce the response (for streams, until the first byte)',
+    ('route', 'method', 'status')
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    'http_response_size_bytes', 'Response body size as sent, after compression', ('route',), SIZE_BUCKETS
+)
+HTTP_IN_FLIGHT = Gauge('http_requests_in_flight', 'Requests currently being handled')
+
+ES_WALL = Histogram(
+    'elasticsearch_request_duration_seconds', 'Wall time of one Elasticsearch call attempt, as seen by the client',
+    ('operation', 'budget')
+)
+ES_TOOK = Histogram(
+    'elasticsearch_took_seconds', 'Time the cluster reports spending on the request (took)', ('operation', 'budget')
+)
+ES_OVERHEAD = Histogram(
+    'elasticsearch_overhead_seconds', 'Wall time minus took: network, queueing and (de)serialization',
+    ('operation', 'budget')
+)
+ES_ERRORS = Counter('elasticsearch_errors_total', 'Elasticsearch call attempts that raised', ('operation', 'budget'))
+ES_SLOW = Counter(
+    'elasticsearch_slow_queries_total', 'Elasticsearch calls slower than SLOW_QUERY_MS', ('operation', 'budget')
+)
+
+
+def body_hash(params):
+    """Stable short hash of a call's query parameters; pages of one query share it"""
+    stable = {key: value for key, value in params.items() if key not in VOLATILE_PARAMS}
+    encoded = json.dumps(stable, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()[:16]
+
+
+def _took(result):
+    body = getattr(result, 'body', result)
+    took = body.get('took') if isinstance(body, dict) else None
+    return took if isinstance(took, (int, float)) else None
+
+
+def observe_elasticsearch(operation, budget, params, seconds, result=None, error=None):
+    """Record one Elasticsearch call attempt; log it when slower than SLOW_QUERY_MS"""
+    ES_WALL.observe(seconds, operation=operation, budget=budget)
+    took = _took(result)
+    if took is not None:
+        ES_TOOK.observe(took / 1000, operation=operation, budget=budget)
+        ES_OVERHEAD.observe(max(0.0, seconds - took / 1000), operation=operation, budget=budget)
+    if error is not None:
+        ES_ERRORS.inc(operation=operation, budget=budget)
+
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        ES_SLOW.inc(operation=operation, budget=budget)
+        logger.warning(json.dumps({
+            "event": "slow_query",
+            "operation": operation,
+            "budget": budget,
+            "index": params.get('index'),
+            "wall_ms": round(seconds * 1000, 1),
+            "took_ms": took,
+            "body_hash": body_hash(params),
+            "error": type(error).__name__ if error is not None else None
+        }, default=str))
+
+
+def install(app, request, g, path='/metrics'):
+    """Instrument every request on app and serve the registry at path.
+
+    Install before fast_json so the response size is measured after compression
+    (after_request hooks run in reverse order of registration).
+    """
+    def route():
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    def started():
+        if request.path == path:
+            return
+        g._metrics_started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+
+    def finished(response):
+        start = g.get('_metrics_started')
+        if start is not None:
+            g._metrics_recorded = True
+            HTTP_LATENCY.observe(
+                time.perf_counter() - start, route=route(), method=request.method, status=response.status_code
+            )
+            if response.content_length is not None and not getattr(response, 'is_streamed', False):
+                HTTP_RESPONSE_BYTES.observe(response.content_length, route=route())
+        return response
+
+    def torn_down(error=None):
+        start = g.pop('_metrics_started', None)
+        if start is None:
+            return
+        HTTP_IN_FLIGHT.dec()
+        # after_request does not run when a view raises
+        if not g.get('_metrics_recorded'):
+            HTTP_LATENCY.observe(time.perf_counter() - start, route=route(), method=request.method, status=500)
+
+    def metrics_view():
+        return app.response_class(render(), content_type=CONTENT_TYPE)
+
+    # Quart runs plain functions in a thread pool; give it coroutines instead
+    if inspect.iscoroutinefunction(app.response_class.get_data):
+        async def before_request():
+            started()
+
+        async def after_request(response):
+            return finished(response)
+
+        async def teardown_request(error=None):
+            torn_down(error)
+
+        async def view():
+            return metrics_view()
+    else:
+        before_request, after_request, teardown_request, view = started, finished, torn_down, metrics_view
+
+    app.before_request(before_request)
+    app.after_request(after_request)
+    app.teardown_request(teardown_request)
+    app.add_url_rule(path, 'metrics', view, methods=['GET'])
+    return app
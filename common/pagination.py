@@ -0,0 +1,200 @@
+
+# pagination.py - Cursor pagination over Elasticsearch using point-in-time + search_after
+
+import base64
+import copy
+import json
+
+DEFAULT_KEEP_ALIVE = '1m'
+MAX_PAGE_SIZE = 200
+
+# analysis_timestamp gives the order; _shard_doc makes it total within a point-in-time
+PAGE_SORT = [
+    {"analysis_timestamp": {"order": "desc"}},
+    {"_shard_doc": "asc"}
+]
+
+
+class InvalidCursor(ValueError):
+    """The continuation token could not be decoded"""
+
+
+class CursorExpired(Exception):
+    """The point-in-time behind a continuation token no longer exists"""
+
+
+def clamp_page_size(value, default=50, maximum=MAX_PAGE_SIZE):
+    """Parse a requested page size, falling back to default and capping at maximum"""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def encode_cursor(pit_id, search_after, boundary=None):
+    """Pack a point-in-time id, sort values and first-page boundary into an opaque URL-safe token"""
+    cursor = {"pit": pit_id, "after": search_after}
+    if boundary is not None:
+        cursor["until"], cursor["skip"] = boundary
+    payload = json.dumps(cursor, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (pit_id, search_after, boundary) from a token produced by encode_cursor"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        pit_id, search_after = payload['pit'], payload['after']
+        boundary = (payload['until'], payload['skip']) if 'until' in payload else None
+    except Exception:
+        raise InvalidCursor("Invalid pagination cursor")
+    valid = (
+        (isinstance(pit_id, str) and isinstance(search_after, list))
+        or (pit_id is None and search_after is None and boundary is not None)
+    ) and (
+        boundary is None
+        or (isinstance(boundary[0], int) and isinstance(boundary[1], list)
+            and all(isinstance(doc_id, str) for doc_id in boundary[1]))
+    )
+    if not valid:
+        raise InvalidCursor("Invalid pagination cursor")
+    return pit_id, search_after, boundary
+
+
+def first_page_body(body, size):
+    """A plain search for the first page; no point-in-time is opened for it"""
+    paged = copy.deepcopy(body)
+    paged['size'] = size
+    paged['sort'] = PAGE_SORT[:1]
+    return paged
+
+
+def page_body(body, size, pit_id, search_after=None, keep_alive=DEFAULT_KEEP_ALIVE, boundary=None):
+    """Turn a plain search body into one page of a point-in-time search"""
+    paged = copy.deepcopy(body)
+    if boundary is not None:
+        # Only what sorts after the first page: older, or as old and not already shown
+        until, skip = boundary
+        paged['query'] = {
+            "bool": {
+                "filter": [
+                    paged.get('query', {"match_all": {}}),
+                    {"range": {"analysis_timestamp": {"lte": until, "format": "epoch_millis"}}}
+                ],
+                "must_not": [{"ids": {"values": skip}}] if skip else []
+            }
+        }
+    paged['size'] = size
+    paged['sort'] = PAGE_SORT
+    paged['pit'] = {"id": pit_id, "keep_alive": keep_alive}
+    if search_after is not None:
+        paged['search_after'] = search_after
+    return paged
+
+
+def first_page_cursor(response, size):
+    """Token for the page after a first page, or None when there is only one page.
+
+    It holds no point-in-time, only where the first page ended, so it never expires;
+    the point-in-time is opened when the second page is actually requested.
+    """
+    hits = response['hits']['hits']
+    if len(hits) < size:
+        return None
+    until = hits[-1]['sort'][0]
+    skip = [hit['_id'] for hit in hits if hit['sort'][0] == until]
+    return encode_cursor(None, None, (until, skip))
+
+
+def next_cursor(response, size, boundary=None):
+    """Token for the page after response, or None when the results are exhausted"""
+    hits = response['hits']['hits']
+    if len(hits) < size:
+        return None
+    return encode_cursor(response['pit_id'], hits[-1]['sort'], boundary)
+
+
+def search_page(es, index, body, size, cursor=None, keep_alive=DEFAULT_KEEP_ALIVE):
+    """Fetch one page; returns (response, next_cursor).
+
+    The first page is a plain search, so polling it holds nothing open on the cluster.
+    A point-in-time is opened when the second page is requested, so later pages see
+    the same snapshot, and closed as soon as the last page is served.
+    """
+    if not cursor:
+        response = es.search(index=index, body=first_page_body(body, size))
+        return response, first_page_cursor(response, size)
+
+    pit_id, search_after, boundary = decode_cursor(cursor)
+    expires = pit_id is not None
+    if pit_id is None:
+        pit_id = es.open_point_in_time(index=index, keep_alive=keep_alive)['id']
+
+    try:
+        response = es.search(body=page_body(body, size, pit_id, search_after, keep_alive, boundary))
+    except Exception as e:
+        if expires and getattr(e, 'status_code', None) == 404:
+            raise CursorExpired("Pagination cursor has expired; start again without a cursor")
+        raise
+
+    token = next_cursor(response, size, boundary)
+    if token is None:
+        _close_quietly(es, response.get('pit_id', pit_id))
+    return response, token
+
+
+async def async_search_page(es, index, body, size, cursor=None, keep_alive=DEFAULT_KEEP_ALIVE):
+    """search_page for AsyncElasticsearch"""
+    if not cursor:
+        response = await es.search(index=index, body=first_page_body(body, size))
+        return response, first_page_cursor(response, size)
+
+    pit_id, search_after, boundary = decode_cursor(cursor)
+    expires = pit_id is not None
+    if pit_id is None:
+        pit_id = (await es.open_point_in_time(index=index, keep_alive=keep_alive))['id']
+
+    try:
+        response = await es.search(body=page_body(body, size, pit_id, search_after, keep_alive, boundary))
+    except Exception as e:
+        if expires and getattr(e, 'status_code', None) == 404:
+            raise CursorExpired("Pagination cursor has expired; start again without a cursor")
+        raise
+
+    token = next_cursor(response, size, boundary)
+    if token is None:
+        try:
+            await es.close_point_in_time(id=response.get('pit_id', pit_id))
+        except Exception:
+            pass
+    return response, token
+
+
+def iter_hits(es, index, body, batch_size=500, keep_alive=DEFAULT_KEEP_ALIVE):
+    """Yield every hit matching body in page order, holding one batch in memory at a time.
+
+    The point-in-time is closed when iteration finishes or the consumer stops early.
+    """
+    pit_id = es.open_point_in_time(index=index, keep_alive=keep_alive)['id']
+    search_after = None
+    try:
+        while True:
+            response = es.search(body=page_body(body, batch_size, pit_id, search_after, keep_alive))
+            pit_id = response.get('pit_id', pit_id)
+            hits = response['hits']['hits']
+            for hit in hits:
+                yield hit
+            if len(hits) < batch_size:
+                return
+            search_after = hits[-1]['sort']
+    finally:
+        _close_quietly(es, pit_id)
+
+
+def _close_quietly(es, pit_id):
+    try:
+        es.close_point_in_time(id=pit_id)
+    except Exception:
+        pass
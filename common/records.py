@@ -0,0 +1,239 @@
+
+# records.py - Slotted record types for analysis documents returned by the dashboard APIs
+#
+# Each Elasticsearch hit is decoded once into a record. Records are __slots__ dataclasses:
+# no per-instance __dict__, and orjson (fast_json) serializes them directly without
+# building an intermediate dict. Missing or null source fields take their value from
+# DEFAULTS; the project page cards and stage entries keep the placeholders they have
+# always shown, declared next to it as overrides.
+#
+#   LogRecord     - /api/logs rows (backend_fixed.py)
+#   AnalysisCard  - /project-analyses cards (dashboard_queries.py)
+#   StageEntry    - /pipeline-stages entries (dashboard_queries.py)
+
+import json
+import logging
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "project": '',
+    "environment": '',
+    "server": '',
+    "tool": '',
+    "log_type": '',
+    "severity_level": '',
+    "status": '',
+    "analysis_timestamp": '',
+    "correlation_id": '',
+    "affected_components": (),
+    "failure_category": '',
+    "deployment_success": False,
+    "error_count": 0,
+    "warning_count": 0,
+    "business_impact_score": 0,
+    "confidence_score": 0,
+    "executive_summary": '',
+    "resolution_time_estimate": '',
+    "technical_complexity": '',
+    "monitoring_recommendations": ''
+}
+
+CARD_DEFAULTS = dict(
+    DEFAULTS,
+    failure_category='Unknown',
+    severity_level='medium',
+    business_impact_score=0.5,
+    confidence_score=0.8,
+    analysis_timestamp=None,
+    environment='unknown',
+    server='unknown',
+    error_count=1,
+    status='error',
+    resolution_time_estimate='Unknown'
+)
+
+STAGE_DEFAULTS = dict(
+    DEFAULTS,
+    status='unknown',
+    severity_level='medium',
+    confidence_score=0.8,
+    analysis_timestamp=None
+)
+
+NO_ANALYSIS = {
+    "failure_summary": "No analysis available",
+    "root_cause": {},
+    "fix_suggestion": {},
+    "rollback_plan": {},
+    "auto_fix": {},
+    "severity_level": "unknown",
+    "confidence_score": 0.0
+}
+
+
+def decode_json(value):
+    """JSON-encoded source field -> decoded value; empty is None, invalid JSON stays a string"""
+    if not value:
+        return None
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def decode_object(value):
+    """Like decode_json, but anything that is not a JSON object becomes {}"""
+    decoded = decode_json(value)
+    return decoded if isinstance(decoded, dict) else {}
+
+
+def decode_llm_response(value):
+    """llm_response as a dict, or the NO_ANALYSIS placeholder"""
+    decoded = decode_json(value)
+    if isinstance(decoded, dict):
+        return decoded
+    if decoded is not None:
+        logger.error("Error parsing LLM response: not a JSON object")
+    return dict(NO_ANALYSIS)
+
+
+def _value(source, field, defaults):
+    value = source.get(field)
+    return defaults[field] if value is None else value
+
+
+class _Record:
+    __slots__ = ()
+
+    def to_dict(self, fields=None):
+        """Plain dict of the record, limited to fields (in that order) when given"""
+        return {name: getattr(self, name) for name in (fields or self.__slots__)}
+
+
+@dataclass(eq=False)
+class LogRecord(_Record):
+    __slots__ = (
+        'id', 'project', 'environment', 'server', 'tool', 'log_type', 'severity_level',
+        'status', 'analysis_timestamp', 'correlation_id', 'affected_components',
+        'failure_category', 'deployment_success', 'error_count', 'warning_count',
+        'business_impact_score', 'confidence_score', 'executive_summary',
+        'resolution_time_estimate', 'technical_complexity', 'full_synthesis',
+        'monitoring_recommendations'
+    )
+    id: str
+    project: str
+    environment: str
+    server: str
+    tool: str
+    log_type: str
+    severity_level: str
+    status: str
+    analysis_timestamp: str
+    correlation_id: str
+    affected_components: list
+    failure_category: str
+    deployment_success: bool
+    error_count: int
+    warning_count: int
+    business_impact_score: float
+    confidence_score: float
+    executive_summary: str
+    resolution_time_estimate: str
+    technical_complexity: str
+    full_synthesis: object
+    monitoring_recommendations: str
+
+    @classmethod
+    def from_hit(cls, hit):
+        source = hit.get('_source') or {}
+        return cls(hit.get('_id'), *[
+            decode_json(source.get(name)) if name == 'full_synthesis' else _value(source, name, DEFAULTS)
+            for name in cls.__slots__[1:]
+        ])
+
+
+LOG_FIELDS = list(LogRecord.__slots__)
+
+
+@dataclass(eq=False)
+class AnalysisCard(_Record):
+    __slots__ = (
+        'id', 'failure_category', 'severity_level', 'business_impact_score', 'confidence_score',
+        'timestamp', 'environment', 'server', 'error_count', 'status', 'affected_components',
+        'resolution_time_estimate', 'summary', 'root_cause', 'fix_suggestion', 'auto_fix_status'
+    )
+    id: str
+    failure_category: str
+    severity_level: str
+    business_impact_score: float
+    confidence_score: float
+    timestamp: str
+    environment: str
+    server: str
+    error_count: int
+    status: str
+    affected_components: list
+    resolution_time_estimate: str
+    summary: str
+    root_cause: object
+    fix_suggestion: object
+    auto_fix_status: str
+
+    @classmethod
+    def from_hit(cls, hit):
+        source = hit.get('_source') or {}
+        synthesis = decode_object(source.get('full_synthesis'))
+        auto_fix = synthesis.get('auto_fix')
+        return cls(
+            hit.get('_id'),
+            _value(source, 'failure_category', CARD_DEFAULTS),
+            _value(source, 'severity_level', CARD_DEFAULTS),
+            _value(source, 'business_impact_score', CARD_DEFAULTS),
+            _value(source, 'confidence_score', CARD_DEFAULTS),
+            _value(source, 'analysis_timestamp', CARD_DEFAULTS),
+            _value(source, 'environment', CARD_DEFAULTS),
+            _value(source, 'server', CARD_DEFAULTS),
+            _value(source, 'error_count', CARD_DEFAULTS),
+            _value(source, 'status', CARD_DEFAULTS),
+            _value(source, 'affected_components', CARD_DEFAULTS),
+            _value(source, 'resolution_time_estimate', CARD_DEFAULTS),
+            synthesis.get('failure_summary', 'No summary available'),
+            synthesis.get('root_cause', {}),
+            synthesis.get('fix_suggestion', {}),
+            auto_fix.get('status', 'Unknown') if isinstance(auto_fix, dict) else 'Unknown'
+        )
+
+
+@dataclass(eq=False)
+class StageEntry(_Record):
+    __slots__ = ('id', 'timestamp', 'status', 'severity_level', 'confidence_score', 'analysis')
+    id: str
+    timestamp: str
+    status: str
+    severity_level: str
+    confidence_score: float
+    analysis: dict
+
+    @classmethod
+    def from_hit(cls, hit, with_analysis=True):
+        """with_analysis=False skips decoding llm_response (analysis is then None)"""
+        source = hit.get('_source') or {}
+        return cls(
+            hit.get('_id'),
+            _value(source, 'analysis_timestamp', STAGE_DEFAULTS),
+            _value(source, 'status', STAGE_DEFAULTS),
+            _value(source, 'severity_level', STAGE_DEFAULTS),
+            _value(source, 'confidence_score', STAGE_DEFAULTS),
+            decode_llm_response(source.get('llm_response')) if with_analysis else None
+        )
+
+
+def serialize(records, fields=None):
+    """Records ready for jsonify(): as-is, or projected to dicts when fields is given"""
+    if fields is None:
+        return list(records)
+    return [record.to_dict(fields) for record in records]
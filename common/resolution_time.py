@@ -0,0 +1,91 @@
+
+# resolution_time.py - Parse resolution_time_estimate strings into hours for MTTR reporting
+
+import re
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; batch helpers fall back to plain lists
+    np = None
+
+# Hours assumed when a document has no estimate at all (matches the historical '30 minutes' default)
+MISSING_ESTIMATE_HOURS = 0.5
+# Hours assumed when an estimate has no recognizable time unit (e.g. 'Unknown')
+DEFAULT_ESTIMATE_HOURS = 1.0
+
+_UNIT_HOURS = {
+    'w': 168.0,
+    'd': 24.0,
+    'h': 1.0,
+    'm': 1.0 / 60
+}
+
+_NUMBER = r'(\d+(?:\.\d+)?)'
+_UNIT = r'(weeks?|days?|hours?|hrs?|minutes?|mins?)\b'
+
+# '2 hours', '1-2 hours approx', '30 to 45 minutes', '1 hour 30 minutes'
+_QUANTITY_RE = re.compile(_NUMBER + r'(?:\s*(?:-|–|to)\s*' + _NUMBER + r')?\s*' + _UNIT)
+# Loose fallbacks for estimates where the unit is not right after the number
+_UNIT_RE = re.compile(_UNIT)
+_NUMBER_RE = re.compile(_NUMBER)
+
+
+def _midpoint(low, high):
+    return (float(low) + float(high)) / 2 if high else float(low)
+
+
+@lru_cache(maxsize=1024)
+def parse_resolution_hours(estimate):
+    """Convert one estimate such as '2-4 hours' into hours; never raises"""
+    if estimate is None or estimate == '':
+        return MISSING_ESTIMATE_HOURS
+    if isinstance(estimate, (int, float)):
+        return float(estimate)
+
+    text = str(estimate).lower()
+
+    quantities = _QUANTITY_RE.findall(text)
+    if quantities:
+        return sum(_midpoint(low, high) * _UNIT_HOURS[unit[0]] for low, high, unit in quantities)
+
+    unit = _UNIT_RE.search(text)
+    if unit is None:
+        return DEFAULT_ESTIMATE_HOURS
+
+    unit_hours = _UNIT_HOURS[unit.group(1)[0]]
+    number = _NUMBER_RE.search(text)
+    if number is not None:
+        return float(number.group(1)) * unit_hours
+    # A bare unit: 'minutes' historically meant 30 minutes, anything else one unit
+    return 0.5 if unit_hours < 1 else unit_hours
+
+
+def parse_resolution_hours_batch(estimates):
+    """Convert a sequence of estimates into an array of hours in one call.
+
+    Distinct strings are parsed once and scattered back through an index array,
+    so the cost is proportional to the number of distinct estimates. Returns a
+    float64 NumPy array, or a list of floats when NumPy is not installed.
+    """
+    estimates = list(estimates)
+    lookup = {}
+    codes = [lookup.setdefault(estimate, len(lookup)) for estimate in estimates]
+    table = [parse_resolution_hours(estimate) for estimate in lookup]
+
+    if np is None:
+        return [table[code] for code in codes]
+    return np.asarray(table, dtype=np.float64)[np.asarray(codes, dtype=np.intp)]
+
+
+def weighted_mean_hours(estimates, weights):
+    """Mean hours over estimates weighted by counts (e.g. terms aggregation buckets)"""
+    hours = parse_resolution_hours_batch(estimates)
+    if np is not None:
+        weights = np.asarray(weights, dtype=np.float64)
+        total = weights.sum()
+        return float(np.dot(hours, weights) / total) if total > 0 else 0.0
+
+    weights = list(weights)
+    total = sum(weights)
+    return sum(h * w for h, w in zip(hours, weights)) / total if total > 0 else 0.0
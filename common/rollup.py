@@ -0,0 +1,401 @@
+
+# rollup.py - Incrementally maintained per-(tool, project, environment, server, day) summaries
+#
+# The dashboard landing pages only need per-project totals, yet aggregating cicd_analysis
+# for them gets slower as the index grows. This module folds new analyses into a compact
+# rollup index: one document per (tool, project, environment, server, day) holding counts
+# and sums. Landing-page queries aggregate the rollup instead, so their cost depends on the
+# number of projects and days, not on the number of analyses.
+#
+# Each refresh folds one window, watermark < analysis_timestamp <= now - settle time:
+#   1. claim it: the state document records it as pending (optimistic concurrency, so
+#      several service instances can run the refresher and only one takes a window)
+#   2. merge every changed row; each row remembers the last window merged into it and the
+#      merge script skips a window it has already applied
+#   3. advance the watermark to the end of the window once the last bulk flush succeeded
+# A window that fails part-way, or whose worker dies, stays pending and is retried with the
+# same bounds - by its owner on the next refresh, by anyone once ROLLUP_CLAIM_TIMEOUT has
+# passed - so rows flushed before the failure are not counted twice and no window is lost.
+# Analyses indexed with a timestamp older than the watermark are not picked up;
+# ROLLUP_SETTLE_SECONDS should cover the ingest delay.
+#
+# Every service refreshing the same rollup must read the same source fields, so the field
+# suffix comes from ROLLUP_FIELD_SUFFIX only. The state document records the suffix the
+# rollup was built with, and a refresher configured differently refuses to claim windows.
+
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from resolution_time import parse_resolution_hours
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_INDEX = os.environ.get('ROLLUP_INDEX', 'cicd_analysis_rollup')
+ROLLUP_STATE_INDEX = os.environ.get('ROLLUP_STATE_INDEX', 'cicd_analysis_rollup_state')
+# Suffix of the keyword variant of string fields in the source index; the same for every writer
+ROLLUP_FIELD_SUFFIX = os.environ.get('ROLLUP_FIELD_SUFFIX', '.keyword')
+ROLLUP_SETTLE_SECONDS = int(os.environ.get('ROLLUP_SETTLE_SECONDS', 60))
+ROLLUP_REFRESH_INTERVAL = int(os.environ.get('ROLLUP_REFRESH_INTERVAL', 60))
+# A pending window claimed longer ago than this is presumed abandoned and may be taken over
+ROLLUP_CLAIM_TIMEOUT = int(os.environ.get('ROLLUP_CLAIM_TIMEOUT', 300))
+ROLLUP_ENABLED = os.environ.get('ROLLUP_ENABLED', 'true').lower() == 'true'
+
+WATERMARK_ID = 'watermark'
+DIMENSIONS = ('tool', 'project', 'environment', 'server')
+
+# Numeric rollup fields; every one of them is summed when rollup rows are merged or read.
+# MTTR is mttr_hours_sum / error_status_count, average build time build_duration_sum / build_duration_count
+SUM_FIELDS = (
+    'count', 'success_count', 'error_status_count', 'warning_status_count',
+    'error_count', 'warning_count', 'build_duration_sum', 'build_duration_count',
+    'mttr_hours_sum'
+)
+
+ROLLUP_MAPPING = {
+    "properties": dict(
+        {dimension: {"type": "keyword"} for dimension in DIMENSIONS},
+        day={"type": "date"},
+        last_seen={"type": "date"},
+        window={"type": "keyword"},
+        **{field: {"type": "double" if field.endswith('_sum') else "long"} for field in SUM_FIELDS}
+    )
+}
+
+STATE_MAPPING = {
+    "properties": {
+        "watermark": {"type": "date"},
+        "field_suffix": {"type": "keyword"},
+        "pending": {
+            "properties": {
+                "after": {"type": "date"},
+                "through": {"type": "date"},
+                "owner": {"type": "keyword"},
+                "claimed_at": {"type": "double"}
+            }
+        }
+    }
+}
+
+# Windows are identified by their end; a row already merged for this window (or a later
+# one) is left alone, which makes retrying a window safe
+MERGE_SCRIPT = """
+if (ctx._source.window != null && ctx._source.window.compareTo(params.window) >= 0) {
+    ctx.op = 'noop';
+} else {
+    for (entry in params.sums.entrySet()) {
+        def current = ctx._source[entry.getKey()];
+        ctx._source[entry.getKey()] = (current == null ? 0 : current) + entry.getValue();
+    }
+    if (params.last_seen != null && (ctx._source.last_seen == null || ctx._source.last_seen.compareTo(params.last_seen) < 0)) {
+        ctx._source.last_seen = params.last_seen;
+    }
+    ctx._source.window = params.window;
+}
+"""
+
+
+def summary_aggs():
+    """Sub-aggregations that total rollup rows back into per-group figures"""
+    aggs = {field: {"sum": {"field": field}} for field in SUM_FIELDS}
+    aggs['last_seen'] = {"max": {"field": "last_seen"}}
+    return aggs
+
+
+def summary_values(bucket):
+    """Read summary_aggs() results out of a bucket as plain numbers"""
+    values = {field: bucket[field]['value'] or 0 for field in SUM_FIELDS}
+    last_seen = bucket['last_seen']
+    values['last_seen'] = last_seen.get('value_as_string') if last_seen.get('value') is not None else None
+    return values
+
+
+def version_body():
+    """Size-0 search giving the rollup's data version (total analyses, newest analysis)"""
+    return {
+        "size": 0,
+        "aggs": {"count": {"sum": {"field": "count"}}, "latest": {"max": {"field": "last_seen"}}}
+    }
+
+
+def version_tag(response):
+    aggregations = response['aggregations']
+    return f"rollup:{int(aggregations['count']['value'] or 0)}:{aggregations['latest'].get('value_as_string')}"
+
+
+class FieldSuffixMismatch(RuntimeError):
+    """The rollup was built from source fields with a different suffix than this refresher's"""
+
+
+class AnalysisRollup:
+    """Maintains and describes the rollup index for one source index"""
+
+    def __init__(self, es, source_index='cicd_analysis', rollup_index=ROLLUP_INDEX,
+                 state_index=ROLLUP_STATE_INDEX, field_suffix=ROLLUP_FIELD_SUFFIX,
+                 settle_seconds=ROLLUP_SETTLE_SECONDS, page_size=500, claim_timeout=ROLLUP_CLAIM_TIMEOUT):
+        self.es = es
+        self.source_index = source_index
+        self.rollup_index = rollup_index
+        self.state_index = state_index
+        self.field_suffix = field_suffix
+        self.settle_seconds = settle_seconds
+        self.page_size = page_size
+        self.claim_timeout = claim_timeout
+        self.owner = uuid.uuid4().hex
+
+        self._pending = []
+        self._last_refresh = None
+        self._last_rows = 0
+        self._refresh_failures = 0
+        self._retried_windows = 0
+        self._ready = None
+        self._ready_checked_at = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    def source_field(self, name):
+        return name + self.field_suffix
+
+    def is_ready(self, max_age=60):
+        """True once a first refresh has completed (checked at most every max_age seconds)"""
+        if not ROLLUP_ENABLED:
+            return False
+        if self._ready is None or time.monotonic() - self._ready_checked_at > max_age:
+            try:
+                self._ready = self._read_state()[0].get('watermark') is not None
+            except Exception:
+                self._ready = False
+            self._ready_checked_at = time.monotonic()
+        return self._ready
+
+    def ensure_indices(self):
+        if not self.es.indices.exists(index=self.rollup_index):
+            self.es.indices.create(index=self.rollup_index, mappings=ROLLUP_MAPPING)
+        if not self.es.indices.exists(index=self.state_index):
+            self.es.indices.create(index=self.state_index, mappings=STATE_MAPPING)
+
+    def refresh(self):
+        """Fold analyses newer than the watermark into the rollup; returns rows merged"""
+        self.ensure_indices()
+        state, version = self._read_state()
+        window = self._claim_window(state, version)
+        if window is None:
+            return 0
+        after, through, version = window
+
+        self._pending = []
+        rows = 0
+        for bucket in self._changed_buckets(after, through):
+            self._merge(bucket, through)
+            rows += 1
+        self._flush()
+        # Every row of the window is merged; only now does the watermark move
+        self._commit_window(through, version)
+
+        self._ready = True
+        self._ready_checked_at = time.monotonic()
+        self._last_refresh = through
+        self._last_rows = rows
+        logger.info(f"Rollup advanced to {through}: {rows} rows merged")
+        return rows
+
+    def start(self, interval=ROLLUP_REFRESH_INTERVAL):
+        """Run refresh() every interval seconds on a daemon thread"""
+        if not ROLLUP_ENABLED or interval <= 0 or self._thread is not None:
+            return
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.refresh()
+                except Exception as e:
+                    self._refresh_failures += 1
+                    logger.error(f"Rollup refresh failed: {e}")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, name='rollup-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            "enabled": ROLLUP_ENABLED,
+            "ready": bool(self._ready),
+            "last_refresh": self._last_refresh,
+            "last_rows": self._last_rows,
+            "refresh_failures": self._refresh_failures,
+            "retried_windows": self._retried_windows
+        }
+
+    def _read_state(self):
+        """(state document, (seq_no, primary_term)); ({}, None) before the first claim"""
+        try:
+            document = self.es.get(index=self.state_index, id=WATERMARK_ID)
+        except Exception as e:
+            if getattr(e, 'status_code', None) == 404:
+                return {}, None
+            raise
+        return document['_source'], (document['_seq_no'], document['_primary_term'])
+
+    def _claim_window(self, state, version):
+        """Claim the next window, or take over a pending one; returns (after, through, version) or None"""
+        built_with = state.get('field_suffix')
+        if built_with is not None and built_with != self.field_suffix:
+            # Rows keyed by the wrong fields would be null or fail, and the watermark would
+            # still move past them; leave the window to the refreshers that match
+            raise FieldSuffixMismatch(
+                f"Rollup was built with field suffix {built_with!r} but ROLLUP_FIELD_SUFFIX is {self.field_suffix!r}"
+            )
+        watermark = state.get('watermark')
+        pending = state.get('pending')
+        if pending:
+            ours = pending.get('owner') == self.owner
+            if not ours and time.time() - (pending.get('claimed_at') or 0) < self.claim_timeout:
+                logger.info("Rollup window is being folded by another worker")
+                return None
+            after, through = pending.get('after'), pending['through']
+            self._retried_windows += 1
+            logger.warning(f"Retrying rollup window {after} - {through}")
+        else:
+            after = watermark
+            through = (datetime.now(timezone.utc) - timedelta(seconds=self.settle_seconds)).isoformat(timespec='microseconds')
+            if watermark is not None and watermark >= through:
+                return None
+
+        claimed = {
+            "watermark": watermark,
+            "field_suffix": self.field_suffix,
+            "pending": {"after": after, "through": through, "owner": self.owner, "claimed_at": time.time()}
+        }
+        version = self._write_state(claimed, version)
+        if version is None:
+            logger.info("Rollup window already claimed by another worker")
+            return None
+        return after, through, version
+
+    def _commit_window(self, through, version):
+        if self._write_state({"watermark": through, "field_suffix": self.field_suffix}, version) is None:
+            # Taken over after the claim timed out; the merge is idempotent, so the
+            # other worker finishing the same window does not count it again
+            logger.warning(f"Rollup window ending {through} was taken over before it was committed")
+
+    def _write_state(self, state, version):
+        """Write the state document if it is still at version; returns the new version or None on conflict"""
+        try:
+            if version is None:
+                response = self.es.create(index=self.state_index, id=WATERMARK_ID, document=state, refresh=True)
+            else:
+                response = self.es.index(
+                    index=self.state_index, id=WATERMARK_ID, document=state,
+                    if_seq_no=version[0], if_primary_term=version[1], refresh=True
+                )
+        except Exception as e:
+            if getattr(e, 'status_code', None) == 409:
+                return None
+            raise
+        return response['_seq_no'], response['_primary_term']
+
+    def _changed_buckets(self, watermark, upper):
+        """Composite-aggregate the window, one page of buckets at a time"""
+        time_range = {"lte": upper}
+        if watermark is not None:
+            time_range["gt"] = watermark
+
+        sources = [
+            {dimension: {"terms": {"field": self.source_field(dimension), "missing_bucket": True}}}
+            for dimension in DIMENSIONS
+        ]
+        sources.append({"day": {"date_histogram": {"field": "analysis_timestamp", "calendar_interval": "1d"}}})
+
+        body = {
+            "size": 0,
+            "query": {"range": {"analysis_timestamp": time_range}},
+            "aggs": {
+                "rows": {
+                    "composite": {"size": self.page_size, "sources": sources},
+                    "aggs": {
+                        "successes": {"filter": {"term": {"deployment_success": True}}},
+                        "error_status": {
+                            "filter": {"term": {self.source_field('status'): "error"}},
+                            "aggs": {
+                                "resolution_estimates": {
+                                    "terms": {
+                                        "field": self.source_field('resolution_time_estimate'),
+                                        "size": 500,
+                                        "missing": "30 minutes"
+                                    }
+                                }
+                            }
+                        },
+                        "warning_status": {"filter": {"term": {self.source_field('status'): "warning"}}},
+                        "error_count": {"sum": {"field": "error_count"}},
+                        "warning_count": {"sum": {"field": "warning_count"}},
+                        "build_duration": {"stats": {"field": "build_duration_seconds"}},
+                        "last_seen": {"max": {"field": "analysis_timestamp"}}
+                    }
+                }
+            }
+        }
+
+        while True:
+            response = self.es.search(index=self.source_index, body=body)
+            rows = response['aggregations']['rows']
+            for bucket in rows['buckets']:
+                yield bucket
+            if len(rows['buckets']) < self.page_size or 'after_key' not in rows:
+                return
+            body['aggs']['rows']['composite']['after'] = rows['after_key']
+
+    def _merge(self, bucket, window):
+        key = bucket['key']
+        error_status = bucket['error_status']
+        mttr_hours_sum = sum(
+            parse_resolution_hours(estimate['key']) * estimate['doc_count']
+            for estimate in error_status['resolution_estimates']['buckets']
+        )
+        build_duration = bucket['build_duration']
+
+        sums = {
+            'count': bucket['doc_count'],
+            'success_count': bucket['successes']['doc_count'],
+            'error_status_count': error_status['doc_count'],
+            'warning_status_count': bucket['warning_status']['doc_count'],
+            'error_count': bucket['error_count']['value'] or 0,
+            'warning_count': bucket['warning_count']['value'] or 0,
+            'build_duration_sum': build_duration['sum'] or 0,
+            'build_duration_count': build_duration['count'] or 0,
+            'mttr_hours_sum': mttr_hours_sum
+        }
+        last_seen = bucket['last_seen'].get('value_as_string')
+        day = datetime.fromtimestamp(key['day'] / 1000, timezone.utc).date().isoformat()
+        row_id = hashlib.sha1('|'.join(
+            [str(key[dimension]) for dimension in DIMENSIONS] + [day]
+        ).encode('utf-8')).hexdigest()
+
+        upsert = {dimension: key[dimension] for dimension in DIMENSIONS}
+        upsert.update(sums, day=day, last_seen=last_seen, window=window)
+
+        self._pending.extend([
+            {"update": {"_index": self.rollup_index, "_id": row_id, "retry_on_conflict": 3}},
+            {
+                "script": {"source": MERGE_SCRIPT, "lang": "painless", "params": {"sums": sums, "last_seen": last_seen, "window": window}},
+                "upsert": upsert
+            }
+        ])
+        if len(self._pending) >= 2 * self.page_size:
+            self._flush()
+
+    def _flush(self):
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        response = self.es.bulk(operations=pending, refresh='wait_for')
+        if response.get('errors'):
+            failed = [item for item in response['items'] if item['update'].get('error')]
+            raise RuntimeError(f"{len(failed)} rollup rows failed to update: {failed[0]['update']['error']}")
@@ -0,0 +1,140 @@
+
+# singleflight.py - Collapse identical concurrent Elasticsearch queries into one in-flight call
+
+import asyncio
+import hashlib
+import json
+import threading
+
+
+def search_key(index, body):
+    """Build a stable key for an (index, body) pair regardless of dict ordering"""
+    encoded = json.dumps(body, sort_keys=True, separators=(',', ':'), default=str)
+    return f"{index}:{hashlib.sha1(encoded.encode('utf-8')).hexdigest()}"
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share its outcome.
+
+    The first caller for a key executes the function. Callers arriving while it is
+    still running block until it finishes and receive the same result (or exception).
+    Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+        self._executions = 0
+        self._collapsed = 0
+        self._max_waiters = 0
+
+    def do(self, key, fn):
+        """Execute fn for key, or wait for the execution already in flight"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._collapsed += 1
+                self._max_waiters = max(self._max_waiters, call.waiters)
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        """Return coalescing counters"""
+        with self._lock:
+            requests = self._executions + self._collapsed
+            return {
+                "requests": requests,
+                "executions": self._executions,
+                "collapsed": self._collapsed,
+                "collapse_rate": round(self._collapsed / requests, 4) if requests else 0.0,
+                "max_waiters": self._max_waiters,
+                "in_flight": len(self._calls)
+            }
+
+
+class AsyncSingleFlight:
+    """asyncio counterpart of SingleFlight for a single event loop.
+
+    Waiters await the leader's task instead of blocking a thread, so hundreds of
+    identical in-flight requests cost one Elasticsearch query and no extra threads.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+        self._executions = 0
+        self._collapsed = 0
+        self._max_waiters = 0
+        self._waiters = {}
+
+    async def do(self, key, coroutine_fn):
+        """Await coroutine_fn() for key, or the execution already in flight"""
+        task = self._calls.get(key)
+        if task is not None:
+            self._collapsed += 1
+            self._waiters[key] += 1
+            self._max_waiters = max(self._max_waiters, self._waiters[key])
+            # shield() so one cancelled waiter does not cancel the shared query
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(coroutine_fn())
+        self._calls[key] = task
+        self._waiters[key] = 0
+        self._executions += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._forget(key, task)
+            else:
+                task.add_done_callback(lambda _: self._forget(key, task))
+
+    def stats(self):
+        """Return coalescing counters"""
+        requests = self._executions + self._collapsed
+        return {
+            "requests": requests,
+            "executions": self._executions,
+            "collapsed": self._collapsed,
+            "collapse_rate": round(self._collapsed / requests, 4) if requests else 0.0,
+            "max_waiters": self._max_waiters,
+            "in_flight": len(self._calls)
+        }
+
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+            del self._waiters[key]
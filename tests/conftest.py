@@ -0,0 +1,37 @@
+
+# conftest.py - Shared fixtures for the Python service tests
+#
+# The services import their modules flat (see the sys.path setup at the top of each
+# service script), so the tests put the same directories on sys.path. Elasticsearch is
+# the benchmark stand-in (benchmarks/fake_es.py) served on a free local port.
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ('common', 'alpha-ui-main', os.path.join('chatbot', 'services'), ''):
+    path = os.path.join(ROOT, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Services imported by the tests must not reach for the cloud cluster or the RAG service
+os.environ.setdefault('ELASTICSEARCH_URL', 'http://127.0.0.1:9')
+os.environ.setdefault('ELASTICSEARCH_API_KEY', 'test')
+os.environ.setdefault('CHATBOT_SERVICE_URL', 'http://127.0.0.1:9')
+os.environ.setdefault('ES_MAX_RETRIES', '0')
+
+
+@pytest.fixture
+def fake_cluster():
+    """An empty FakeCluster served over HTTP; yields (cluster, Elasticsearch client)"""
+    elasticsearch = pytest.importorskip('elasticsearch')
+    from benchmarks.fake_es import FakeCluster, serve
+
+    cluster = FakeCluster()
+    server = serve(cluster, port=0)
+    client = elasticsearch.Elasticsearch(f"http://127.0.0.1:{server.server_address[1]}")
+    yield cluster, client
+    client.close()
+    server.shutdown()
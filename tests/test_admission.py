@@ -0,0 +1,119 @@
+
+# test_admission.py - Concurrency limit, fair queueing and rejections for chat messages
+
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, Rejected
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+class Waiter(threading.Thread):
+    """Acquires a slot for session in the background and records the outcome"""
+
+    def __init__(self, admission, session, order=None):
+        super().__init__(daemon=True)
+        self.admission = admission
+        self.session = session
+        self.order = order
+        self.release = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.release = self.admission.acquire(self.session)
+            if self.order is not None:
+                self.order.append(self.session)
+        except Rejected as e:
+            self.error = e
+
+
+def queue(admission, session, order=None):
+    """Start a waiter and return once it is in the queue"""
+    queued = admission.stats()['queued']
+    waiter = Waiter(admission, session, order)
+    waiter.start()
+    wait_until(lambda: admission.stats()['queued'] == queued + 1)
+    return waiter
+
+
+def test_slots_are_granted_at_once_up_to_the_limit():
+    admission = AdmissionController(max_concurrent=2)
+    releases = [admission.acquire('a'), admission.acquire('b')]
+    assert admission.stats()['active'] == 2
+
+    for release in releases:
+        release()
+        release()
+    assert admission.stats()['active'] == 0
+
+
+def test_sessions_take_turns_for_freed_slots():
+    admission = AdmissionController(max_concurrent=1, max_per_session=3, max_wait=5)
+    release = admission.acquire('holder')
+    order = []
+    waiters = [queue(admission, session, order) for session in ('burst', 'burst', 'burst', 'other')]
+
+    served = []
+    while len(served) < len(waiters):
+        release()
+        wait_until(lambda: len(order) == len(served) + 1)
+        granted = next(w for w in waiters if w.release is not None and w not in served)
+        served.append(granted)
+        release = granted.release
+    release()
+
+    # 'other' is served second even though it queued behind three 'burst' messages
+    assert order == ['burst', 'other', 'burst', 'burst']
+    assert admission.stats()['active'] == 0
+
+
+def test_a_session_with_too_many_waiting_messages_gets_429():
+    admission = AdmissionController(max_concurrent=1, max_per_session=1, max_wait=5)
+    release = admission.acquire('holder')
+    waiter = queue(admission, 'burst')
+
+    with pytest.raises(Rejected) as rejected:
+        admission.acquire('burst')
+    assert rejected.value.status == 429
+    assert rejected.value.retry_after >= 1
+
+    release()
+    waiter.join(5)
+    waiter.release()
+
+
+def test_a_full_queue_gets_503():
+    admission = AdmissionController(max_concurrent=1, max_queue=1, max_wait=5)
+    release = admission.acquire('holder')
+    waiter = queue(admission, 'a')
+
+    with pytest.raises(Rejected) as rejected:
+        admission.acquire('b')
+    assert rejected.value.status == 503
+
+    release()
+    waiter.join(5)
+    waiter.release()
+
+
+def test_waiting_longer_than_max_wait_gets_503_and_leaves_the_queue():
+    admission = AdmissionController(max_concurrent=1, max_wait=0.05)
+    release = admission.acquire('holder')
+
+    with pytest.raises(Rejected) as rejected:
+        admission.acquire('a')
+    assert rejected.value.status == 503
+    assert admission.stats()['queued'] == 0
+    assert admission.stats()['waiting_sessions'] == 0
+
+    release()
+    admission.acquire('a')()
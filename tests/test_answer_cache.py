@@ -0,0 +1,114 @@
+
+# test_answer_cache.py - Normalization, versioning and expiry of cached chatbot answers
+
+import pytest
+
+from answer_cache import AnswerCache, DataVersion, normalize_message
+
+
+class Clock:
+    """Stand-in for time.monotonic that the test moves forward by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr('answer_cache.time.monotonic', clock)
+    return clock
+
+
+class Version:
+    """DataVersion stand-in whose value the test sets directly"""
+
+    def __init__(self, value='12:2025-01-31T12:00:00.000Z'):
+        self.value = value
+
+    def current(self):
+        return self.value
+
+
+@pytest.mark.parametrize('message, normalized', [
+    ('Why did the build FAIL for project X?', 'why did build fail for project x'),
+    ('  why   did build fail for project x ', 'why did build fail for project x'),
+    ("What’s wrong with alpha-ui v1.2?", 'what is wrong with alpha-ui v1.2'),
+    ("Hi, please show errors on api/v2 #123!", 'show errors on api/v2 #123'),
+    ('ＡＬＰＨＡ status', 'alpha status'),
+    ('the?', ''),
+])
+def test_normalize_message(message, normalized):
+    assert normalize_message(message) == normalized
+
+
+def test_data_version_is_fetched_once_per_ttl(clock):
+    fetches = []
+    version = DataVersion(lambda: fetches.append(1) or f"v{len(fetches)}", ttl=10)
+    assert [version.current() for _ in range(3)] == ['v1'] * 3
+    clock.now += 10
+    assert version.current() == 'v2'
+
+
+def test_data_version_is_unknown_while_elasticsearch_fails(clock):
+    def fetch():
+        raise ConnectionError("cluster down")
+
+    assert DataVersion(fetch).current() is None
+
+
+def test_same_question_in_other_words_is_a_hit(clock):
+    cache = AnswerCache(Version())
+    cache.put(cache.key('Why did the build fail for alpha?'), 'answer')
+    assert cache.get(cache.key("why did build fail for ALPHA")) == 'answer'
+    assert cache.stats()['hits'] == 1
+
+
+def test_new_data_version_misses_older_answers(clock):
+    version = Version()
+    cache = AnswerCache(version)
+    cache.put(cache.key('status of alpha'), 'old answer')
+    version.value = '13:2025-01-31T12:05:00.000Z'
+    assert cache.get(cache.key('status of alpha')) is None
+
+
+@pytest.mark.parametrize('cache, message, use_cache', [
+    (AnswerCache(Version(None)), 'status of alpha', True),
+    (AnswerCache(Version(), enabled=False), 'status of alpha', True),
+    (AnswerCache(Version()), 'status of alpha', False),
+    (AnswerCache(Version()), 'hello!', True),
+])
+def test_bypassed_lookups(cache, message, use_cache):
+    key = cache.key(message, use_cache=use_cache)
+    assert key is None
+    cache.put(key, 'answer')
+    assert cache.get(key) is None
+    assert cache.stats()['bypassed'] == 1
+    assert cache.stats()['entries'] == 0
+
+
+def test_answers_expire_after_the_ttl(clock):
+    cache = AnswerCache(Version(), ttl=60)
+    key = cache.key('status of alpha')
+    cache.put(key, 'answer')
+    clock.now += 59
+    assert cache.get(key) == 'answer'
+    clock.now += 1
+    assert cache.get(key) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_answer_is_evicted(clock):
+    cache = AnswerCache(Version(), max_entries=2)
+    a, b, c = (cache.key(f'status of {project}') for project in ('alpha', 'beta', 'gamma'))
+    cache.put(a, 'a')
+    cache.put(b, 'b')
+    cache.get(a)
+    cache.put(c, 'c')
+
+    assert cache.get(b) is None
+    assert (cache.get(a), cache.get(c)) == ('a', 'c')
+    assert cache.stats()['evictions'] == 1
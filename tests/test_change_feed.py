@@ -0,0 +1,106 @@
+
+# test_change_feed.py - Change detection and delivery of the Server-Sent Events feed
+
+import json
+import threading
+
+import pytest
+
+from change_feed import ChangeFeed, Subscription
+
+
+def analysis(tool, project, timestamp, status='success'):
+    return {
+        "tool": tool, "project": project, "environment": "prod", "server": "web-1",
+        "status": status, "analysis_timestamp": timestamp
+    }
+
+
+@pytest.fixture
+def feed(fake_cluster):
+    cluster, client = fake_cluster
+    cluster.load('cicd_analysis', [
+        ('a1', analysis('jenkins', 'alpha', '2025-01-31T12:00:00.000Z')),
+        ('a2', analysis('github', 'alpha', '2025-01-31T11:00:00.000Z')),
+    ])
+    feed = ChangeFeed(client, 'cicd_analysis', overlap=60)
+    feed.poll()
+    return cluster, feed
+
+
+def events(subscription):
+    received = []
+    while not subscription.events.empty():
+        message = subscription.events.get_nowait()
+        event, data = message.split('\n')[:2]
+        received.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    return received
+
+
+def subscribe(feed, tool, project):
+    """Register a subscriber without starting the poller thread; the tests poll by hand"""
+    subscription = Subscription(tool, project)
+    feed._subscribers.setdefault((tool, project), set()).add(subscription)
+    return subscription
+
+
+def test_priming_publishes_nothing_and_records_the_latest_analyses(feed):
+    _, feed = feed
+    assert feed.latest_timestamp('jenkins', 'alpha') == '2025-01-31T12:00:00.000Z'
+    assert feed.latest_timestamp(None, 'alpha') == '2025-01-31T12:00:00.000Z'
+    assert feed.latest_timestamp('github', 'beta') is None
+
+
+def test_events_go_to_the_tool_they_belong_to(feed):
+    cluster, feed = feed
+    jenkins = subscribe(feed, 'jenkins', 'alpha')
+    github = subscribe(feed, 'github', 'alpha')
+    any_tool = subscribe(feed, None, 'alpha')
+
+    cluster.write('cicd_analysis', 'a3', analysis('github', 'alpha', '2025-01-31T12:05:00.000Z', 'error'))
+    feed.poll()
+
+    assert events(jenkins) == []
+    [(event, data)] = events(github)
+    assert event == 'change'
+    assert (data['tool'], data['new_analyses'], data['status_counts']) == ('github', 1, {"error": 1})
+    assert [analysis['id'] for analysis in data['analyses']] == ['a3']
+    assert [data['tool'] for _, data in events(any_tool)] == ['github']
+
+
+def test_late_analysis_inside_the_overlap_is_published_once(feed):
+    cluster, feed = feed
+    subscription = subscribe(feed, 'jenkins', 'alpha')
+
+    # Indexed now, but stamped before the newest analysis already seen
+    cluster.write('cicd_analysis', 'late', analysis('jenkins', 'alpha', '2025-01-31T11:59:30.000Z'))
+    feed.poll()
+    feed.poll()
+
+    [(_, data)] = events(subscription)
+    assert [analysis['id'] for analysis in data['analyses']] == ['late']
+    assert feed.latest_timestamp('jenkins', 'alpha') == '2025-01-31T12:00:00.000Z'
+
+
+def test_latest_timestamp_can_be_read_while_the_poller_advances(feed):
+    _, feed = feed
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        while not stop.is_set():
+            try:
+                feed.latest_timestamp(None, 'alpha')
+            except Exception as e:
+                errors.append(e)
+                return
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for n in range(20000):
+        feed._advance((f'tool-{n}', f'project-{n}'), n, str(n))
+    stop.set()
+    for reader in readers:
+        reader.join()
+    assert not errors
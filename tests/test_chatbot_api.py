@@ -0,0 +1,77 @@
+
+# test_chatbot_api.py - Health, liveness and readiness routes of the chat gateway
+
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_cors')
+pytest.importorskip('requests')
+pytest.importorskip('elasticsearch')
+
+import chatbot_api  # noqa: E402
+from health_monitor import HealthMonitor  # noqa: E402
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    """Test client plus a switch for the RAG service probe; Elasticsearch stays down"""
+    rag = {"up": True}
+    monitor = HealthMonitor(interval=0.02, failure_threshold=1).add(
+        'chatbot_service', lambda: rag["up"]
+    ).add('elasticsearch', lambda: False, critical=False).start()
+    monkeypatch.setattr(chatbot_api, 'health', monitor)
+
+    def settle():
+        """Wait for both probes to run again after a change"""
+        checks = {name: result["checks"] for name, result in monitor.snapshot().items()}
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            if all(result["checks"] > checks[name] + 1 for name, result in monitor.snapshot().items()):
+                return
+            time.sleep(0.01)
+
+    settle()
+    yield chatbot_api.app.test_client(), rag, settle
+    monitor.stop()
+
+
+def test_live_does_not_depend_on_dependencies(gateway):
+    client, rag, settle = gateway
+    rag["up"] = False
+    settle()
+
+    response = client.get('/live')
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "alive"
+
+
+def test_ready_and_healthy_while_the_rag_service_is_up(gateway):
+    client, _, _ = gateway
+
+    response = client.get('/ready')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["status"] == "ready"
+    # Elasticsearch is down, but it only feeds the answer cache
+    assert body["dependencies"]["elasticsearch"]["healthy"] is False
+
+    response = client.get('/health')
+    assert response.status_code == 200
+    assert response.get_json()["chatbot_service"] == "connected"
+
+
+def test_not_ready_and_degraded_while_the_rag_service_is_down(gateway):
+    client, rag, settle = gateway
+    rag["up"] = False
+    settle()
+
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert response.get_json()["status"] == "not_ready"
+
+    response = client.get('/health')
+    assert response.status_code == 503
+    assert response.get_json()["status"] == "degraded"
+    assert response.get_json()["chatbot_service"] == "disconnected"
@@ -0,0 +1,133 @@
+
+# test_conditional.py - ETag tagging, 304 answers and version reuse of ConditionalGet
+
+import pytest
+
+from conditional import NO_STORE, ConditionalGet, make_etag
+from response_cache import ResponseCache, make_key
+
+flask = pytest.importorskip('flask')
+
+
+@pytest.fixture
+def service():
+    """A Flask app with conditional, cached routes whose data and version the test controls"""
+    app = flask.Flask(__name__)
+    conditional = ConditionalGet(flask.request, flask.make_response, version_ttl=0)
+    cache = ResponseCache(default_ttl=60)
+    data = {"version": "1", "lookups": 0, "builds": 1}
+
+    def version(**kwargs):
+        data["lookups"] += 1
+        if data["version"] is None:
+            raise RuntimeError("Elasticsearch unavailable")
+        return data["version"]
+
+    @app.route('/projects/<project>')
+    @conditional(version)
+    def project(project):
+        # Cached per data version, as backend_fixed.py caches its aggregations
+        return flask.jsonify(cache.get_or_compute(
+            make_key('project', project=project, version=conditional.current_version()),
+            lambda: {"project": project, "builds": data["builds"], "version": conditional.current_version()}
+        ))
+
+    @app.route('/logs')
+    @conditional(lambda: None if flask.request.args.get('cursor') else version())
+    def logs():
+        return flask.jsonify([]), 200, {'X-Next-Cursor': 'next'}
+
+    @app.route('/fallback')
+    @conditional(version)
+    def fallback():
+        return flask.jsonify([]), 200, NO_STORE
+
+    return app.test_client(), conditional, data
+
+
+def test_response_is_tagged_and_revalidated_with_304(service):
+    client, conditional, _ = service
+
+    response = client.get('/projects/alpha')
+    assert response.status_code == 200
+    assert response.headers['ETag'] == f'W/"{make_etag("/projects/alpha?", "1")}"'
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    response = client.get('/projects/alpha', headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert conditional.stats()['not_modified'] == 1
+
+
+def test_new_version_gives_a_new_etag_and_a_current_body(service):
+    client, _, data = service
+    etag = client.get('/projects/alpha').headers['ETag']
+
+    data["version"], data["builds"] = "2", 2
+    response = client.get('/projects/alpha', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json() == {"project": "alpha", "builds": 2, "version": "2"}
+
+
+def test_path_first_seen_at_a_new_version_is_not_served_an_older_cached_body(service):
+    client, _, data = service
+    assert client.get('/projects/alpha').get_json()["builds"] == 1
+
+    # Another path reads the same cached payload; it has never seen version 1
+    data["version"], data["builds"] = "2", 2
+    response = client.get('/projects/alpha?view=compact')
+    assert response.headers['ETag'] == f'W/"{make_etag("/projects/alpha?view=compact", "2")}"'
+    assert response.get_json()["builds"] == 2
+
+
+def test_current_version_is_only_set_while_the_view_runs(service):
+    _, conditional, _ = service
+    assert conditional.current_version() is None
+
+
+def test_etags_differ_per_path(service):
+    client, _, _ = service
+    assert client.get('/projects/alpha').headers['ETag'] != client.get('/projects/beta').headers['ETag']
+
+
+def test_no_store_responses_are_not_tagged(service):
+    client, _, _ = service
+    response = client.get('/fallback')
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    assert response.headers['Cache-Control'] == 'no-store'
+
+
+def test_failed_version_lookup_serves_the_view_untagged(service):
+    client, conditional, data = service
+    data["version"] = None
+
+    response = client.get('/projects/alpha', headers={'If-None-Match': '*'})
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    assert conditional.stats()['version_failures'] == 1
+
+
+def test_version_is_reused_within_the_ttl(service):
+    client, conditional, data = service
+    conditional.version_ttl = 60
+
+    etag = client.get('/projects/alpha').headers['ETag']
+    data["version"] = "2"
+    assert client.get('/projects/alpha', headers={'If-None-Match': etag}).status_code == 304
+    assert data["lookups"] == 1
+    assert conditional.stats()['versions_reused'] == 1
+
+
+def test_pages_behind_a_cursor_are_never_conditional(service):
+    client, conditional, _ = service
+    etag = client.get('/logs').headers['ETag']
+    assert client.get('/logs', headers={'If-None-Match': etag}).status_code == 304
+
+    response = client.get('/logs?cursor=abc', headers={'If-None-Match': '*'})
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    assert response.headers['X-Next-Cursor'] == 'next'
+    assert conditional.stats()['version_failures'] == 0
@@ -0,0 +1,186 @@
+
+# test_es_client.py - Read retries and the circuit breaker around the Elasticsearch client
+
+import asyncio
+
+import pytest
+from elasticsearch import ConnectionError as ESConnectionError
+
+import es_client
+from es_client import AsyncGuardedElasticsearch, CircuitBreaker, CircuitOpen, GuardedElasticsearch
+
+
+class Overloaded(Exception):
+    status_code = 503
+
+
+class NotFound(Exception):
+    status_code = 404
+
+
+class Clock:
+    """Stand-in for time.monotonic that the test moves forward by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeClient:
+    """Answers each call with the next scripted outcome; an exception instance is raised"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def _next(self, name):
+        self.calls.append(name)
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def search(self, **kwargs):
+        return self._next('search')
+
+    def index(self, **kwargs):
+        return self._next('index')
+
+    def ping(self):
+        return self._next('ping')
+
+
+class AsyncFakeClient(FakeClient):
+
+    async def search(self, **kwargs):
+        return self._next('search')
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr('es_client.time.monotonic', clock)
+    monkeypatch.setattr('es_client.time.sleep', lambda seconds: None)
+    return clock
+
+
+def guarded(client, max_retries=2, failure_threshold=3):
+    return GuardedElasticsearch(client, CircuitBreaker(failure_threshold, reset_seconds=30), max_retries=max_retries)
+
+
+def test_backoff_delay_is_capped_full_jitter():
+    for attempt in range(10):
+        assert 0 <= es_client.backoff_delay(attempt, base=0.25, maximum=2) <= min(2, 0.25 * 2 ** attempt)
+
+
+def test_transient_read_failures_are_retried(clock):
+    client = FakeClient(ESConnectionError("reset"), Overloaded(), {"hits": {}})
+    es = guarded(client)
+    assert es.search(index='cicd_analysis') == {"hits": {}}
+    assert client.calls == ['search'] * 3
+    assert es.breaker.stats()['consecutive_failures'] == 0
+
+
+def test_writes_are_never_retried(clock):
+    client = FakeClient(ESConnectionError("reset"), {"result": "created"})
+    es = guarded(client)
+    with pytest.raises(ESConnectionError):
+        es.index(index='cicd_analysis', document={})
+    assert client.calls == ['index']
+
+
+def test_client_errors_are_raised_at_once_and_do_not_trip_the_breaker(clock):
+    client = FakeClient(NotFound())
+    es = guarded(client, failure_threshold=1)
+    with pytest.raises(NotFound):
+        es.search(index='missing')
+    assert client.calls == ['search']
+    assert es.breaker.state == 'closed'
+
+
+def test_a_call_is_one_failure_however_many_retries_it_made(clock):
+    client = FakeClient(ESConnectionError("down"))
+    es = guarded(client, max_retries=2, failure_threshold=2)
+
+    with pytest.raises(ESConnectionError):
+        es.search(index='cicd_analysis')
+    assert len(client.calls) == 3
+    assert es.breaker.stats()['consecutive_failures'] == 1
+    assert es.breaker.state == 'closed'
+
+    with pytest.raises(ESConnectionError):
+        es.search(index='cicd_analysis')
+    assert es.breaker.state == 'open'
+
+
+def test_open_breaker_fails_fast_then_half_opens_for_one_trial(clock):
+    client = FakeClient(ESConnectionError("down"))
+    es = guarded(client, max_retries=0, failure_threshold=2)
+    for _ in range(2):
+        with pytest.raises(ESConnectionError):
+            es.search(index='cicd_analysis')
+
+    with pytest.raises(CircuitOpen):
+        es.search(index='cicd_analysis')
+    assert len(client.calls) == 2
+    assert es.breaker.stats()['rejected_calls'] == 1
+
+    # A failed trial re-opens it for another full cooldown
+    clock.now += 30
+    assert es.breaker.state == 'half-open'
+    with pytest.raises(ESConnectionError):
+        es.search(index='cicd_analysis')
+    assert es.breaker.state == 'open'
+
+    clock.now += 30
+    client.outcomes = [{"hits": {}}]
+    assert es.search(index='cicd_analysis') == {"hits": {}}
+    assert es.breaker.stats() == {
+        "state": "closed", "consecutive_failures": 0, "times_opened": 1, "rejected_calls": 1
+    }
+
+
+def test_half_open_admits_a_single_trial_at_a_time(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+
+def test_ping_false_counts_as_a_failure(clock):
+    es = guarded(FakeClient(False), failure_threshold=1)
+    assert es.ping() is False
+    assert es.breaker.state == 'open'
+
+
+def test_budgets_share_the_breaker(clock):
+    class OptionsClient(FakeClient):
+        def options(self, **kwargs):
+            return self
+
+    es = guarded(OptionsClient(ESConnectionError("down")), max_retries=0, failure_threshold=1)
+    with pytest.raises(ESConnectionError):
+        es.budget('aggregation').search(index='cicd_analysis')
+    with pytest.raises(CircuitOpen):
+        es.budget('interactive').search(index='cicd_analysis')
+
+
+def test_async_client_retries_and_trips_the_same_way(clock, monkeypatch):
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr('es_client.asyncio.sleep', no_sleep)
+    client = AsyncFakeClient(Overloaded(), {"hits": {}})
+    es = AsyncGuardedElasticsearch(client, CircuitBreaker(1, reset_seconds=30), max_retries=1)
+    assert asyncio.run(es.search(index='cicd_analysis')) == {"hits": {}}
+    assert client.calls == ['search'] * 2
+
+    client.outcomes = [ESConnectionError("down")]
+    with pytest.raises(ESConnectionError):
+        asyncio.run(es.search(index='cicd_analysis'))
+    with pytest.raises(CircuitOpen):
+        asyncio.run(es.search(index='cicd_analysis'))
@@ -0,0 +1,93 @@
+
+# test_fast_json.py - JSON serialization and response compression
+
+import asyncio
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+
+import fast_json
+
+flask = pytest.importorskip('flask')
+
+PAYLOAD = [{"project": f"project-{n}", "status": "success", "error_count": n} for n in range(200)]
+
+
+@pytest.fixture
+def client():
+    app = fast_json.install(flask.Flask(__name__), flask.request)
+
+    @app.route('/projects')
+    def projects():
+        return flask.jsonify(PAYLOAD)
+
+    @app.route('/small')
+    def small():
+        return flask.jsonify({"status": "ok"})
+
+    @app.route('/missing')
+    def missing():
+        return flask.jsonify(PAYLOAD), 404
+
+    @app.route('/export')
+    def export():
+        return flask.Response((json.dumps(row) + '\n' for row in PAYLOAD), mimetype='application/x-ndjson')
+
+    return app.test_client()
+
+
+def test_dumps_handles_dates_and_non_string_keys():
+    assert json.loads(fast_json.dumps({"at": datetime(2025, 1, 31, 12, 0), 1: "one"})) == {
+        "at": "2025-01-31T12:00:00", "1": "one"
+    }
+
+
+def test_large_json_is_compressed_with_the_preferred_encoding(client):
+    response = client.get('/projects', headers={'Accept-Encoding': 'gzip;q=1.0, br;q=0.5'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.data)) == PAYLOAD
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+
+def test_brotli_wins_a_tie(client):
+    brotli = pytest.importorskip('brotli')
+    response = client.get('/projects', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert json.loads(brotli.decompress(response.data)) == PAYLOAD
+
+
+@pytest.mark.parametrize('path, accept_encoding', [
+    ('/projects', 'gzip;q=0.0, br;q=0'),
+    ('/projects', 'identity'),
+    ('/small', 'gzip, br'),
+    ('/missing', 'gzip, br'),
+])
+def test_uncompressed_responses_still_vary_on_accept_encoding(client, path, accept_encoding):
+    response = client.get(path, headers={'Accept-Encoding': accept_encoding})
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+
+def test_streamed_exports_are_left_alone(client):
+    response = client.get('/export', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert len(response.data.splitlines()) == len(PAYLOAD)
+
+
+def test_quart_responses_are_compressed_too():
+    quart = pytest.importorskip('quart')
+    app = fast_json.install(quart.Quart(__name__), quart.request)
+
+    @app.route('/projects')
+    async def projects():
+        return quart.jsonify(PAYLOAD)
+
+    async def fetch():
+        response = await app.test_client().get('/projects', headers={'Accept-Encoding': 'gzip'})
+        return response.headers, await response.get_data()
+
+    headers, body = asyncio.run(fetch())
+    assert headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(body)) == PAYLOAD
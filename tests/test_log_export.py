@@ -0,0 +1,70 @@
+
+# test_log_export.py - Chunked NDJSON / CSV export encoders
+
+import csv
+import io
+import json
+
+import pytest
+
+from log_export import csv_chunks, csv_error, ndjson_chunks, ndjson_error
+
+ROWS = [
+    {"id": f"doc-{n}", "project": "alpha", "status": "error" if n % 3 else "success",
+     "affected_components": ["api", "db"], "error_count": n, "summary": 'says "hi", then, leaves\n'}
+    for n in range(500)
+]
+
+
+def failing(rows, after):
+    """Yield rows, then fail as a lost Elasticsearch connection would"""
+    for n, row in enumerate(rows):
+        if n == after:
+            raise ConnectionError("connection reset")
+        yield row
+
+
+def test_ndjson_round_trip_in_bounded_chunks():
+    chunks = list(ndjson_chunks(ROWS, chunk_bytes=4096))
+    assert len(chunks) > 1
+    assert all(len(chunk) < 4096 + 1024 for chunk in chunks)
+    assert [json.loads(line) for line in ''.join(chunks).splitlines()] == ROWS
+
+
+def test_csv_round_trip_with_header_and_nested_values():
+    columns = ["id", "status", "affected_components", "error_count", "summary", "missing"]
+    text = ''.join(csv_chunks(ROWS, columns, chunk_bytes=4096))
+    rows = list(csv.reader(io.StringIO(text)))
+
+    assert rows[0] == columns
+    assert len(rows) == len(ROWS) + 1
+    assert rows[2] == ["doc-1", "error", '["api","db"]', "1", 'says "hi", then, leaves\n', ""]
+
+
+def test_empty_exports():
+    assert list(ndjson_chunks([])) == []
+    assert list(csv_chunks([], ["id"])) == ["id\r\n"]
+
+
+def test_ndjson_failure_sends_buffered_rows_before_raising():
+    received = []
+    with pytest.raises(ConnectionError):
+        for chunk in ndjson_chunks(failing(ROWS, 10)):
+            received.append(chunk)
+    assert len(''.join(received).splitlines()) == 10
+
+
+def test_csv_failure_sends_buffered_rows_then_the_marker_is_one_row():
+    received = []
+    with pytest.raises(ConnectionError):
+        for chunk in csv_chunks(failing(ROWS, 10), ["id", "status"]):
+            received.append(chunk)
+    received.append(csv_error('connection reset, "retry"'))
+
+    rows = list(csv.reader(io.StringIO(''.join(received))))
+    assert len(rows) == 12
+    assert rows[-1] == ['# export incomplete: connection reset, "retry"']
+
+
+def test_ndjson_error_line():
+    assert json.loads(ndjson_error("timed out")) == {"error": "timed out"}
@@ -0,0 +1,117 @@
+
+# test_pagination.py - Continuation tokens and point-in-time paging
+
+import pytest
+
+from pagination import (
+    MAX_PAGE_SIZE, PAGE_SORT, CursorExpired, InvalidCursor, clamp_page_size, decode_cursor,
+    encode_cursor, first_page_cursor, iter_hits, next_cursor, page_body, search_page
+)
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, 50), ('', 50), ('abc', 50), ('10', 10), ('0', 1), ('-5', 1), ('100000', MAX_PAGE_SIZE)
+])
+def test_clamp_page_size(value, expected):
+    assert clamp_page_size(value) == expected
+
+
+def test_cursor_round_trip():
+    after = ["2025-01-31T12:00:00.000Z", 17]
+    token = encode_cursor("pit-id==", after)
+    assert '=' not in token
+    assert decode_cursor(token) == ("pit-id==", after, None)
+    assert decode_cursor(encode_cursor("pit", after, (1700000000000, ["a"]))) == ("pit", after, (1700000000000, ["a"]))
+    assert decode_cursor(encode_cursor(None, None, (1700000000000, []))) == (None, None, (1700000000000, []))
+
+
+@pytest.mark.parametrize('token', [
+    'not a cursor',
+    encode_cursor(None, []),
+    encode_cursor('pit', 'not-a-list'),
+    encode_cursor(None, None),
+    encode_cursor(None, None, ('2025-01-01', [])),
+    encode_cursor(None, None, (1700000000000, [1])),
+    'eyJwaXQiOiJ4In0',  # {"pit":"x"} without search_after
+])
+def test_invalid_cursor(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token)
+
+
+def test_page_body_leaves_the_original_body_alone():
+    body = {"query": {"term": {"project": "alpha"}}}
+    paged = page_body(body, 25, 'pit', ['x', 3])
+
+    assert paged['size'] == 25
+    assert paged['sort'] == PAGE_SORT
+    assert paged['pit'] == {"id": 'pit', "keep_alive": '1m'}
+    assert paged['search_after'] == ['x', 3]
+    assert body == {"query": {"term": {"project": "alpha"}}}
+    assert 'search_after' not in page_body(body, 25, 'pit')
+
+
+def test_page_body_limits_later_pages_to_what_follows_the_first():
+    paged = page_body({"query": {"term": {"project": "alpha"}}}, 10, 'pit', boundary=(1700000000000, ['a', 'b']))
+    assert paged['query']['bool']['filter'][0] == {"term": {"project": "alpha"}}
+    assert paged['query']['bool']['filter'][1]['range']['analysis_timestamp']['lte'] == 1700000000000
+    assert paged['query']['bool']['must_not'] == [{"ids": {"values": ['a', 'b']}}]
+
+
+def test_next_cursor_stops_at_a_short_page():
+    full = {"pit_id": "pit-2", "hits": {"hits": [{"sort": [2, 0]}, {"sort": [1, 1]}]}}
+    assert decode_cursor(next_cursor(full, 2)) == ("pit-2", [1, 1], None)
+    assert next_cursor(full, 3) is None
+
+
+def test_first_page_cursor_records_where_the_page_ended():
+    page = {"hits": {"hits": [{"_id": "a", "sort": [3]}, {"_id": "b", "sort": [2]}, {"_id": "c", "sort": [2]}]}}
+    assert decode_cursor(first_page_cursor(page, 3)) == (None, None, (2, ["b", "c"]))
+    assert first_page_cursor(page, 4) is None
+
+
+@pytest.fixture
+def analyses(fake_cluster):
+    from benchmarks.synthetic import Corpus
+
+    cluster, client = fake_cluster
+    documents = list(Corpus(projects=4, seed=3).documents(95))
+    # Analyses sharing a timestamp across the end of the first page
+    for doc_id, source in documents[:6]:
+        source['analysis_timestamp'] = '2025-02-01T00:00:00.000Z'
+    cluster.load('cicd_analysis', documents)
+    return cluster, client
+
+
+def read_all(client, size, body=None):
+    seen, cursor = [], None
+    while True:
+        response, cursor = search_page(client, 'cicd_analysis', body or {"query": {"match_all": {}}}, size, cursor)
+        seen.extend(hit['_id'] for hit in response['hits']['hits'])
+        if cursor is None:
+            return seen
+
+
+@pytest.mark.parametrize('size', [4, 20, 95])
+def test_pages_cover_every_hit_once(analyses, size):
+    cluster, client = analyses
+    seen = read_all(client, size)
+
+    assert len(seen) == len(set(seen)) == 95
+    assert not cluster.pits
+    assert set(seen) == {hit['_id'] for hit in iter_hits(client, 'cicd_analysis', {"query": {"match_all": {}}}, batch_size=30)}
+
+
+def test_first_page_holds_no_point_in_time(analyses):
+    cluster, client = analyses
+    for _ in range(5):
+        response, cursor = search_page(client, 'cicd_analysis', {"query": {"match_all": {}}}, 20)
+        assert cursor is not None
+    assert not cluster.pits
+
+    # The first page's cursor does not expire; the point-in-time opens with the second page
+    response, cursor = search_page(client, 'cicd_analysis', {"query": {"match_all": {}}}, 20, cursor)
+    assert len(cluster.pits) == 1
+    client.close_point_in_time(id=decode_cursor(cursor)[0])
+    with pytest.raises(CursorExpired):
+        search_page(client, 'cicd_analysis', {"query": {"match_all": {}}}, 20, cursor)
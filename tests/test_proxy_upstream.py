@@ -0,0 +1,123 @@
+
+# test_proxy_upstream.py - Concurrency slots and connections of the streaming proxy
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+flask = pytest.importorskip('flask')
+requests = pytest.importorskip('requests')
+serving = pytest.importorskip('werkzeug.serving')
+
+from proxy_upstream import Upstream, UpstreamBusy  # noqa: E402
+
+MAX_CONCURRENCY = 3
+BODY = b'{"projects": []}' * 4096
+
+
+class Backend(BaseHTTPRequestHandler):
+    """Upstream answering with an ETag and honouring If-None-Match; /api/slow holds its body"""
+
+    protocol_version = 'HTTP/1.1'
+    release = threading.Event()
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == 'W/"v1"':
+            self.send_response(304)
+            self.send_header('ETag', 'W/"v1"')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.send_header('ETag', 'W/"v1"')
+        self.end_headers()
+        self.wfile.flush()
+        if self.path == '/api/slow':
+            self.release.wait(5)
+        if self.command != 'HEAD':
+            self.wfile.write(BODY)
+
+    do_HEAD = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def proxy():
+    """(proxy base URL, Upstream) for a Flask proxy served by Werkzeug, as in production"""
+    backend = ThreadingHTTPServer(('127.0.0.1', 0), Backend)
+    threading.Thread(target=backend.serve_forever, daemon=True).start()
+    upstream = Upstream('dashboard', f"http://127.0.0.1:{backend.server_address[1]}",
+                        max_concurrency=MAX_CONCURRENCY, acquire_timeout=0.2)
+
+    app = flask.Flask(__name__)
+
+    @app.route('/api/<path:path>')
+    def proxy_api(path):
+        try:
+            return upstream.forward(flask.request.method, f'/api/{path}', headers=flask.request.headers)
+        except UpstreamBusy as e:
+            return {"error": str(e)}, 503
+
+    server = serving.make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", upstream
+    server.shutdown()
+    backend.shutdown()
+
+
+def free_slots(upstream):
+    """Slots available once the server has closed every response"""
+    deadline = time.monotonic() + 2
+    while upstream._slots._value < MAX_CONCURRENCY and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return upstream._slots._value
+
+
+def test_bodies_are_relayed_and_release_their_slot(proxy):
+    url, upstream = proxy
+    for _ in range(MAX_CONCURRENCY * 2):
+        response = requests.get(f"{url}/api/data")
+        assert response.status_code == 200
+        assert response.content == BODY
+    assert free_slots(upstream) == MAX_CONCURRENCY
+
+
+def test_304_and_head_responses_release_their_slot(proxy):
+    url, upstream = proxy
+    for _ in range(MAX_CONCURRENCY * 3):
+        response = requests.get(f"{url}/api/data", headers={'If-None-Match': 'W/"v1"'})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == 'W/"v1"'
+        assert requests.head(f"{url}/api/data").status_code == 200
+
+    assert free_slots(upstream) == MAX_CONCURRENCY
+    assert requests.get(f"{url}/api/data").status_code == 200
+
+
+def test_requests_over_the_limit_are_refused_while_slots_are_held(proxy):
+    url, upstream = proxy
+    Backend.release.clear()
+    bodies = []
+    held = [
+        threading.Thread(target=lambda: bodies.append(requests.get(f"{url}/api/slow").content))
+        for _ in range(MAX_CONCURRENCY)
+    ]
+    for thread in held:
+        thread.start()
+    deadline = time.monotonic() + 2
+    while upstream._slots._value and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    try:
+        assert requests.get(f"{url}/api/data").status_code == 503
+    finally:
+        Backend.release.set()
+        for thread in held:
+            thread.join()
+    assert bodies == [BODY] * MAX_CONCURRENCY
+    assert free_slots(upstream) == MAX_CONCURRENCY
@@ -0,0 +1,51 @@
+
+# test_resolution_time.py - Parsing resolution_time_estimate strings into hours
+
+import pytest
+
+import resolution_time
+from resolution_time import (
+    DEFAULT_ESTIMATE_HOURS, MISSING_ESTIMATE_HOURS, parse_resolution_hours,
+    parse_resolution_hours_batch, weighted_mean_hours
+)
+
+
+@pytest.mark.parametrize('estimate, hours', [
+    ('2 hours', 2.0),
+    ('1 hour', 1.0),
+    ('45 minutes', 0.75),
+    ('30 mins', 0.5),
+    ('1-2 hours approx', 1.5),
+    ('30 to 45 minutes', 0.625),
+    ('2–4 hrs', 3.0),
+    ('1 hour 30 minutes', 1.5),
+    ('1 day', 24.0),
+    ('2 weeks', 336.0),
+    ('Approximately 3 HOURS', 3.0),
+    ('hours: about 4', 4.0),
+    ('minutes', 0.5),
+    ('days', 24.0),
+    ('Unknown', DEFAULT_ESTIMATE_HOURS),
+    ('', MISSING_ESTIMATE_HOURS),
+    (None, MISSING_ESTIMATE_HOURS),
+    (3, 3.0),
+])
+def test_parse_resolution_hours(estimate, hours):
+    assert parse_resolution_hours(estimate) == pytest.approx(hours)
+
+
+def test_batch_matches_single_parses():
+    estimates = ['2 hours', '30 minutes', '2 hours', None, 'Unknown', '1-2 days']
+    assert list(parse_resolution_hours_batch(estimates)) == [parse_resolution_hours(e) for e in estimates]
+
+
+def test_batch_without_numpy(monkeypatch):
+    monkeypatch.setattr(resolution_time, 'np', None)
+    assert parse_resolution_hours_batch(['2 hours', '2 hours', '30 minutes']) == [2.0, 2.0, 0.5]
+    assert weighted_mean_hours(['2 hours', '30 minutes'], [1, 3]) == pytest.approx(0.875)
+    assert weighted_mean_hours([], []) == 0.0
+
+
+def test_weighted_mean_hours():
+    assert weighted_mean_hours(['2 hours', '30 minutes'], [1, 3]) == pytest.approx(0.875)
+    assert weighted_mean_hours(['2 hours'], [0]) == 0.0
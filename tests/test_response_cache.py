@@ -0,0 +1,126 @@
+
+# test_response_cache.py - TTL, stale-while-revalidate and fallback behaviour of ResponseCache
+
+import threading
+import time
+
+from response_cache import ResponseCache, make_key
+
+
+class Clock:
+    """Stand-in for time.monotonic that the test moves forward by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(monkeypatch, **options):
+    clock = Clock()
+    monkeypatch.setattr('response_cache.time.monotonic', clock)
+    cacheable = lambda value: value.get('status') == 'success'  # noqa: E731
+    return ResponseCache(default_ttl=10, stale_ttl=60, cacheable=cacheable, **options), clock
+
+
+def wait_for_refreshes(cache, count):
+    deadline = time.monotonic() + 5
+    while cache.stats()['background_refreshes'] + cache.stats()['refresh_failures'] < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_make_key_ignores_empty_parameters_and_order():
+    assert make_key('logs', project=' alpha ', server=None, severity='') == make_key('logs', project='alpha')
+    assert make_key('servers', project='a', environment='prod') == make_key('servers', environment='prod', project='a')
+    assert make_key('servers', project='a') != make_key('environments', project='a')
+
+
+def test_fresh_entry_is_served_without_recomputing(monkeypatch):
+    cache, clock = make_cache(monkeypatch)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"status": "success", "n": len(calls)}
+
+    assert cache.get_or_compute('k', compute) == {"status": "success", "n": 1}
+    clock.now += 9
+    assert cache.get_or_compute('k', compute)["n"] == 1
+    assert len(calls) == 1
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 1)
+
+
+def test_stale_entry_is_served_while_one_background_refresh_runs(monkeypatch):
+    cache, clock = make_cache(monkeypatch)
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        if len(calls) > 1:
+            release.wait(5)
+        return {"status": "success", "n": len(calls)}
+
+    cache.get_or_compute('k', compute)
+    clock.now += 30
+    # Past the TTL: every caller gets the old value at once; only one refresh starts
+    assert [cache.get_or_compute('k', compute)["n"] for _ in range(5)] == [1] * 5
+    release.set()
+    wait_for_refreshes(cache, 1)
+
+    assert len(calls) == 2
+    assert cache.get_or_compute('k', compute)["n"] == 2
+    assert cache.stats()['stale_hits'] == 5
+
+
+def test_failed_refresh_keeps_the_last_good_value(monkeypatch):
+    cache, clock = make_cache(monkeypatch)
+    cache.get_or_compute('k', lambda: {"status": "success", "n": 1})
+    clock.now += 30
+
+    cache.get_or_compute('k', lambda: {"status": "error"})
+    wait_for_refreshes(cache, 1)
+    assert cache.stats()['refresh_failures'] == 1
+    assert cache.get_or_compute('k', lambda: {"status": "error"}) == {"status": "success", "n": 1}
+
+
+def test_expired_entry_is_recomputed_and_errors_fall_back_to_it(monkeypatch):
+    cache, clock = make_cache(monkeypatch)
+    cache.get_or_compute('k', lambda: {"status": "success", "n": 1})
+    clock.now += 100
+
+    # Past the stale window the request waits; an error payload is not stored
+    assert cache.get_or_compute('k', lambda: {"status": "error"}) == {"status": "success", "n": 1}
+    assert cache.stats()['served_on_error'] == 1
+    assert cache.get_or_compute('k', lambda: {"status": "success", "n": 2})["n"] == 2
+
+
+def test_errors_are_returned_but_never_cached(monkeypatch):
+    cache, _ = make_cache(monkeypatch)
+    assert cache.get_or_compute('k', lambda: {"status": "error"}) == {"status": "error"}
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    cache, _ = make_cache(monkeypatch, max_entries=2)
+    for key in ('a', 'b'):
+        cache.get_or_compute(key, lambda: {"status": "success"})
+    cache.get_or_compute('a', lambda: {"status": "success"})
+    cache.get_or_compute('c', lambda: {"status": "success"})
+
+    assert cache.stats()['evictions'] == 1
+    calls = []
+    cache.get_or_compute('b', lambda: calls.append(1) or {"status": "success"})
+    assert calls == [1]
+
+
+def test_invalidate_by_predicate(monkeypatch):
+    cache, _ = make_cache(monkeypatch)
+    cache.get_or_compute(make_key('projects'), lambda: {"status": "success"})
+    cache.get_or_compute(make_key('servers', project='a'), lambda: {"status": "success"})
+    cache.invalidate(lambda key: key[0] == 'servers')
+    assert cache.stats()['entries'] == 1
+    cache.invalidate()
+    assert cache.stats()['entries'] == 0
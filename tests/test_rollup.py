@@ -0,0 +1,130 @@
+
+# test_rollup.py - Window claims, retries and idempotent merges of the rollup refresher
+
+import time
+
+import pytest
+
+from rollup import WATERMARK_ID, AnalysisRollup, FieldSuffixMismatch
+
+DOCUMENTS = 400
+
+
+@pytest.fixture
+def cluster(fake_cluster):
+    from benchmarks.synthetic import Corpus
+
+    cluster, client = fake_cluster
+    cluster.load('cicd_analysis', Corpus(projects=8, seed=7).documents(DOCUMENTS))
+    return cluster, client
+
+
+def make_rollup(client, **options):
+    return AnalysisRollup(client, field_suffix='', settle_seconds=0, page_size=25, **options)
+
+
+def rolled_up_count(cluster):
+    return sum(row['count'] for _, row in cluster._index('cicd_analysis_rollup')['docs'])
+
+
+def state(client):
+    return client.get(index='cicd_analysis_rollup_state', id=WATERMARK_ID)['_source']
+
+
+def test_refresh_folds_every_analysis_once(cluster):
+    cluster, client = cluster
+    rollup = make_rollup(client)
+
+    assert rollup.refresh() > 0
+    assert rolled_up_count(cluster) == DOCUMENTS
+    assert rollup.is_ready()
+    assert 'pending' not in state(client)
+
+    # Nothing new: the next window merges no rows and counts nothing twice
+    assert rollup.refresh() == 0
+    assert rolled_up_count(cluster) == DOCUMENTS
+
+
+def test_failure_after_a_partial_flush_is_retried_without_double_counting(cluster):
+    cluster, client = cluster
+    rollup = make_rollup(client)
+    flush = rollup._flush
+    flushes = []
+
+    def failing_flush():
+        flushes.append(1)
+        if len(flushes) == 2:
+            raise RuntimeError("bulk rejected")
+        flush()
+
+    rollup._flush = failing_flush
+    with pytest.raises(RuntimeError):
+        rollup.refresh()
+
+    # The window stays pending and the watermark has not moved
+    pending = state(client)['pending']
+    assert state(client)['watermark'] is None
+    assert 0 < rolled_up_count(cluster) < DOCUMENTS
+
+    rollup._flush = flush
+    rollup.refresh()
+    assert rolled_up_count(cluster) == DOCUMENTS
+    assert state(client)['watermark'] == pending['through']
+    assert rollup.stats()['retried_windows'] == 1
+
+
+def test_window_pending_on_another_worker_is_left_alone_until_its_claim_expires(cluster):
+    cluster, client = cluster
+    crashed = make_rollup(client)
+    crashed._flush = lambda: (_ for _ in ()).throw(RuntimeError("worker died"))
+    with pytest.raises(RuntimeError):
+        crashed.refresh()
+
+    pending = state(client)['pending']
+    assert make_rollup(client).refresh() == 0
+    assert state(client)['pending'] == pending
+
+    # Once the claim is older than the timeout another worker finishes the same window
+    time.sleep(0.01)
+    survivor = make_rollup(client, claim_timeout=0)
+    assert survivor.refresh() > 0
+    assert rolled_up_count(cluster) == DOCUMENTS
+    assert state(client)['watermark'] == pending['through']
+    assert survivor.stats()['retried_windows'] == 1
+
+
+def test_merge_skips_a_window_it_has_already_applied(cluster):
+    cluster, client = cluster
+    rollup = make_rollup(client)
+    rollup.ensure_indices()
+    buckets = list(rollup._changed_buckets(None, '2100-01-01T00:00:00+00:00'))
+
+    for _ in range(2):
+        for bucket in buckets:
+            rollup._merge(bucket, 'window-1')
+        rollup._flush()
+    assert rolled_up_count(cluster) == DOCUMENTS
+
+
+def test_only_one_worker_claims_a_window(cluster):
+    cluster, client = cluster
+    first, second = make_rollup(client), make_rollup(client)
+    first.ensure_indices()
+
+    # Both workers read the same (missing) state document; only the first create wins
+    state_before, version = first._read_state()
+    assert version is None
+    assert first._claim_window(state_before, version) is not None
+    assert second._claim_window(state_before, version) is None
+
+
+def test_refresher_with_other_field_names_does_not_claim_windows(cluster):
+    cluster, client = cluster
+    make_rollup(client).refresh()
+    built = state(client)
+    assert built['field_suffix'] == ''
+
+    keyword = AnalysisRollup(client, field_suffix='.keyword', settle_seconds=0)
+    with pytest.raises(FieldSuffixMismatch):
+        keyword.refresh()
+    assert state(client) == built
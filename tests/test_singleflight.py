@@ -0,0 +1,126 @@
+
+# test_singleflight.py - Coalescing of identical concurrent calls
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from singleflight import AsyncSingleFlight, SingleFlight, search_key
+
+
+def test_search_key_ignores_dict_order():
+    assert search_key('idx', {"a": 1, "b": {"c": 2, "d": 3}}) == search_key('idx', {"b": {"d": 3, "c": 2}, "a": 1})
+    assert search_key('idx', {"a": 1}) != search_key('other', {"a": 1})
+    assert search_key('idx', {"a": 1}) != search_key('idx', {"a": 2})
+
+
+def run_concurrently(flight, key, fn, callers):
+    """Start callers threads calling flight.do(key, fn); returns (threads, results, errors)"""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for_waiters(flight, waiters):
+    deadline = time.monotonic() + 5
+    while flight.stats()['collapsed'] < waiters and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    executions = []
+
+    def query():
+        executions.append(1)
+        release.wait(5)
+        return {"hits": 42}
+
+    threads, results, errors = run_concurrently(flight, 'key', query, 8)
+    wait_for_waiters(flight, 7)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(executions) == 1
+    assert results == [{"hits": 42}] * 8
+    assert not errors
+    stats = flight.stats()
+    assert (stats['executions'], stats['collapsed'], stats['in_flight']) == (1, 7, 0)
+
+
+def test_error_reaches_every_waiter_and_is_not_kept():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError("search failed")
+
+    threads, results, errors = run_concurrently(flight, 'key', failing, 4)
+    wait_for_waiters(flight, 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert not results
+    assert [str(e) for e in errors] == ["search failed"] * 4
+    # Nothing is cached: the next call executes again
+    assert flight.do('key', lambda: 'ok') == 'ok'
+    assert flight.stats()['executions'] == 2
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: flight.do('b', lambda: 'inner')) == 'inner'
+    assert flight.stats()['collapsed'] == 0
+
+
+def test_async_callers_share_one_execution():
+    flight = AsyncSingleFlight()
+    executions = []
+
+    async def query():
+        executions.append(1)
+        await asyncio.sleep(0.01)
+        return 'result'
+
+    async def main():
+        return await asyncio.gather(*(flight.do('key', query) for _ in range(10)))
+
+    assert asyncio.run(main()) == ['result'] * 10
+    assert len(executions) == 1
+    assert flight.stats()['collapsed'] == 9
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_cancelled_async_waiter_does_not_cancel_the_shared_call():
+    flight = AsyncSingleFlight()
+
+    async def query():
+        await asyncio.sleep(0.02)
+        return 'result'
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do('key', query))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flight.do('key', query))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await leader
+
+    assert asyncio.run(main()) == 'result'
@@ -0,0 +1,75 @@
+
+# test_static_assets.py - Encoding negotiation, validators and caching of static files
+
+import gzip
+
+import pytest
+
+flask = pytest.importorskip('flask')
+
+from fast_json import choose_encoding  # noqa: E402
+from static_assets import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, StaticAssets  # noqa: E402
+
+BUNDLE = b'function dashboard() { return "ci/cd"; }\n' * 200
+
+
+@pytest.mark.parametrize('header, available, expected', [
+    ('gzip, deflate, br', ['br', 'gzip'], 'br'),
+    ('gzip', ['br', 'gzip'], 'gzip'),
+    ('br;q=0.5, gzip;q=0.8', ['br', 'gzip'], 'gzip'),
+    ('br;q=1.0, gzip;q=1', ['br', 'gzip'], 'br'),
+    ('br;q=0, gzip', ['br', 'gzip'], 'gzip'),
+    ('br;q=0.0, gzip;q=0.000', ['br', 'gzip'], None),
+    ('gzip; q=0.', ['gzip'], None),
+    ('*', ['br', 'gzip'], 'br'),
+    ('*;q=0.1, br;q=0', ['br', 'gzip'], 'gzip'),
+    ('gzip, *;q=0', ['br', 'gzip'], 'gzip'),
+    ('identity', ['br', 'gzip'], None),
+    ('br', ['gzip'], None),
+    ('', ['br', 'gzip'], None),
+    (None, ['br', 'gzip'], None),
+    ('gzip;q=bogus', ['gzip'], None),
+])
+def test_choose_encoding(header, available, expected):
+    assert choose_encoding(header, available) == expected
+
+
+@pytest.fixture
+def assets(tmp_path):
+    (tmp_path / 'main.52943a9f.js').write_bytes(BUNDLE)
+    (tmp_path / 'index.html').write_bytes(b'<html></html>')
+    app = flask.Flask(__name__)
+    static = StaticAssets(str(tmp_path)).load()
+
+    @app.route('/<path:path>')
+    def serve(path):
+        return static.serve(path, flask.request) or ('', 404)
+
+    return app.test_client()
+
+
+def test_bundle_is_served_with_the_preferred_encoding(assets):
+    response = assets.get('/main.52943a9f.js', headers={'Accept-Encoding': 'br;q=0.5, gzip;q=0.9'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == BUNDLE
+    assert response.headers['Cache-Control'] == IMMUTABLE_CACHE_CONTROL
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+
+def test_refused_encodings_fall_back_to_identity(assets):
+    response = assets.get('/main.52943a9f.js', headers={'Accept-Encoding': 'br;q=0.0, gzip;q=0.000'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == BUNDLE
+
+
+def test_etag_revalidation_per_encoding(assets):
+    etag = assets.get('/main.52943a9f.js', headers={'Accept-Encoding': 'br'}).headers['ETag']
+    assert assets.get('/main.52943a9f.js', headers={'Accept-Encoding': 'br', 'If-None-Match': etag}).status_code == 304
+    assert assets.get('/main.52943a9f.js', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status_code == 200
+
+
+def test_unhashed_files_must_revalidate(assets):
+    response = assets.get('/index.html', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Cache-Control'] == REVALIDATE_CACHE_CONTROL
+    # Too small to be worth compressing
+    assert 'Content-Encoding' not in response.headers